@@ -0,0 +1,153 @@
+import time
+from typing import Callable
+import numpy as np
+from panel import Panel
+
+
+class ErrorEstimate:
+    '''
+    Zienkiewicz-Zhu error estimate of a computed panel in the energy norm.
+    Element strains (membrane strains and curvatures for dof 6) are
+    recovered at nodes by area-weighted averaging; the error of an element
+    is the energy of the difference between the recovered (linear) and
+    the element (constant) strain field.
+    '''
+
+    def __init__(self):
+        self.elem_errors: np.ndarray = None
+        '''Error of elements in the energy norm [n_elems].'''
+
+        self.energy: float = 0.0
+        '''Energy norm of the solution squared, sum of eps^T * D * eps * area.'''
+
+        self.error: float = 0.0
+        '''Error of the whole panel in the energy norm.'''
+
+        self.relative_error: float = 0.0
+        '''error / sqrt(energy + error^2).'''
+
+    def get_allowed_elem_error(self, target_error: float) -> float:
+        '''
+        Element error that meets target_error when the error is distributed
+        equally between elements.
+        '''
+        n_elems = self.elem_errors.shape[0]
+        return target_error * np.sqrt((self.energy + self.error ** 2) / n_elems)
+
+
+def get_error_estimate(p: Panel) -> ErrorEstimate:
+    '''Error estimate of the computed panel p for its main load.'''
+    mesh = p.mesh
+    conn = mesh.get_connectivity()
+    area = mesh.get_areas()
+    res = p.elem_results
+
+    if p.dof == 6:
+        eps = np.concatenate([res.eps_xy, res.kappa_xy], axis=1)
+        d = p.material.dxy
+    else:
+        eps = res.eps_xy
+        d = p.material.dxy[0:3, 0:3]
+
+    # Recovered nodal strains
+    weights = np.zeros(mesh.get_n_nodes(), dtype=float)
+    eps_nodes = np.zeros((mesh.get_n_nodes(), eps.shape[1]), dtype=float)
+    np.add.at(weights, conn, area[:, np.newaxis])
+    np.add.at(eps_nodes, conn, (area[:, np.newaxis] * eps)[:, np.newaxis, :])
+    eps_nodes /= weights[:, np.newaxis]
+
+    # The error is quadratic over the element, the mid-edge rule is exact
+    e_mid = 0.5 * (eps_nodes[conn] + eps_nodes[np.roll(conn, -1, axis=1)]) - eps[:, np.newaxis, :]
+    elem_errors_sq = area / 3 * np.einsum('nki,ij,nkj->n', e_mid, d, e_mid)
+
+    est = ErrorEstimate()
+    est.elem_errors = np.sqrt(elem_errors_sq)
+    est.energy = float(np.sum(area * np.einsum('ni,ij,nj->n', eps, d, eps)))
+    est.error = float(np.sqrt(np.sum(elem_errors_sq)))
+    total = est.energy + est.error ** 2
+    est.relative_error = float(est.error / np.sqrt(total)) if total > 0.0 else 0.0
+    return est
+
+
+class AdaptiveRefinement:
+    '''
+    Adaptive mesh refinement: solve, estimate the error (get_error_estimate),
+    bisect elements whose error exceeds the equally distributed allowed
+    error, solve again. Stops when the relative error reaches target_error,
+    the mesh can't be refined any more or limits are reached.
+
+    Before the first solve loads are spread over the loaded groups by
+    tributary length (Panel.distribute_loads()), refinement keeps them so
+    (Panel.refine_mesh()): all solutions of the history are for the same
+    load distribution. In-plane point forces have infinite energy in
+    a continuum, the estimate near them doesn't converge; plate bending
+    point forces, edge loads and constraints are resolved normally.
+    '''
+
+    def __init__(self,
+                 target_error: float = 0.05,
+                 max_iterations: int = 10,
+                 max_elems: int = 200000):
+        self.target_error: float = target_error
+        '''Target relative error in the energy norm.'''
+
+        self.max_iterations: int = max_iterations
+        '''Maximum number of refinements.'''
+
+        self.max_elems: int = max_elems
+        '''No refinement of meshes with more elements.'''
+
+        self.history: list[dict] = []
+        '''Record of every solution: mesh size, error, marked elements, time.'''
+
+        self.estimate: ErrorEstimate = None
+        '''Error estimate of the last solution.'''
+
+        self.status: str = ""
+        '''Why refinement stopped: "converged", "max_iterations", "max_elems", "no_refinement".'''
+
+    def run(self, p: Panel, on_iteration: Callable[[dict], None] = None) -> bool:
+        '''
+        Refine the meshed panel p until the target error. The panel is
+        left computed on the last mesh. Returns True if the target is reached.
+        '''
+        self.history = []
+        p.distribute_loads()
+        iteration = 0
+        while True:
+            t = time.perf_counter()
+            p.compute()
+            est = get_error_estimate(p)
+            self.estimate = est
+
+            marked = est.elem_errors > est.get_allowed_elem_error(self.target_error)
+            record = {
+                "iteration":      iteration,
+                "n_nodes":        p.mesh.get_n_nodes(),
+                "n_elems":        p.mesh.get_n_elements(),
+                "n_dofs":         p.k_glob.shape[0],
+                "relative_error": est.relative_error,
+                "n_marked":       int(np.count_nonzero(marked)),
+                "n_new_elems":    0,
+            }
+
+            if est.relative_error <= self.target_error:
+                self.status = "converged"
+            elif iteration >= self.max_iterations:
+                self.status = "max_iterations"
+            elif p.mesh.get_n_elements() >= self.max_elems:
+                self.status = "max_elems"
+            else:
+                self.status = ""
+                record["n_new_elems"] = p.refine_mesh(marked)
+                if record["n_new_elems"] == 0:
+                    self.status = "no_refinement"
+                    p.compute()
+
+            record["time"] = time.perf_counter() - t
+            self.history.append(record)
+            if on_iteration is not None:
+                on_iteration(record)
+            if self.status:
+                return self.status == "converged"
+            iteration += 1
@@ -0,0 +1,205 @@
+'''
+Benchmark of the Panel pipeline on a ladder of mesh sizes.
+
+    python bench.py run -o base.json
+    python bench.py run -o new.json --elem-lengths 0.1 0.05 0.02
+    python bench.py compare base.json new.json --threshold 0.2
+'''
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable
+import numpy as np
+import scipy
+from panel import Panel, StageListener
+from sweep import DEFAULT_PARAMS, build_panel
+
+
+DEFAULT_ELEM_LENGTHS = [0.1, 0.05, 0.02, 0.01]
+
+
+class StageProfiler(StageListener):
+    '''Wall time and peak traced memory of every Panel.compute() stage.'''
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory: bool = trace_memory
+        self.stages: dict[str, dict] = {}
+
+    def run_stage(self, panel: Panel, name: str, stage: Callable[[], None]):
+        self.measure(name, stage)
+
+    def measure(self, name: str, func: Callable[[], None]):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+
+        t = time.perf_counter()
+        func()
+        dt = time.perf_counter() - t
+
+        peak_mem = 0
+        if self.trace_memory:
+            peak_mem = tracemalloc.get_traced_memory()[1] - mem_start
+        self.stages[name] = {"time": dt, "peak_mem": peak_mem}
+
+
+def bench_case(elem_length: float, repeat: int = 1, trace_memory: bool = True) -> dict:
+    '''
+    Build and compute a fresh panel repeat times, keep the fastest run
+    of every stage. Building (material, mesh, node groups) is stage "build_panel".
+    '''
+    best: dict[str, dict] = {}
+    panel = None
+    for _ in range(repeat):
+        profiler = StageProfiler(trace_memory)
+        params = {**DEFAULT_PARAMS, "elem_length": elem_length}
+
+        def build():
+            nonlocal panel
+            panel = build_panel(params)
+
+        profiler.measure("build_panel", build)
+        panel.stage_listener = profiler
+        panel.compute()
+
+        for name, m in profiler.stages.items():
+            if name not in best or m["time"] < best[name]["time"]:
+                best[name] = m
+
+    return {
+        "elem_length": elem_length,
+        "n_nodes":     panel.mesh.get_n_nodes(),
+        "n_elems":     panel.mesh.get_n_elements(),
+        "n_dofs":      panel.k_glob.shape[0],
+        "nnz":         panel.k_glob.nnz,
+        "total_time":  sum(m["time"] for m in best.values()),
+        "stages":      best,
+    }
+
+
+def run(elem_lengths: list[float] = DEFAULT_ELEM_LENGTHS,
+        repeat: int = 1,
+        trace_memory: bool = True,
+        log: Callable[[str], None] = print) -> dict:
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        cases = []
+        for elem_length in elem_lengths:
+            case = bench_case(elem_length, repeat, trace_memory)
+            cases.append(case)
+            if log is not None:
+                log(f"elem_length {elem_length}: {case['n_dofs']} dofs, "
+                    f"total {case['total_time']:.3e} s")
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "meta": {
+            "date":     datetime.datetime.now().isoformat(timespec="seconds"),
+            "python":   platform.python_version(),
+            "numpy":    np.__version__,
+            "scipy":    scipy.__version__,
+            "platform": platform.platform(),
+            "repeat":   repeat,
+        },
+        "cases": cases,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float = 0.2, min_time: float = 1e-3) -> list[dict]:
+    '''
+    Compare two runs stage by stage for equal mesh sizes. A stage regressed
+    if its time grew by more than threshold (relative) and by more than
+    min_time seconds, or its peak memory grew by more than threshold.
+    Returns the list of regressions.
+    '''
+    base_cases = {case["elem_length"]: case for case in base["cases"]}
+    regressions = []
+    for case in new["cases"]:
+        base_case = base_cases.get(case["elem_length"])
+        if base_case is None:
+            continue
+
+        for name, m in case["stages"].items():
+            m_base = base_case["stages"].get(name)
+            if m_base is None:
+                continue
+
+            t0, t1 = m_base["time"], m["time"]
+            if t1 > t0 * (1 + threshold) and t1 - t0 > min_time:
+                regressions.append({"elem_length": case["elem_length"], "stage": name,
+                                    "metric": "time", "base": t0, "new": t1})
+
+            m0, m1 = m_base["peak_mem"], m["peak_mem"]
+            if m0 > 0 and m1 > m0 * (1 + threshold):
+                regressions.append({"elem_length": case["elem_length"], "stage": name,
+                                    "metric": "peak_mem", "base": m0, "new": m1})
+    return regressions
+
+
+def print_comparison(base: dict, new: dict, regressions: list[dict]):
+    flagged = {(r["elem_length"], r["stage"], r["metric"]) for r in regressions}
+    base_cases = {case["elem_length"]: case for case in base["cases"]}
+    for case in new["cases"]:
+        base_case = base_cases.get(case["elem_length"])
+        if base_case is None:
+            continue
+        print(f"\nelem_length {case['elem_length']} ({case['n_dofs']} dofs)")
+        print(f"{'stage':40} {'base, s':>10} {'new, s':>10} {'ratio':>7}")
+        for name, m in case["stages"].items():
+            if name not in base_case["stages"]:
+                continue
+            t0 = base_case["stages"][name]["time"]
+            t1 = m["time"]
+            ratio = t1 / t0 if t0 > 0 else float("inf")
+            mark = ""
+            if (case["elem_length"], name, "time") in flagged:
+                mark += " TIME"
+            if (case["elem_length"], name, "peak_mem") in flagged:
+                mark += " MEM"
+            print(f"{name:40} {t0:10.3e} {t1:10.3e} {ratio:7.2f}{mark}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p_run = commands.add_parser("run", help="run the benchmark")
+    p_run.add_argument("-o", "--output", default="bench.json", help="JSON file for results")
+    p_run.add_argument("--elem-lengths", type=float, nargs="+", default=DEFAULT_ELEM_LENGTHS)
+    p_run.add_argument("--repeat", type=int, default=3, help="runs per mesh size, the fastest is kept")
+    p_run.add_argument("--no-memory", action="store_true", help="don't trace memory (less overhead)")
+
+    p_cmp = commands.add_parser("compare", help="compare two benchmark results")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.2, help="relative growth flagged as regression")
+    p_cmp.add_argument("--min-time", type=float, default=1e-3, help="ignore time growth below this, s")
+
+    args = parser.parse_args(argv)
+    match args.command:
+        case "run":
+            result = run(args.elem_lengths, args.repeat, not args.no_memory)
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+            return 0
+
+        case "compare":
+            with open(args.base) as f:
+                base = json.load(f)
+            with open(args.new) as f:
+                new = json.load(f)
+            regressions = compare(base, new, args.threshold, args.min_time)
+            print_comparison(base, new, regressions)
+            print(f"\n{len(regressions)} regression(s)")
+            return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
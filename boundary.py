@@ -1,4 +1,5 @@
 from enum import Enum
+import numpy as np
 
 DOF = 6
 '''Degrees of freedom.'''
@@ -38,6 +39,19 @@ class ConstraintVector:
         c.rz = Constraint.FIXED
         return c
 
+    @classmethod
+    def new_from_array(cls, fixed: np.ndarray) -> 'ConstraintVector':
+        '''Создать из булевого массива [DOF] закрепленных степеней свободы.'''
+        c = cls()
+        for dof_type in DofType:
+            if fixed[dof_type.value]:
+                c.set_dof(dof_type, Constraint.FIXED)
+        return c
+
+    def to_array(self) -> np.ndarray:
+        '''Булев массив [DOF], True - степень свободы закреплена.'''
+        return np.array([v == Constraint.FIXED for v in self.as_tuple()], dtype=bool)
+
     def set_dof(self, dof_type: DofType, constraint: Constraint):
         match dof_type:
             case DofType.TX:
@@ -77,6 +91,9 @@ class ConstraintVector:
         if other.rz == Constraint.FIXED:
             self.rz = Constraint.FIXED
 
+    def as_tuple(self) -> tuple:
+        return (self.tx, self.ty, self.tz, self.rx, self.ry, self.rz)
+
     def is_free(self) -> bool:
         return (self.tx == Constraint.FREE and
                 self.ty == Constraint.FREE and
@@ -108,10 +125,22 @@ class ForceVector:
         f.mz: float = mz
         return f
 
+    @classmethod
+    def new_from_array(cls, f: np.ndarray) -> 'ForceVector':
+        '''Создать из массива [DOF] компонент нагрузки.'''
+        return cls.new(*(float(v) for v in f))
+
+    def to_array(self) -> np.ndarray:
+        '''Массив [DOF] компонент нагрузки.'''
+        return np.array(self.as_tuple(), dtype=float)
+
     def superposition(self, other: 'ForceVector'):
         self.fx += other.fx
         self.fy += other.fy
         self.fz += other.fz
         self.mx += other.mx
         self.my += other.my
-        self.mz += other.mz
\ No newline at end of file
+        self.mz += other.mz
+
+    def as_tuple(self) -> tuple:
+        return (self.fx, self.fy, self.fz, self.mx, self.my, self.mz)
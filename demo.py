@@ -3,6 +3,7 @@ import shellmat
 import material_mock
 from panel import Panel, NodeGroup
 from boundary import *
+from solvers import *
 
 
 def demo_1x1():
@@ -22,5 +23,63 @@ def demo_1x1():
     p.show_static_deform_mesh()
     print(p.disp_mag)
 
+def demo_solvers():
+    # Comparing linear solvers on a ladder of mesh sizes.
+    material = material_mock.get_material_mock(material_mock.MaterialMockKind.D16)
+
+    shell_material = shellmat.ShellMaterial()
+    shell_material.add_ply(material, 1e-3, 0)
+    shell_material.compute()
+
+    for elem_length in [0.1, 0.05, 0.02, 0.01]:
+        for solver in [SpsolveSolver(),
+                       SpluSolver(),
+                       CholeskySolver(),
+                       CgSolver(Preconditioner.JACOBI),
+                       CgSolver(Preconditioner.ILU),
+                       MixedPrecisionSolver()]:
+            p = Panel(length=1.0, width=1.0)
+            p.material = shell_material
+            p.elem_length = elem_length
+            p.set_solver(solver)
+            p.do_mesh()
+            p.set_constraint(NodeGroup.LFT, ConstraintVector.new_fixed())
+            p.set_force(NodeGroup.RGT, ForceVector.new(0, 1e+5, 0, 0, 0, 0))
+            p.compute()
+            print(f"elem_length {elem_length}, dofs {p.k_glob.shape[0]}, {p.solve_info}")
+
+def demo_sweep():
+    # Parametric sweep over mesh size, layup and load in a process pool.
+    from sweep import Sweep
+    space = {
+        "elem_length": [0.1, 0.05, 0.02],
+        "layup":       [(0, 90), (0, 45, -45, 90), (45, -45)],
+        "fy":          [1e+3, 1e+4],
+    }
+    sweep = Sweep(space, n_workers=4)
+    sweep.run("sweep.csv", on_result=lambda row: print(row["case"], row["status"], row.get("fi_max")))
+
+def demo_adaptive():
+    # Plate clamped on all edges, point force at the center, adaptive mesh.
+    from adaptivity import AdaptiveRefinement
+    material = material_mock.get_material_mock(material_mock.MaterialMockKind.D16)
+
+    shell_material = shellmat.ShellMaterial()
+    shell_material.add_ply(material, 1e-3, 0)
+    shell_material.compute()
+
+    p = Panel(length=1.0, width=1.0, dof=6)
+    p.material = shell_material
+    p.elem_length = 0.1
+    p.do_mesh()
+    for node_group in [NodeGroup.LFT, NodeGroup.RGT, NodeGroup.TOP, NodeGroup.BOT]:
+        p.set_constraint(node_group, ConstraintVector.new_fixed())
+    p.add_node_group("center", lambda mesh: mesh.find_nodes_near_point(0.5, 0.5, 0, 1e-6))
+    p.set_force("center", ForceVector.new(0, 0, 1.0, 0, 0, 0))
+
+    refinement = AdaptiveRefinement(target_error=0.05)
+    refinement.run(p, on_iteration=print)
+    p.show_just_mesh()
+
 if __name__ == '__main__':
     demo_1x1()
\ No newline at end of file
@@ -7,6 +7,104 @@ from meshing import *
 import numpy as np
 
 
+DKT_GAUSS_POINTS = ((0.5, 0.0), (0.5, 0.5), (0.0, 0.5))
+'''Точки интегрирования (xi, eta) - середины сторон треугольника, веса равны 1/3.'''
+
+
+def get_dkt_b_3x9_arrays(i_loc: np.ndarray,
+                         j_loc: np.ndarray,
+                         k_loc: np.ndarray,
+                         xi: float,
+                         eta: float) -> np.ndarray:
+    '''
+    Матрицы градиентов [n x 3 x 9] треугольного элемента пластины DKT
+    (Discrete Kirchhoff Triangle) в точке (xi, eta).
+    i_loc, j_loc, k_loc - локальные координаты узлов [n x 3].
+    Степени свободы узла - (w, rx, ry), rx = dw/dy, ry = -dw/dx,
+    результат - кривизны (kx, ky, kxy) = -(w,xx, w,yy, 2 * w,xy).
+
+    Book: J.-L. Batoz, K.-J. Bathe, L.-W. Ho
+    'A study of three-node triangular plate bending elements' (1980)
+    '''
+    x1, y1 = i_loc[:, 0], i_loc[:, 1]
+    x2, y2 = j_loc[:, 0], j_loc[:, 1]
+    x3, y3 = k_loc[:, 0], k_loc[:, 1]
+
+    x23, y23 = x2 - x3, y2 - y3
+    x31, y31 = x3 - x1, y3 - y1
+    x12, y12 = x1 - x2, y1 - y2
+
+    def get_side_coeffs(x_ij, y_ij):
+        l_sq = x_ij ** 2 + y_ij ** 2
+        p = -6 * x_ij / l_sq
+        q = 3 * x_ij * y_ij / l_sq
+        t = -6 * y_ij / l_sq
+        r = 3 * y_ij ** 2 / l_sq
+        return p, q, t, r
+
+    # Стороны 4, 5, 6 лежат против узлов 1, 2, 3
+    p4, q4, t4, r4 = get_side_coeffs(x23, y23)
+    p5, q5, t5, r5 = get_side_coeffs(x31, y31)
+    p6, q6, t6, r6 = get_side_coeffs(x12, y12)
+
+    a = 1 - 2 * xi
+    b = 1 - 2 * eta
+
+    hx_xi = np.stack([
+        p6 * a + (p5 - p6) * eta,
+        q6 * a - (q5 + q6) * eta,
+        -4 + 6 * (xi + eta) + r6 * a - eta * (r5 + r6),
+        -p6 * a + eta * (p4 + p6),
+        q6 * a - eta * (q6 - q4),
+        -2 + 6 * xi + r6 * a + eta * (r4 - r6),
+        -eta * (p5 + p4),
+        eta * (q4 - q5),
+        -eta * (r5 - r4)], axis=1)
+
+    hy_xi = np.stack([
+        t6 * a + eta * (t5 - t6),
+        1 + r6 * a - eta * (r5 + r6),
+        -q6 * a + eta * (q5 + q6),
+        -t6 * a + eta * (t4 + t6),
+        -1 + r6 * a + eta * (r4 - r6),
+        -q6 * a - eta * (q4 - q6),
+        -eta * (t4 + t5),
+        eta * (r4 - r5),
+        -eta * (q4 - q5)], axis=1)
+
+    hx_eta = np.stack([
+        -p5 * b - xi * (p6 - p5),
+        q5 * b - xi * (q5 + q6),
+        -4 + 6 * (xi + eta) + r5 * b - xi * (r5 + r6),
+        xi * (p4 + p6),
+        xi * (q4 - q6),
+        -xi * (r6 - r4),
+        p5 * b - xi * (p4 + p5),
+        q5 * b + xi * (q4 - q5),
+        -2 + 6 * eta + r5 * b + xi * (r4 - r5)], axis=1)
+
+    hy_eta = np.stack([
+        -t5 * b - xi * (t6 - t5),
+        1 + r5 * b - xi * (r5 + r6),
+        -q5 * b + xi * (q5 + q6),
+        xi * (t4 + t6),
+        xi * (r4 - r6),
+        -xi * (q4 - q6),
+        t5 * b - xi * (t4 + t5),
+        -1 + r5 * b + xi * (r4 - r5),
+        -q5 * b - xi * (q4 - q5)], axis=1)
+
+    x31, y31 = x31[:, np.newaxis], y31[:, np.newaxis]
+    x12, y12 = x12[:, np.newaxis], y12[:, np.newaxis]
+    area_2 = x31 * y12 - x12 * y31
+
+    b_3x9 = np.stack([
+        y31 * hx_xi + y12 * hx_eta,
+        -x31 * hy_xi - x12 * hy_eta,
+        -x31 * hx_xi - x12 * hx_eta + y31 * hy_xi + y12 * hy_eta], axis=1)
+    return b_3x9 / area_2[:, :, np.newaxis]
+
+
 class Fe3:
     def __init__(self, i: Node, j: Node, k: Node):
         self.i = i
@@ -19,10 +117,12 @@ class Fe3:
 
         # Матрицы поворота (направляющих косинусов) элемента 
         # [3x3], [9x9], [18x18], [24x24].
-        self.r_3x3:   np.ndarray = None
-        self.r_9x9:   np.ndarray = None
-        self.r_18x18: np.ndarray = None
-        self.r_24x24: np.ndarray = None
+        # Блочные матрицы [9x9], [18x18], [24x24] вычисляются при первом
+        # обращении (см. свойства r_9x9, r_18x18, r_24x24).
+        self.r_3x3:    np.ndarray = None
+        self._r_9x9:   np.ndarray = None
+        self._r_18x18: np.ndarray = None
+        self._r_24x24: np.ndarray = None
 
         # Локальные координаты узлов.
         self.i_loc: np.ndarray = None
@@ -68,6 +168,37 @@ class Fe3:
         self.b_bnd_3x9_list: list[np.ndarray] = None
         '''Матрицы градиентов [3x9] для задачи изгиба.'''
     
+    @classmethod
+    def new_from_mesh(cls, mesh: Mesh, elem_index: int) -> 'Fe3':
+        i, j, k = mesh.conn[elem_index]
+        return cls(mesh.get_node(i), mesh.get_node(j), mesh.get_node(k))
+
+    @property
+    def r_9x9(self) -> np.ndarray:
+        if self._r_9x9 is None:
+            self._r_9x9 = np.kron(np.eye(3), self.r_3x3)
+        return self._r_9x9
+
+    @property
+    def r_18x18(self) -> np.ndarray:
+        if self._r_18x18 is None:
+            self._r_18x18 = np.kron(np.eye(6), self.r_3x3)
+        return self._r_18x18
+
+    @property
+    def r_24x24(self) -> np.ndarray:
+        if self._r_24x24 is None:
+            self._r_24x24 = np.kron(np.eye(8), self.r_3x3)
+        return self._r_24x24
+
+    def rotate_blocks(self, v: np.ndarray) -> np.ndarray:
+        '''
+        Повернуть вектор длины 3n, составленный из трехкомпонентных блоков.
+        Равносильно np.kron(np.eye(n), r_3x3) @ v, но без построения 
+        блочной матрицы.
+        '''
+        return np.matmul(v.reshape(-1, 3), self.r_3x3.transpose()).reshape(v.shape)
+
     def get_index_vector(self) -> list[int]:
         return [self.i.index, self.j.index, self.k.index]
 
@@ -87,6 +218,7 @@ class Fe3:
         self.__compute_mbr_bnd_loc_3x3()
         self.__compute_b_mbr_3x6()
         self.__compute_k_mbr_6x6()
+        self.__compute_b_bnd_3x9_list()
 
     def __compute_area(self):
         self.area = math_utils.get_tria_area(self.i.x, self.i.y, self.i.z,
@@ -104,10 +236,10 @@ class Fe3:
 
         v_y = np.cross(v_z, v_x)
 
-        self.r_3x3   = np.array([v_x, v_y, v_z], dtype = float)
-        self.r_9x9   = np.kron(np.eye(3), self.r_3x3)
-        self.r_18x18 = np.kron(np.eye(6), self.r_3x3)
-        self.r_24x24 = np.kron(np.eye(8), self.r_3x3)
+        self.r_3x3    = np.array([v_x, v_y, v_z], dtype = float)
+        self._r_9x9   = None
+        self._r_18x18 = None
+        self._r_24x24 = None
 
     def __compute_local_coordinates(self):
         self.i_loc = np.matmul(self.r_3x3, self.i_glb)
@@ -148,13 +280,21 @@ class Fe3:
         self.t2_tr_3x3 = t2_3x3.transpose()
         
     def __compute_mbr_bnd_loc_3x3(self):
-        self.mbr_loc_3x3 = math_utils.matmul_abc(self.t1_3x3, 
+        # Перевод (XY) -> (ЛСК): t2^T = t1(-phi)
+        self.mbr_loc_3x3 = math_utils.matmul_abc(self.t2_tr_3x3, 
                                                  self.mbr_glb_3x3, 
-                                                 self.t1_tr_3x3)
+                                                 self.t2_3x3)
         
-        self.bnd_loc_3x3 = math_utils.matmul_abc(self.t1_3x3, 
+        self.bnd_loc_3x3 = math_utils.matmul_abc(self.t2_tr_3x3, 
                                                  self.bnd_glb_3x3, 
-                                                 self.t1_tr_3x3)
+                                                 self.t2_3x3)
+
+        # Обход узлов по часовой стрелке: нормаль против Z, ось y ЛСК
+        # зеркальна, знак сдвиговых членов меняется
+        if self.r_3x3[2, 2] < 0:
+            s = np.array([1.0, 1.0, -1.0])
+            self.mbr_loc_3x3 = self.mbr_loc_3x3 * np.outer(s, s)
+            self.bnd_loc_3x3 = self.bnd_loc_3x3 * np.outer(s, s)
 
     def __compute_b_mbr_3x6(self):
         ix = self.i_loc[0]
@@ -193,3 +333,269 @@ class Fe3:
 
         k_mbr_6x6 *= self.area
         self.k_mbr_6x6 = k_mbr_6x6
+
+    def __compute_b_bnd_3x9_list(self):
+        self.b_bnd_3x9_list = [
+            get_dkt_b_3x9_arrays(self.i_loc[np.newaxis],
+                                 self.j_loc[np.newaxis],
+                                 self.k_loc[np.newaxis],
+                                 xi, eta)[0]
+            for xi, eta in DKT_GAUSS_POINTS]
+
+
+class Fe3Batch:
+    '''
+    Пачка элементов Fe3, все величины вычисляются сразу для всех элементов.
+    Результаты совпадают с поэлементным расчетом Fe3, первая ось массивов - 
+    индекс элемента.
+    '''
+
+    def __init__(self, coords: np.ndarray, indeces: np.ndarray):
+        self.indeces: np.ndarray = np.asarray(indeces, dtype=int)
+        '''Индексы узлов элементов [n x 3].'''
+
+        self.n_elems: int = self.indeces.shape[0]
+
+        # Глобальные координаты узлов i, j, k [n x 3].
+        self.i_glb: np.ndarray = coords[self.indeces[:, 0]]
+        self.j_glb: np.ndarray = coords[self.indeces[:, 1]]
+        self.k_glb: np.ndarray = coords[self.indeces[:, 2]]
+
+        # Матрицы поворота элементов [n x 3 x 3].
+        self.r_3x3: np.ndarray = None
+
+        # Локальные координаты узлов [n x 3].
+        self.i_loc: np.ndarray = None
+        self.j_loc: np.ndarray = None
+        self.k_loc: np.ndarray = None
+
+        self.area: np.ndarray = None
+        '''Площади элементов [n].'''
+
+        self.phi: np.ndarray = None
+        '''Углы наклона для перевода матриц упругости (в радианах) [n].'''
+
+        # Матрицы для поворота векторов напряжений и деформаций [n x 3 x 3].
+        self.t1_3x3:    np.ndarray = None
+        self.t1_tr_3x3: np.ndarray = None
+        self.t2_3x3:    np.ndarray = None
+        self.t2_tr_3x3: np.ndarray = None
+
+        # ---------------------------------------------------------------------
+
+        self.material: shellmat.ShellMaterial = None
+
+        self.mbr_glb_3x3: np.ndarray = None
+        '''Матрица упругости материала [3x3] для мембранной компоненты в ГСК.'''
+
+        self.mbr_loc_3x3: np.ndarray = None
+        '''Матрицы упругости [n x 3 x 3] для мембранной компоненты в ЛСК.'''
+
+        self.bnd_glb_3x3: np.ndarray = None
+        '''Матрица упругости материала [3x3] для изгибной компоненты в ГСК.'''
+
+        self.bnd_loc_3x3: np.ndarray = None
+        '''Матрицы упругости [n x 3 x 3] для изгибной компоненты в ЛСК.'''
+
+        # ---------------------------------------------------------------------
+
+        self.b_mbr_3x6: np.ndarray = None
+        '''Матрицы градиентов [n x 3 x 6] для мембранной компоненты.'''
+
+        self.k_mbr_6x6: np.ndarray = None
+        '''Матрицы жесткости [n x 6 x 6] для мембранной компоненты в ЛСК.'''
+
+        self.k_mbr_glb_6x6: np.ndarray = None
+        '''Матрицы жесткости [n x 6 x 6] для мембранной компоненты в ГСК (u, v узлов).'''
+
+        # --- оболочка, вычисляется в compute_shell() --- #
+
+        self.b_bnd_3x9_list: list[np.ndarray] = None
+        '''Матрицы градиентов [n x 3 x 9] задачи изгиба в точках DKT_GAUSS_POINTS.'''
+
+        self.b_bnd_3x9_c: np.ndarray = None
+        '''Матрицы градиентов [n x 3 x 9] задачи изгиба в центре элемента.'''
+
+        self.k_bnd_9x9: np.ndarray = None
+        '''Матрицы жесткости [n x 9 x 9] для изгибной компоненты в ЛСК.'''
+
+        self.k_shell_glb_18x18: np.ndarray = None
+        '''
+        Матрицы жесткости оболочки [n x 18 x 18] в ГСК, степени свободы узла
+        (u, v, w, rx, ry, rz). Связь мембранной и изгибной компонент (матрица B
+        пакета) не учитывается.
+        '''
+
+    COMPACT_ARRAYS = ("area", "r_3x3", "b_mbr_3x6", "b_bnd_3x9_c")
+    '''
+    Массивы, нужные после сборки для вычисления деформаций элементов
+    (Panel.get_element_results()), остальные нужны только для матриц жесткости.
+    '''
+
+    @classmethod
+    def new_from_mesh(cls, mesh: Mesh) -> 'Fe3Batch':
+        return cls(mesh.get_coords(), mesh.get_connectivity())
+
+    def get_nbytes(self) -> int:
+        '''Объем памяти всех массивов пакета, байт.'''
+        n = 0
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                n += value.nbytes
+            elif isinstance(value, list):
+                n += sum(v.nbytes for v in value if isinstance(v, np.ndarray))
+        return n
+
+    def set_material(self, material: shellmat.ShellMaterial):
+        self.material = material
+        self.mbr_glb_3x3 = material.get_mbr_3x3()
+        self.bnd_glb_3x3 = material.get_bnd_3x3()
+
+    def compute(self):
+        self.__compute_area()
+        assert np.all(self.area != 0.0)
+
+        self.__compute_rotation_matrices()
+        self.__compute_local_coordinates()
+        self.__compute_phi()
+        self.__compute_t_matrices_3x3()
+        self.__compute_mbr_bnd_loc_3x3()
+        self.__compute_b_mbr_3x6()
+        self.__compute_k_mbr_6x6()
+        self.__compute_k_mbr_glb_6x6()
+
+    def compute_shell(self, drilling_factor: float = 1e-3):
+        '''
+        Вычислить матрицы жесткости оболочки с 6 степенями свободы в узле,
+        вызывается после compute().
+        drilling_factor - жесткость вращения rz относительно средней
+        изгибной жесткости поворотов rx, ry элемента.
+        '''
+        self.__compute_b_bnd_3x9()
+        self.__compute_k_bnd_9x9()
+        self.__compute_k_shell_glb_18x18(drilling_factor)
+
+    def __compute_area(self):
+        v_ij = self.j_glb - self.i_glb
+        v_ik = self.k_glb - self.i_glb
+        u = np.cross(v_ij, v_ik)
+        self.area = 0.5 * np.sqrt(np.sum(u * u, axis=1))
+
+    def __compute_rotation_matrices(self):
+        v_ij = self.j_glb - self.i_glb
+        v_ik = self.k_glb - self.i_glb
+
+        v_x = v_ij / np.linalg.norm(v_ij, axis=1)[:, np.newaxis]
+
+        v_z = np.cross(v_ij, v_ik)
+        v_z = v_z / np.linalg.norm(v_z, axis=1)[:, np.newaxis]
+
+        v_y = np.cross(v_z, v_x)
+
+        self.r_3x3 = np.stack([v_x, v_y, v_z], axis=1)
+
+    def __compute_local_coordinates(self):
+        self.i_loc = np.einsum('nij,nj->ni', self.r_3x3, self.i_glb)
+        self.j_loc = np.einsum('nij,nj->ni', self.r_3x3, self.j_glb)
+        self.k_loc = np.einsum('nij,nj->ni', self.r_3x3, self.k_glb)
+
+    def __compute_phi(self):
+        v_ij = self.j_glb - self.i_glb
+        self.phi = np.arctan2(v_ij[:, 1], v_ij[:, 0])
+
+    def __compute_t_matrices_3x3(self):
+        t1_3x3, t2_3x3 = shellmat.get_t1_t2_arrays(self.phi)
+
+        self.t1_3x3    = t1_3x3
+        self.t1_tr_3x3 = t1_3x3.transpose(0, 2, 1)
+        self.t2_3x3    = t2_3x3
+        self.t2_tr_3x3 = t2_3x3.transpose(0, 2, 1)
+
+    def __compute_mbr_bnd_loc_3x3(self):
+        # Перевод (XY) -> (ЛСК): t2^T = t1(-phi)
+        self.mbr_loc_3x3 = np.matmul(np.matmul(self.t2_tr_3x3, self.mbr_glb_3x3),
+                                     self.t2_3x3)
+
+        self.bnd_loc_3x3 = np.matmul(np.matmul(self.t2_tr_3x3, self.bnd_glb_3x3),
+                                     self.t2_3x3)
+
+        # Обход узлов по часовой стрелке: нормаль против Z, ось y ЛСК
+        # зеркальна, знак сдвиговых членов меняется
+        s = np.ones((self.n_elems, 3), dtype=float)
+        s[self.r_3x3[:, 2, 2] < 0, 2] = -1.0
+        s_3x3 = s[:, :, np.newaxis] * s[:, np.newaxis, :]
+        self.mbr_loc_3x3 *= s_3x3
+        self.bnd_loc_3x3 *= s_3x3
+
+    def __compute_b_mbr_3x6(self):
+        ix = self.i_loc[:, 0]
+        iy = self.i_loc[:, 1]
+
+        jx = self.j_loc[:, 0]
+        jy = self.j_loc[:, 1]
+
+        kx = self.k_loc[:, 0]
+        ky = self.k_loc[:, 1]
+
+        coeff = 1 / (2 * self.area)
+
+        b_mbr_3x6 = np.zeros((self.n_elems, 3, 6), dtype=float)
+        b_mbr_3x6[:, 0, 0::2] = np.stack([jy - ky, ky - iy, iy - jy], axis=1)
+        b_mbr_3x6[:, 1, 1::2] = np.stack([kx - jx, ix - kx, jx - ix], axis=1)
+        b_mbr_3x6[:, 2, 0::2] = b_mbr_3x6[:, 1, 1::2]
+        b_mbr_3x6[:, 2, 1::2] = b_mbr_3x6[:, 0, 0::2]
+        b_mbr_3x6 *= coeff[:, np.newaxis, np.newaxis]
+        self.b_mbr_3x6 = b_mbr_3x6
+
+    def __compute_k_mbr_6x6(self):
+        b_mbr_tr_6x3 = self.b_mbr_3x6.transpose(0, 2, 1)
+
+        k_mbr_6x6 = np.matmul(np.matmul(b_mbr_tr_6x3, self.mbr_loc_3x3),
+                              self.b_mbr_3x6)
+
+        k_mbr_6x6 *= self.area[:, np.newaxis, np.newaxis]
+        self.k_mbr_6x6 = k_mbr_6x6
+
+    def __compute_k_mbr_glb_6x6(self):
+        # k_glb = T^T * k_loc * T, T - блочная матрица из поворотов r_2x2 в плоскости
+        r_2x2 = self.r_3x3[:, 0:2, 0:2]
+        k = self.k_mbr_6x6.reshape(self.n_elems, 3, 2, 3, 2)
+        k = np.einsum('npi,napbq,nqj->naibj', r_2x2, k, r_2x2, optimize=True)
+        self.k_mbr_glb_6x6 = k.reshape(self.n_elems, 6, 6)
+
+    def __compute_b_bnd_3x9(self):
+        self.b_bnd_3x9_list = [get_dkt_b_3x9_arrays(self.i_loc, self.j_loc, self.k_loc, xi, eta)
+                               for xi, eta in DKT_GAUSS_POINTS]
+        self.b_bnd_3x9_c = get_dkt_b_3x9_arrays(self.i_loc, self.j_loc, self.k_loc, 1 / 3, 1 / 3)
+
+    def __compute_k_bnd_9x9(self):
+        k_bnd_9x9 = np.zeros((self.n_elems, 9, 9), dtype=float)
+        for b_bnd_3x9 in self.b_bnd_3x9_list:
+            b_bnd_tr_9x3 = b_bnd_3x9.transpose(0, 2, 1)
+            k_bnd_9x9 += np.matmul(np.matmul(b_bnd_tr_9x3, self.bnd_loc_3x3), b_bnd_3x9)
+
+        k_bnd_9x9 *= (self.area / 3)[:, np.newaxis, np.newaxis]
+        self.k_bnd_9x9 = k_bnd_9x9
+
+    def __compute_k_shell_glb_18x18(self, drilling_factor: float):
+        n = self.n_elems
+
+        # Локальная матрица [n x 3 x 6 x 3 x 6]: (узел, dof, узел, dof),
+        # dof узла (u, v, w, rx, ry, rz)
+        k = np.zeros((n, 3, 6, 3, 6), dtype=float)
+        k[:, :, 0:2, :, 0:2] = self.k_mbr_6x6.reshape(n, 3, 2, 3, 2)
+        k[:, :, 2:5, :, 2:5] = self.k_bnd_9x9.reshape(n, 3, 3, 3, 3)
+
+        # Фиктивная жесткость вращения вокруг нормали
+        k_rot = self.k_bnd_9x9.reshape(n, 3, 3, 3, 3)
+        k_rot_mean = np.einsum('nadad->n', k_rot[:, :, 1:3, :, 1:3]) / 6
+        k_drill = drilling_factor * k_rot_mean
+        for a in range(3):
+            k[:, a, 5, a, 5] = k_drill
+
+        # k_glb = T^T * k_loc * T, T = r_18x18 - поворот троек (u, v, w) и (rx, ry, rz).
+        # Умножение на T справа - поворот каждой тройки столбцов; k_loc * T
+        # транспонируется и поворачивается еще раз, результат симметричен.
+        k_t = np.matmul(k.reshape(n, 6 * 18, 3), self.r_3x3).reshape(n, 18, 18)
+        k_t = k_t.transpose(0, 2, 1).reshape(n, 6 * 18, 3)
+        self.k_shell_glb_18x18 = np.matmul(k_t, self.r_3x3).reshape(n, 18, 18)
@@ -0,0 +1,144 @@
+import json
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Callable
+from panel import Panel, StageListener
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_max_rss() -> int:
+    '''
+    High-water mark of the process resident memory in bytes since the
+    process start (it never decreases), 0 if unknown (Windows).
+    '''
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux and BSD - kilobytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class EventLog(StageListener):
+    '''
+    Event log of Panel.compute() calls. Attach it with
+    panel.stage_listener = EventLog(); without a listener Panel runs
+    stages directly and nothing is recorded.
+
+    Every stage produces a record (dict) with its duration, size of the
+    stiffeness matrix, solver iterations and memory high-water marks,
+    every compute() call adds a summary record, also a failed one (with
+    status "error" and the failed stage). Records are kept in
+    a bounded buffer and optionally passed to a callback.
+    '''
+
+    def __init__(self,
+                 maxlen: int = 10000,
+                 callback: Callable[[dict], None] = None):
+        self.records: deque[dict] = deque(maxlen=maxlen)
+        '''Last records, the oldest are dropped.'''
+
+        self.callback: Callable[[dict], None] = callback
+        '''Receives every record as it is created (e.g. monitoring exporter).'''
+
+        self.n_computes: int = 0
+        self.__compute_start: float = 0.0
+        self.__compute_stages: int = 0
+        self.__compute_error: str = None
+
+    def begin_compute(self, panel: Panel):
+        self.n_computes += 1
+        self.__compute_start = time.perf_counter()
+        self.__compute_stages = 0
+        self.__compute_error = None
+
+    def run_stage(self, panel: Panel, name: str, stage: Callable[[], None]):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+
+        wall = time.time()
+        t = time.perf_counter()
+        error = None
+        try:
+            stage()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record = {
+                "event":    "stage",
+                "compute":  self.n_computes,
+                "stage":    name,
+                "time":     wall,
+                "duration": time.perf_counter() - t,
+                "status":   "ok" if error is None else "error",
+                **self.__get_matrix_info(panel),
+                "max_rss":  get_max_rss(),
+            }
+            if tracing:
+                record["traced_peak"] = tracemalloc.get_traced_memory()[1]
+            if name == "solve_disp" and error is None and panel.solve_info is not None:
+                record["solver"]     = panel.solve_info.solver_name
+                record["iterations"] = panel.solve_info.iterations
+                record["residual"]   = float(panel.solve_info.residual)
+            if error is not None:
+                record["error"] = error
+                self.__compute_error = f"{name}: {error}"
+            self.__compute_stages += 1
+            self.__add(record)
+
+    def end_compute(self, panel: Panel):
+        record = {
+            "event":    "compute",
+            "compute":  self.n_computes,
+            "time":     time.time(),
+            "duration": time.perf_counter() - self.__compute_start,
+            "status":   "ok" if self.__compute_error is None else "error",
+            "changes":  sorted(change.name for change in panel.last_changes),
+            "n_stages": self.__compute_stages,
+            "n_nodes":  panel.mesh.get_n_nodes(),
+            "n_elems":  panel.mesh.get_n_elements(),
+            **self.__get_matrix_info(panel),
+            "max_rss":  get_max_rss(),
+        }
+        if self.__compute_error is not None:
+            record["error"] = self.__compute_error
+        self.__add(record)
+
+    def __get_matrix_info(self, panel: Panel) -> dict:
+        k = panel.k_glob
+        if k is None:
+            return {"n_dofs": 0, "nnz": 0}
+        return {"n_dofs": k.shape[0], "nnz": int(k.nnz)}
+
+    def __add(self, record: dict):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def get_records(self, event: str = None) -> list[dict]:
+        return [r for r in self.records if event is None or r["event"] == event]
+
+    def get_stage_durations(self, compute: int = None) -> dict[str, float]:
+        '''Stage name -> duration for the compute() call number compute (the last by default).'''
+        if compute is None:
+            compute = self.n_computes
+        return {r["stage"]: r["duration"]
+                for r in self.records
+                if r["event"] == "stage" and r["compute"] == compute}
+
+    def to_json_lines(self) -> str:
+        return "".join(json.dumps(r) + "\n" for r in self.records)
+
+    def write_json_lines(self, path: str, append: bool = True):
+        with open(path, "a" if append else "w") as f:
+            f.write(self.to_json_lines())
+
+    def clear(self):
+        self.records.clear()
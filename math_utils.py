@@ -77,6 +77,225 @@ def matmul_abc(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
     return abc
 
 
+def get_dof_mask(size: int, dofs: list[int]) -> np.ndarray:
+    '''Булева маска длины size, в которой отмечены индексы dofs.'''
+    mask = np.zeros(size, dtype=bool)
+    mask[np.asarray(dofs, dtype=int)] = True
+    return mask
+
+
+def constrain_csr(k: sparse.csr_matrix, fixed_dofs: list[int]) -> sparse.csr_matrix:
+    '''
+    Применить граничные условия к матрице k: обнулить строки и столбцы
+    закрепленных степеней свободы и поставить 1.0 на диагональ.
+    Исходная матрица не изменяется.
+    '''
+    k = sparse.csr_matrix(k, copy=True)
+    n = k.shape[0]
+    fixed = get_dof_mask(n, fixed_dofs)
+    rows = np.repeat(np.arange(n), np.diff(k.indptr))
+    k.data[fixed[rows] | fixed[k.indices]] = 0.0
+    k = k + sparse.diags(fixed.astype(float), format='csr')
+    return k
+
+
+def extract_free_csr(k: sparse.csr_matrix, free_dofs: np.ndarray) -> sparse.csr_matrix:
+    '''Вырезать из матрицы k подматрицу, состоящую из строк и столбцов free_dofs.'''
+    return k[free_dofs][:, free_dofs]
+
+
+def assemble_bsr(ms: np.ndarray, indeces: np.ndarray, block_size: int, n_blocks: int) -> sparse.bsr_matrix:
+    '''
+    Собрать блочную разреженную матрицу (BSR) из матриц элементов.
+    ms       - матрицы элементов [n x m x m], m = n_indeces * block_size.
+    indeces  - индексы узлов элементов [n x n_indeces].
+    n_blocks - число узлов, размер матрицы n_blocks * block_size.
+    Для повторной сборки на той же сетке используйте AssemblyPattern.
+    '''
+    return AssemblyPattern(indeces, block_size, n_blocks, blocked=True).assemble(ms)
+
+
+def constrain_bsr(k: sparse.bsr_matrix, fixed_dofs: list[int]) -> sparse.bsr_matrix:
+    '''
+    То же, что constrain_csr(), для блочной матрицы: обнулить строки и
+    столбцы закрепленных степеней свободы и поставить 1.0 на диагональ.
+    Исходная матрица не изменяется, блочная структура сохраняется.
+    '''
+    bs = k.blocksize[0]
+    n_blocks = k.shape[0] // bs
+    fixed = get_dof_mask(k.shape[0], fixed_dofs).reshape(n_blocks, bs)
+
+    block_rows = np.repeat(np.arange(n_blocks), np.diff(k.indptr))
+    block_cols = k.indices
+    free_rows = ~fixed[block_rows]
+    free_cols = ~fixed[block_cols]
+    data = k.data * (free_rows[:, :, np.newaxis] & free_cols[:, np.newaxis, :])
+
+    # Диагональные блоки: 1.0 для закрепленных степеней свободы
+    diag = np.flatnonzero(block_rows == block_cols)
+    if diag.size != n_blocks:
+        raise Exception("Block matrix has no diagonal block for some rows.")
+    d = np.arange(bs)
+    data[diag[:, np.newaxis], d, d] += fixed[block_rows[diag]]
+
+    return sparse.bsr_matrix((data, k.indices.copy(), k.indptr.copy()), shape=k.shape)
+
+
+class AssemblyPattern:
+    '''
+    Символьная сборка: структура разреженной матрицы (indptr, indices)
+    и карта рассылки из матриц конечных элементов в ячейки массива data.
+    Зависит только от связности сетки, поэтому строится один раз на сетку;
+    при смене материала assemble() только заполняет data, без сортировки
+    и суммирования дубликатов.
+
+    blocked=False - CSR матрица, карта для каждого числа матриц элементов,
+    data заполняется одним np.bincount().
+    blocked=True  - BSR матрица с блоками [block_size x block_size],
+    карта для каждого блока, блоки суммируются умножением на разреженную
+    матрицу из единиц (строка - ячейка, столбцы - блоки элементов).
+    '''
+
+    def __init__(self, indeces: np.ndarray, block_size: int, n_blocks: int, blocked: bool = False):
+        n, n_indeces = indeces.shape
+        bs = block_size
+        self.n_elems:    int  = n
+        self.n_indeces:  int  = n_indeces
+        self.block_size: int  = bs
+        self.blocked:    bool = blocked
+        self.size:       int  = n_blocks * bs
+
+        self.indices: np.ndarray = None
+        '''Столбцы (блоков) ненулевых ячеек, отсортированы внутри строк.'''
+
+        self.indptr: np.ndarray = None
+
+        self.slots: np.ndarray = None
+        '''Карта рассылки: номер ячейки data для каждого числа (блока) матриц элементов.'''
+
+        self.summation: sparse.csr_matrix = None
+        '''
+        Матрица суммирования блоков для blocked=True, строится при первом
+        assemble() (сборке по частям через add_elements() она не нужна).
+        '''
+
+        # Структура строится по блокам узлов: позиции блоков элементов [n x a x b]
+        idx = np.asarray(indeces, dtype=np.int64)
+        block_rows = np.repeat(idx, n_indeces, axis=1).ravel()
+        block_cols = np.tile(idx, (1, n_indeces)).ravel()
+        keys, block_slots = np.unique(block_rows * n_blocks + block_cols, return_inverse=True)
+        del block_rows, block_cols
+
+        block_indices = (keys % n_blocks).astype(np.int32)
+        block_indptr = np.zeros(n_blocks + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n_blocks, minlength=n_blocks), out=block_indptr[1:])
+        del keys
+
+        if blocked:
+            self.indices = block_indices
+            self.indptr = block_indptr.astype(np.int32)
+            self.slots = block_slots.astype(np.int32)
+            return
+
+        # CSR структура из блочной, без сортировки чисел: строка r блока
+        # узла содержит по bs чисел каждого блока строки узла.
+        blocks_in_row = np.diff(block_indptr)
+        row_starts = (bs * bs * block_indptr[:-1, np.newaxis]
+                      + np.arange(bs) * bs * blocks_in_row[:, np.newaxis])
+        row_starts = row_starts.astype(np.int32)
+        self.indptr = np.zeros(self.size + 1, dtype=np.int32)
+        self.indptr[:-1] = row_starts.ravel()
+        self.indptr[-1] = bs * bs * block_indptr[-1]
+
+        # Столбцы чисел: для числа строки - блок строки узла и столбец в блоке
+        row_of_block = np.repeat(np.arange(n_blocks), blocks_in_row)
+        pos_in_row = (np.arange(block_indices.shape[0]) - block_indptr[row_of_block]).astype(np.int32)
+        entry_rows = np.repeat(np.arange(self.size), np.diff(self.indptr))
+        entry_pos = np.arange(self.indptr[-1]) - self.indptr[entry_rows]
+        indices = block_indices[block_indptr[entry_rows // bs] + entry_pos // bs] * bs + entry_pos % bs
+        del entry_rows, entry_pos
+        self.indices = indices.astype(np.int32)
+
+        # Номер числа = начало строки + bs * (позиция блока в строке узла) + столбец в блоке
+        block_slots = block_slots.reshape(n, n_indeces, 1, n_indeces, 1)
+        node_rows = idx.reshape(n, n_indeces, 1, 1, 1)
+        r = np.arange(bs).reshape(1, 1, bs, 1, 1)
+        c = np.arange(bs, dtype=np.int32).reshape(1, 1, 1, 1, bs)
+        slots = row_starts[node_rows, r] + bs * pos_in_row[block_slots]
+        self.slots = (slots + c).ravel()
+
+    def get_nnz(self) -> int:
+        '''Число ненулевых ячеек (блоков для blocked=True).'''
+        return self.indices.shape[0]
+
+    def get_nbytes(self) -> int:
+        '''Объем памяти шаблона, байт.'''
+        n = self.indices.nbytes + self.indptr.nbytes + self.slots.nbytes
+        if self.summation is not None:
+            s = self.summation
+            n += s.data.nbytes + s.indices.nbytes + s.indptr.nbytes
+        return n
+
+    def __get_summation(self) -> sparse.csr_matrix:
+        if self.summation is None:
+            n_slots = self.get_nnz()
+            order = np.argsort(self.slots, kind='stable')
+            starts = np.searchsorted(self.slots[order], np.arange(n_slots + 1))
+            self.summation = sparse.csr_matrix((np.ones(order.shape[0]), order, starts),
+                                               shape=(n_slots, order.shape[0]))
+        return self.summation
+
+    def assemble(self, ms: np.ndarray) -> sparse.csr_matrix | sparse.bsr_matrix:
+        '''Собрать матрицу из матриц элементов ms [n x m x m] той же сетки.'''
+        bs = self.block_size
+        m = self.n_indeces * bs
+        assert(ms.shape == (self.n_elems, m, m))
+
+        if not self.blocked:
+            data = np.bincount(self.slots, weights=ms.ravel(), minlength=self.get_nnz())
+        else:
+            blocks = ms.reshape(self.n_elems, self.n_indeces, bs, self.n_indeces, bs).transpose(0, 1, 3, 2, 4)
+            data = self.__get_summation() @ blocks.reshape(-1, bs * bs)
+        return self.get_matrix(data)
+
+    def new_data(self) -> np.ndarray:
+        '''Нулевой массив data для сборки по частям (add_elements()).'''
+        if not self.blocked:
+            return np.zeros(self.get_nnz(), dtype=float)
+        return np.zeros((self.get_nnz(), self.block_size, self.block_size), dtype=float)
+
+    def add_elements(self, data: np.ndarray, ms: np.ndarray, elem_from: int):
+        '''
+        Добавить в data матрицы ms [n x m x m] элементов с номерами
+        elem_from ... elem_from + n - 1. Память - порядка размера ms.
+        '''
+        n = ms.shape[0]
+        bs = self.block_size
+        if not self.blocked:
+            per_elem = (self.n_indeces * bs) ** 2
+            slots = self.slots[elem_from * per_elem:(elem_from + n) * per_elem]
+            np.add.at(data, slots, ms.ravel())
+            return
+
+        # Номера чисел data для блоков [n x a x r x b x c]
+        per_elem = self.n_indeces ** 2
+        slots = self.slots[elem_from * per_elem:(elem_from + n) * per_elem]
+        slots = slots.reshape(n, self.n_indeces, 1, self.n_indeces, 1).astype(np.int64) * (bs * bs)
+        slots = slots + (np.arange(bs)[:, np.newaxis] * bs + np.arange(bs)).reshape(1, 1, bs, 1, bs)
+        np.add.at(data.reshape(-1), slots.ravel(), ms.ravel())
+
+    def get_matrix(self, data: np.ndarray) -> sparse.csr_matrix | sparse.bsr_matrix:
+        '''Матрица с данными data на структуре этого шаблона.'''
+        shape = (self.size, self.size)
+        if not self.blocked:
+            k = sparse.csr_matrix((data, self.indices, self.indptr), shape=shape, copy=False)
+        else:
+            bs = self.block_size
+            k = sparse.bsr_matrix((data.reshape(-1, bs, bs), self.indices, self.indptr), shape=shape, copy=False)
+        k.has_sorted_indices = True
+        return k
+
+
 class SpBuilder:
     def __init__(self, max_arr_size: int, n_indeces: int, block_size: int, sp_size: int):
         self.rows: np.ndarray = np.zeros(max_arr_size, dtype=int)
@@ -106,6 +325,32 @@ class SpBuilder:
                         self.vals[self.pos] = v
                         self.pos += 1
 
+    def accept_matrices(self, ms: np.ndarray, indeces: np.ndarray):
+        '''
+        Принять сразу пачку матриц.
+        ms      - матрицы элементов [n x m x m], где m = n_indeces * block_size.
+        indeces - индексы узлов элементов [n x n_indeces].
+        '''
+        n = ms.shape[0]
+        m = self.n_indeces * self.block_size
+        assert(ms.shape == (n, m, m))
+        assert(indeces.shape == (n, self.n_indeces))
+
+        # Глобальные индексы строк/столбцов для каждой строки матрицы элемента:
+        # dofs[e, a * block_size + r] = indeces[e, a] * block_size + r
+        bs = self.block_size
+        dofs = indeces[:, :, np.newaxis] * bs + np.arange(bs)
+        dofs = dofs.reshape(n, m)
+
+        n_entries = n * m * m
+        end = self.pos + n_entries
+        assert(end <= self.rows.shape[0])
+
+        self.rows[self.pos:end] = np.broadcast_to(dofs[:, :, np.newaxis], (n, m, m)).ravel()
+        self.cols[self.pos:end] = np.broadcast_to(dofs[:, np.newaxis, :], (n, m, m)).ravel()
+        self.vals[self.pos:end] = ms.ravel()
+        self.pos = end
+
     def set_row_zero(self, row: int):
         for i in range(self.pos):
             if self.rows[i] == row:
@@ -124,9 +369,32 @@ class SpBuilder:
         raise Exception(f"No such element with row={row}, col={col}.")
 
     def set_row_col_to_zero_and_place_1(self, rc: int):
-        self.set_row_zero(rc)
-        self.set_col_zero(rc)
-        self.set_val(rc, rc, 1.0)
+        self.set_rows_cols_to_zero_and_place_1([rc])
+
+    def set_rows_cols_to_zero_and_place_1(self, rcs: list[int]):
+        '''
+        Обнулить строки и столбцы с индексами rcs и поставить 1.0 на диагональ.
+        Выполняется одной маской по всем накопленным элементам, за O(nnz).
+        '''
+        rcs = np.unique(np.asarray(rcs, dtype=int))
+        if rcs.size == 0:
+            return
+
+        rows = self.rows[:self.pos]
+        cols = self.cols[:self.pos]
+        vals = self.vals[:self.pos]
+
+        fixed = get_dof_mask(self.sp_size, rcs)
+        vals[fixed[rows] | fixed[cols]] = 0.0
+
+        # Для каждого индекса ставим 1.0 в первый найденный элемент (rc, rc),
+        # остальные дубликаты этой позиции уже обнулены.
+        diag = np.flatnonzero((rows == cols) & fixed[rows])
+        diag_rows, first = np.unique(rows[diag], return_index=True)
+        if diag_rows.size != rcs.size:
+            missing = np.setdiff1d(rcs, diag_rows)
+            raise Exception(f"No such element with row=col={missing[0]}.")
+        vals[diag[first]] = 1.0
 
     def test_indeces(self):
         rows_not_found = []
@@ -2,6 +2,9 @@ import math
 import math_utils
 from boundary import *
 import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse import linalg as splinalg
 
 
 class Node:
@@ -111,77 +114,673 @@ class Elem:
         self.tag = tag
 
 
+class NodeView(Node):
+    '''
+    Узел сетки, данные которого хранятся в массивах Mesh.
+    Нужен для совместимости с кодом, работающим с объектами Node.
+    constraint_vector и force_vector возвращают копии, изменять их
+    следует через методы узла.
+    '''
+
+    def __init__(self, mesh: 'Mesh', index: int):
+        self.mesh = mesh
+        self.index = index
+
+    @property
+    def x(self) -> float:
+        return float(self.mesh.coords[self.index, 0])
+
+    @property
+    def y(self) -> float:
+        return float(self.mesh.coords[self.index, 1])
+
+    @property
+    def z(self) -> float:
+        return float(self.mesh.coords[self.index, 2])
+
+    @property
+    def constraint_vector(self) -> ConstraintVector:
+        return ConstraintVector.new_from_array(self.mesh.dof_fixed[self.index])
+
+    @property
+    def force_vector(self) -> ForceVector:
+        return ForceVector.new_from_array(self.mesh.loads[self.index])
+
+    def constraint_superposition(self, other_constraint: ConstraintVector):
+        self.mesh.dof_fixed[self.index] |= other_constraint.to_array()
+
+    def clear_constraint(self):
+        self.mesh.dof_fixed[self.index] = False
+
+    def is_free(self):
+        return not self.mesh.dof_fixed[self.index].any()
+
+    def force_superposition(self, other_force: ForceVector):
+        self.mesh.loads[self.index] += other_force.to_array()
+
+    def clear_force(self):
+        self.mesh.loads[self.index] = 0.0
+
+    def get_coord_vect(self) -> np.ndarray:
+        return self.mesh.coords[self.index].copy()
+
+
+class ElemView(Elem):
+    '''Элемент сетки, данные которого хранятся в массивах Mesh.'''
+
+    def __init__(self, mesh: 'Mesh', index: int):
+        self.mesh = mesh
+        self.index = index
+
+    @property
+    def i(self) -> NodeView:
+        return self.mesh.get_node(self.mesh.conn[self.index, 0])
+
+    @property
+    def j(self) -> NodeView:
+        return self.mesh.get_node(self.mesh.conn[self.index, 1])
+
+    @property
+    def k(self) -> NodeView:
+        return self.mesh.get_node(self.mesh.conn[self.index, 2])
+
+    @property
+    def tag(self) -> int:
+        return int(self.mesh.tags[self.index])
+
+    @tag.setter
+    def tag(self, tag: int):
+        self.mesh.tags[self.index] = tag
+
+
+class NodeIndex:
+    '''
+    Пространственный индекс узлов на равномерной сетке ячеек.
+    Узлы отсортированы по номеру ячейки, поэтому выборка узлов ячейки -
+    это двоичный поиск и срез. Запросы проверяют только ячейки,
+    пересекающиеся с областью поиска, и возвращают массивы индексов узлов.
+    '''
+
+    def __init__(self, coords: np.ndarray, nodes_per_cell: float = 2.0):
+        self.coords = coords
+        n = coords.shape[0]
+
+        if n == 0:
+            self.lo = np.zeros(3)
+            extent = np.zeros(3)
+        else:
+            self.lo = coords.min(axis=0)
+            extent = coords.max(axis=0) - self.lo
+
+        # Размер ячейки подбирается по ненулевым измерениям так, чтобы
+        # в среднем в ячейке было nodes_per_cell узлов.
+        active = extent > 1e-12 * max(extent.max(), 1.0)
+        n_active = int(active.sum())
+        if n_active == 0:
+            self.h = 1.0
+        else:
+            n_cells = max(n / nodes_per_cell, 1.0)
+            self.h = float((np.prod(extent[active]) / n_cells) ** (1.0 / n_active))
+
+        self.dims = np.floor(extent / self.h).astype(np.int64) + 1
+
+        keys = self.__get_keys(self.__get_cells(coords))
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def __get_cells(self, points: np.ndarray) -> np.ndarray:
+        cells = np.floor((points - self.lo) / self.h).astype(np.int64)
+        return np.clip(cells, 0, self.dims - 1)
+
+    def __get_keys(self, cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] * self.dims[1] + cells[:, 1]) * self.dims[2] + cells[:, 2]
+
+    def __get_nodes_in_cells(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.unique(keys)
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.sorted_keys, keys, side='right')
+        counts = ends - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Склеиваем диапазоны [starts, ends) без цикла по ячейкам.
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        positions = np.arange(total) + offsets
+        return self.order[positions]
+
+    def __get_box_candidates(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        if np.any(hi < self.lo) or np.any(lo > self.lo + self.dims * self.h):
+            return np.zeros(0, dtype=np.int64)
+        c_lo = self.__get_cells(lo[np.newaxis])[0]
+        c_hi = self.__get_cells(hi[np.newaxis])[0]
+        ranges = [np.arange(c_lo[a], c_hi[a] + 1) for a in range(3)]
+        cells = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+        return self.__get_nodes_in_cells(self.__get_keys(cells))
+
+    def find_near_point(self, p: np.ndarray, eps: float) -> np.ndarray:
+        p = np.asarray(p, dtype=float)
+        candidates = self.__get_box_candidates(p - eps, p + eps)
+        d = self.coords[candidates] - p
+        r = np.sqrt(np.sum(d * d, axis=1))
+        return np.sort(candidates[r < eps])
+
+    def find_in_box(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        lo = np.asarray(lo, dtype=float)
+        hi = np.asarray(hi, dtype=float)
+        candidates = self.__get_box_candidates(lo, hi)
+        xyz = self.coords[candidates]
+        inside = np.all((xyz >= lo) & (xyz <= hi), axis=1)
+        return np.sort(candidates[inside])
+
+    def find_on_line(self, a: np.ndarray, b: np.ndarray, eps: float) -> np.ndarray:
+        '''Узлы, находящиеся ближе eps к прямой, проходящей через точки a и b.'''
+        a = np.asarray(a, dtype=float)
+        e = np.asarray(b, dtype=float) - a
+        e /= np.linalg.norm(e)
+
+        # Отрезок прямой внутри расширенного на eps габарита узлов.
+        box_lo = self.lo - eps
+        box_hi = self.lo + self.dims * self.h + eps
+        t_min, t_max = -np.inf, np.inf
+        for axis in range(3):
+            if abs(e[axis]) < 1e-15:
+                if a[axis] < box_lo[axis] or a[axis] > box_hi[axis]:
+                    return np.zeros(0, dtype=np.int64)
+                continue
+            t1 = (box_lo[axis] - a[axis]) / e[axis]
+            t2 = (box_hi[axis] - a[axis]) / e[axis]
+            t_min = max(t_min, min(t1, t2))
+            t_max = min(t_max, max(t1, t2))
+        if t_min > t_max:
+            return np.zeros(0, dtype=np.int64)
+
+        # Ячейки, которые пересекает отрезок, с запасом на eps: точки отрезка
+        # с шагом step и соседние с ними ячейки в пределах eps + step / 2.
+        step = max(self.h, eps)
+        n_samples = int(np.ceil((t_max - t_min) / step)) + 1
+        t = np.linspace(t_min, t_max, n_samples)
+        points = a + t[:, np.newaxis] * e
+        r = np.minimum(int(np.ceil((eps + 0.5 * step) / self.h)), self.dims - 1)
+
+        # Если полоса вокруг отрезка занимает почти весь его габарит,
+        # дешевле перебрать ячейки габарита.
+        box_lo = points.min(axis=0) - eps
+        box_hi = points.max(axis=0) + eps
+        n_box_cells = np.prod(self.__get_cells(box_hi[np.newaxis])[0]
+                              - self.__get_cells(box_lo[np.newaxis])[0] + 1)
+        if n_samples * np.prod(2 * r + 1) >= n_box_cells:
+            candidates = self.find_in_box(box_lo, box_hi)
+        else:
+            cells = self.__get_cells(points)
+            shifts = np.stack(np.meshgrid(*[np.arange(-ra, ra + 1) for ra in r], indexing='ij'), axis=-1).reshape(-1, 3)
+            cells = (cells[:, np.newaxis, :] + shifts).reshape(-1, 3)
+            cells = cells[np.all((cells >= 0) & (cells < self.dims), axis=1)]
+            candidates = self.__get_nodes_in_cells(self.__get_keys(cells))
+
+        an = self.coords[candidates] - a
+        perp = an - np.outer(an @ e, e)
+        dist = np.sqrt(np.sum(perp * perp, axis=1))
+        return np.sort(candidates[dist < eps])
+
+    def find_in_polygon(self, polygon: np.ndarray) -> np.ndarray:
+        '''
+        Узлы, проекции которых на плоскость XY лежат внутри многоугольника.
+        polygon - вершины [m x 2] (или [m x 3], координата z не учитывается).
+        '''
+        polygon = np.asarray(polygon, dtype=float)[:, :2]
+        lo = np.array([*polygon.min(axis=0), self.lo[2]])
+        hi = np.array([*polygon.max(axis=0), self.lo[2] + self.dims[2] * self.h])
+        candidates = self.__get_box_candidates(lo, hi)
+
+        # Метод лучей: считаем пересечения горизонтального луча с ребрами.
+        x = self.coords[candidates, 0][:, np.newaxis]
+        y = self.coords[candidates, 1][:, np.newaxis]
+        x1, y1 = polygon[:, 0], polygon[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside = np.sum(crosses & (x < x_cross), axis=1) % 2 == 1
+        return np.sort(candidates[inside])
+
+
+def _reserve(arr: np.ndarray, size: int) -> np.ndarray:
+    '''Вернуть массив вместимостью не меньше size строк, сохранив данные.'''
+    capacity = arr.shape[0]
+    if size <= capacity:
+        return arr
+    new_capacity = max(size, 2 * capacity, 16)
+    new_arr = np.zeros((new_capacity,) + arr.shape[1:], dtype=arr.dtype)
+    new_arr[:capacity] = arr
+    return new_arr
+
+
 class Mesh:
+    '''
+    Сетка треугольных элементов. Данные хранятся в непрерывных массивах:
+    coords    - координаты узлов [n_nodes x 3];
+    conn      - индексы узлов элементов [n_elems x 3], int32;
+    dof_fixed - закрепленные степени свободы узлов [n_nodes x DOF];
+    loads     - узловые нагрузки [n_nodes x DOF];
+    tags      - метки элементов [n_elems].
+    Свойства возвращают представления массивов, изменения в них
+    отражаются в сетке. Списки nodes и elements состоят из представлений
+    NodeView и ElemView и нужны для совместимости.
+    '''
+
     def __init__(self):
-        self.nodes: list[Node] = []
-        self.elements: list[Elem] = []
+        self._n_nodes: int = 0
+        self._n_elems: int = 0
+        self._coords:    np.ndarray = np.zeros((0, 3), dtype=float)
+        self._dof_fixed: np.ndarray = np.zeros((0, DOF), dtype=bool)
+        self._loads:     np.ndarray = np.zeros((0, DOF), dtype=float)
+        self._conn:      np.ndarray = np.zeros((0, 3), dtype=np.int32)
+        self._tags:      np.ndarray = np.zeros(0, dtype=int)
+        self._node_views: list[NodeView] = None
+        self._elem_views: list[ElemView] = None
+        self._node_index: NodeIndex = None
+
+    @classmethod
+    def new_from_arrays(cls, coords: np.ndarray, conn: np.ndarray) -> 'Mesh':
+        m = cls()
+        m.set_arrays(coords, conn)
+        return m
+
+    def set_arrays(self, coords: np.ndarray, conn: np.ndarray):
+        '''Задать сетку целиком, граничные условия и метки сбрасываются.'''
+        self._n_nodes = coords.shape[0]
+        self._n_elems = conn.shape[0]
+        self._coords    = np.array(coords, dtype=float).reshape(self._n_nodes, 3)
+        self._dof_fixed = np.zeros((self._n_nodes, DOF), dtype=bool)
+        self._loads     = np.zeros((self._n_nodes, DOF), dtype=float)
+        self._conn      = np.array(conn, dtype=np.int32).reshape(self._n_elems, 3)
+        self._tags      = np.zeros(self._n_elems, dtype=int)
+        self.__invalidate_views()
+
+    @property
+    def coords(self) -> np.ndarray:
+        return self._coords[:self._n_nodes]
+
+    @property
+    def dof_fixed(self) -> np.ndarray:
+        return self._dof_fixed[:self._n_nodes]
+
+    @property
+    def loads(self) -> np.ndarray:
+        return self._loads[:self._n_nodes]
+
+    @property
+    def conn(self) -> np.ndarray:
+        return self._conn[:self._n_elems]
+
+    @property
+    def tags(self) -> np.ndarray:
+        return self._tags[:self._n_elems]
+
+    @property
+    def nodes(self) -> list[NodeView]:
+        if self._node_views is None:
+            self._node_views = [NodeView(self, i) for i in range(self._n_nodes)]
+        return self._node_views
+
+    @property
+    def elements(self) -> list[ElemView]:
+        if self._elem_views is None:
+            self._elem_views = [ElemView(self, e) for e in range(self._n_elems)]
+        return self._elem_views
+
+    def __invalidate_views(self):
+        self._node_views = None
+        self._elem_views = None
+        self._node_index = None
+
+    def get_node_index(self) -> NodeIndex:
+        '''
+        Пространственный индекс узлов, строится один раз при первом запросе.
+        Если координаты узлов изменяются напрямую через coords, индекс нужно
+        сбросить вызовом reset_node_index().
+        '''
+        if self._node_index is None:
+            self._node_index = NodeIndex(self.coords)
+        return self._node_index
+
+    def reset_node_index(self):
+        self._node_index = None
+
+    def get_node(self, index: int) -> NodeView:
+        return self.nodes[index]
+
+    def get_element(self, index: int) -> ElemView:
+        return self.elements[index]
 
     def add_node(self, node: Node):
-        self.nodes.append(node)
+        i = self._n_nodes
+        assert node.index == i
+        self._coords    = _reserve(self._coords, i + 1)
+        self._dof_fixed = _reserve(self._dof_fixed, i + 1)
+        self._loads     = _reserve(self._loads, i + 1)
+        self._coords[i]    = (node.x, node.y, node.z)
+        self._dof_fixed[i] = node.constraint_vector.to_array()
+        self._loads[i]     = node.force_vector.to_array()
+        self._n_nodes += 1
+        self.__invalidate_views()
 
     def add_element(self, i_index: int, j_index: int, k_index: int):
-        elem = Elem(self.nodes[i_index],
-                    self.nodes[j_index],
-                    self.nodes[k_index])
-        
-        self.elements.append(elem)
+        e = self._n_elems
+        assert max(i_index, j_index, k_index) < self._n_nodes
+        self._conn = _reserve(self._conn, e + 1)
+        self._tags = _reserve(self._tags, e + 1)
+        self._conn[e] = (i_index, j_index, k_index)
+        self._tags[e] = 0
+        self._n_elems += 1
+        self.__invalidate_views()
 
     def set_tag_to_all_elements(self, tag: int):
-        for e in self.elements:
-            e.set_tag(tag)
+        self.tags[:] = tag
+
+    def get_areas(self) -> np.ndarray:
+        '''Площади элементов [n_elems].'''
+        xyz = self.coords[self.conn]
+        u = np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0])
+        return 0.5 * np.sqrt(np.sum(u * u, axis=1))
 
     def area(self) -> float:
-        a = 0
-        for elem in self.elements:
-            a += elem.area()
-        return a
+        return float(np.sum(self.get_areas()))
 
     def get_n_nodes(self) -> int:
-        return len(self.nodes)
+        return self._n_nodes
 
     def get_n_elements(self) -> int:
-        return len(self.elements)
-    
+        return self._n_elems
+
+    def get_coords(self) -> np.ndarray:
+        '''Координаты узлов [n_nodes x 3], строка соответствует индексу узла.'''
+        return self.coords
+
+    def get_connectivity(self) -> np.ndarray:
+        '''Индексы узлов элементов [n_elems x 3].'''
+        return self.conn
+
+    def get_node_adjacency(self) -> sparse.csr_matrix:
+        '''
+        Матрица смежности узлов [n_nodes x n_nodes] (включая диагональ):
+        узлы смежны, если принадлежат одному элементу. Ее портрет совпадает
+        с портретом глобальной матрицы жесткости с точностью до блоков.
+        '''
+        conn = self.get_connectivity()
+        n_elems = conn.shape[0]
+        rows = np.broadcast_to(conn[:, :, np.newaxis], (n_elems, 3, 3)).ravel()
+        cols = np.broadcast_to(conn[:, np.newaxis, :], (n_elems, 3, 3)).ravel()
+        vals = np.ones(rows.shape[0], dtype=float)
+        n = self.get_n_nodes()
+        adj = sparse.csr_matrix((vals, (rows, cols)), shape=(n, n))
+        adj.data.fill(1.0)
+        return adj
+
+    def get_edges(self) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Ребра сетки: edges - индексы узлов ребер [n_edges x 2], меньший
+        индекс первый; elem_edges - номера ребер элементов [n_elems x 3],
+        ребро e элемента соединяет его узлы e и (e + 1) % 3.
+        '''
+        conn = self.get_connectivity()
+        pairs = np.stack([conn, np.roll(conn, -1, axis=1)], axis=2).reshape(-1, 2)
+        pairs = np.sort(pairs, axis=1)
+        edges, elem_edges = np.unique(pairs, axis=0, return_inverse=True)
+        return edges, elem_edges.reshape(-1, 3)
+
+    def get_tributary_lengths(self, nodes: np.ndarray) -> np.ndarray:
+        '''
+        Длины, приходящиеся на узлы nodes: половина суммы длин ребер сетки,
+        соединяющих узел с другими узлами из nodes. Для узлов края это
+        длины, по которым распределяется погонная нагрузка.
+        '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        in_set = np.zeros(self.get_n_nodes(), dtype=bool)
+        in_set[nodes] = True
+        edges, _ = self.get_edges()
+        edges = edges[np.all(in_set[edges], axis=1)]
+
+        coords = self.get_coords()
+        edge_len = np.linalg.norm(coords[edges[:, 1]] - coords[edges[:, 0]], axis=1)
+        lengths = np.zeros(self.get_n_nodes(), dtype=float)
+        np.add.at(lengths, edges, 0.5 * edge_len[:, np.newaxis])
+        return lengths[nodes]
+
+    def refine(self, marked: np.ndarray) -> 'Mesh':
+        '''
+        Измельчить сетку бисекцией по наибольшему ребру (Rivara).
+        marked - булева маска элементов [n_elems], которые нужно разделить.
+        Делится наибольшее ребро каждого отмеченного элемента; соседний
+        элемент, у которого делится какое-либо ребро, делит и свое
+        наибольшее ребро (замыкание), поэтому сетка остается согласованной.
+        Элемент делится на 2, 3 или 4 треугольника с тем же направлением
+        обхода, метки элементов наследуются. Узлы сохраняют индексы, новые
+        узлы добавляются в конец. Возвращает новую сетку, граничные условия
+        не переносятся.
+        '''
+        coords = self.get_coords()
+        conn = self.get_connectivity()
+        n_elems = conn.shape[0]
+        edges, elem_edges = self.get_edges()
+        n_edges = edges.shape[0]
+
+        d = coords[edges[:, 1]] - coords[edges[:, 0]]
+        edge_len2 = np.sum(d * d, axis=1)
+        loc = np.argmax(edge_len2[elem_edges], axis=1)
+        longest = elem_edges[np.arange(n_elems), loc]
+
+        marked = np.asarray(marked, dtype=bool)
+        split = np.zeros(n_edges, dtype=bool)
+        split[longest[marked]] = True
+
+        # Замыкание: элемент с разделенным ребром делит наибольшее ребро
+        while True:
+            add = split[elem_edges].any(axis=1) & ~split[longest]
+            if not add.any():
+                break
+            split[longest[add]] = True
+
+        # Новые узлы в серединах разделенных ребер
+        n_nodes = coords.shape[0]
+        split_edges = np.flatnonzero(split)
+        mid = np.full(n_edges, -1, dtype=np.int64)
+        mid[split_edges] = n_nodes + np.arange(split_edges.shape[0])
+        new_coords = np.concatenate([coords, 0.5 * (coords[edges[split_edges, 0]] +
+                                                    coords[edges[split_edges, 1]])])
+
+        # Узлы a, b, c элемента: ab - наибольшее ребро, обход сохраняется
+        e = np.arange(n_elems)
+        a = conn[e, loc]
+        b = conn[e, (loc + 1) % 3]
+        c = conn[e, (loc + 2) % 3]
+        m_ab = mid[longest]
+        m_bc = mid[elem_edges[e, (loc + 1) % 3]]
+        m_ca = mid[elem_edges[e, (loc + 2) % 3]]
+
+        divided = m_ab >= 0
+        left_2 = divided & (m_ca >= 0)
+        right_2 = divided & (m_bc >= 0)
+
+        # (a, m, c) и (m, b, c), при делении ca и bc - еще пополам
+        parts = [
+            (~divided,            np.stack([a, b, c], axis=1)),
+            (divided & ~left_2,   np.stack([a, m_ab, c], axis=1)),
+            (left_2,              np.stack([a, m_ab, m_ca], axis=1)),
+            (left_2,              np.stack([m_ab, c, m_ca], axis=1)),
+            (divided & ~right_2,  np.stack([m_ab, b, c], axis=1)),
+            (right_2,             np.stack([m_ab, b, m_bc], axis=1)),
+            (right_2,             np.stack([m_ab, m_bc, c], axis=1)),
+        ]
+        new_conn = np.concatenate([elems[mask] for mask, elems in parts])
+        new_tags = np.concatenate([self.tags[mask] for mask, _ in parts])
+
+        mesh = Mesh.new_from_arrays(new_coords, new_conn)
+        mesh.tags[:] = new_tags
+        return mesh
+
+    def renumber_nodes(self, perm: np.ndarray):
+        '''Перенумеровать узлы: узел со старым индексом perm[i] получает индекс i.'''
+        perm = np.asarray(perm)
+        assert perm.shape[0] == self._n_nodes
+        inv_perm = np.empty_like(perm)
+        inv_perm[perm] = np.arange(perm.shape[0])
+
+        self._coords    = self.coords[perm]
+        self._dof_fixed = self.dof_fixed[perm]
+        self._loads     = self.loads[perm]
+        self._conn      = inv_perm[self.conn].astype(np.int32)
+        self._tags      = self.tags.copy()
+        self.__invalidate_views()
+
+    def renumber_rcm(self, compute_fill: bool = False) -> 'RenumberingReport':
+        '''
+        Перенумеровать узлы обратным алгоритмом Катхилла-Макки
+        для уменьшения ширины ленты матрицы жесткости.
+        '''
+        adj = self.get_node_adjacency()
+        report = RenumberingReport()
+        report.set_before(adj, compute_fill)
+
+        perm = csgraph.reverse_cuthill_mckee(adj, symmetric_mode=True)
+        self.renumber_nodes(perm)
+        report.perm = perm
+
+        adj = adj[perm][:, perm]
+        report.set_after(adj, compute_fill)
+        return report
+
+    def find_nodes_near_point(self,
+                              px: float, py: float, pz: float,
+                              eps: float) -> np.ndarray:
+        '''Индексы узлов, находящихся ближе eps к точке.'''
+        return self.get_node_index().find_near_point((px, py, pz), eps)
+
+    def find_nodes_on_edge(self,
+                           x1: float, y1: float, z1: float,
+                           x2: float, y2: float, z2: float,
+                           eps: float) -> np.ndarray:
+        '''Индексы узлов, находящихся ближе eps к прямой, проходящей через две точки.'''
+        return self.get_node_index().find_on_line((x1, y1, z1), (x2, y2, z2), eps)
+
+    def find_nodes_in_box(self,
+                          x1: float, y1: float, z1: float,
+                          x2: float, y2: float, z2: float) -> np.ndarray:
+        '''Индексы узлов внутри параллелепипеда, заданного углами (x1, y1, z1), (x2, y2, z2).'''
+        return self.get_node_index().find_in_box((x1, y1, z1), (x2, y2, z2))
+
+    def find_nodes_in_polygon(self, polygon: np.ndarray) -> np.ndarray:
+        '''Индексы узлов, проекции которых на плоскость XY лежат внутри многоугольника.'''
+        return self.get_node_index().find_in_polygon(polygon)
+
     def select_nodes_near_point(self, 
                                 px: float, py: float, pz: float, 
                                 eps: float) -> list[Node]:
-        selected = []
-        for node in self.nodes:
-            if node.is_near_point(px, py, pz, eps):
-                selected.append(node)
-        return selected
+        indeces = self.find_nodes_near_point(px, py, pz, eps)
+        return [self.get_node(i) for i in indeces]
     
     def select_nodes_on_edge(self, 
                              x1: float, y1: float, z1: float,
                              x2: float, y2: float, z2: float,
                              eps: float) -> list[Node]:
-        selected = []
-        for node in self.nodes:
-            if node.is_on_edge(x1, y1, z1, x2, y2, z2, eps):
-                selected.append(node)
-        return selected
+        indeces = self.find_nodes_on_edge(x1, y1, z1, x2, y2, z2, eps)
+        return [self.get_node(i) for i in indeces]
     
     def clear_constraints(self):
-        for node in self.nodes:
-            node.clear_constraint()
+        self.dof_fixed[:] = False
 
     def clear_forces(self):
-        for node in self.nodes:
-            node.clear_force()
+        self.loads[:] = 0.0
 
     def print(self):
         print("\nmesh info:")
         print("nodes: ", self.get_n_nodes())
         print("elems: ", self.get_n_elements())
 
-        for node in self.nodes:
-            print(f"node {node.index}, {node.x}, {node.y}, {node.z}")
+        for i, (x, y, z) in enumerate(self.coords):
+            print(f"node {i}, {x}, {y}, {z}")
 
-        for elem in self.elements:
-            print(f"elem {elem.i.index}, {elem.j.index}, {elem.k.index}")
+        for i, j, k in self.conn:
+            print(f"elem {i}, {j}, {k}")
         
     
 
+def get_bandwidth(adj: sparse.spmatrix) -> int:
+    '''Ширина полуленты: max |i - j| по ненулевым элементам.'''
+    adj = adj.tocoo()
+    if adj.nnz == 0:
+        return 0
+    return int(np.abs(adj.row - adj.col).max())
+
+
+def get_profile(adj: sparse.spmatrix) -> int:
+    '''
+    Профиль (размер оболочки) симметричной матрицы: сумма по строкам
+    расстояний от первого ненулевого элемента до диагонали. Разложение
+    без перестановок не выходит за пределы оболочки, поэтому это оценка
+    сверху для заполнения.
+    '''
+    adj = sparse.csr_matrix(adj)
+    n = adj.shape[0]
+    if adj.nnz == 0:
+        return 0
+    starts = np.minimum(adj.indptr[:-1], adj.nnz - 1)
+    first_col = np.minimum.reduceat(adj.indices, starts)
+    first_col = np.where(np.diff(adj.indptr) > 0, first_col, np.arange(n))
+    return int(np.sum(np.maximum(np.arange(n) - first_col, 0)))
+
+
+def get_fill(adj: sparse.spmatrix) -> int:
+    '''
+    Заполнение: число ненулевых элементов в L и U при разложении
+    матрицы с портретом adj без перестановок.
+    '''
+    n = adj.shape[0]
+    m = sparse.csc_matrix(adj, dtype=float, copy=True)
+    m.data.fill(-1.0)
+    m = m + sparse.identity(n, format='csc') * (n + 1)
+    lu = splinalg.splu(m, permc_spec="NATURAL", diag_pivot_thresh=0.0,
+                       options=dict(SymmetricMode=True))
+    return lu.L.nnz + lu.U.nnz
+
+
+class RenumberingReport:
+    '''Характеристики портрета матрицы до и после перенумерации узлов.'''
+
+    def __init__(self):
+        self.bandwidth_before: int = 0
+        self.bandwidth_after:  int = 0
+        self.profile_before:   int = 0
+        self.profile_after:    int = 0
+
+        # Вычисляются только по запросу (compute_fill), -1 - не вычислялось.
+        self.fill_before: int = -1
+        self.fill_after:  int = -1
+
+        # Узел со старым индексом perm[i] получил индекс i.
+        self.perm: np.ndarray = None
+
+    def set_before(self, adj: sparse.spmatrix, compute_fill: bool):
+        self.bandwidth_before = get_bandwidth(adj)
+        self.profile_before = get_profile(adj)
+        if compute_fill:
+            self.fill_before = get_fill(adj)
+
+    def set_after(self, adj: sparse.spmatrix, compute_fill: bool):
+        self.bandwidth_after = get_bandwidth(adj)
+        self.profile_after = get_profile(adj)
+        if compute_fill:
+            self.fill_after = get_fill(adj)
+
+    def __str__(self):
+        info = (f"bandwidth: {self.bandwidth_before} -> {self.bandwidth_after}, "
+                f"profile: {self.profile_before} -> {self.profile_after}")
+        if self.fill_before >= 0:
+            info += f", fill: {self.fill_before} -> {self.fill_after}"
+        return info
+
+
 # -----------------------------------------------------------------------------
 
 
@@ -261,56 +860,51 @@ class Quad:
         self.b.translate_mod(dx, dy, dz)
         self.d.translate_mod(dx, dy, dz)
 
-    def __create_nodes(self, mesh: Mesh, n_len: int, n_wid: int):
+    def __create_nodes(self, n_len: int, n_wid: int) -> np.ndarray:
         a = self.a
         b = self.b
         d = self.d
 
-        dx1 = (d.x - a.x) / n_len
-        dy1 = (d.y - a.y) / n_len
-        dz1 = (d.z - a.z) / n_len
-
-        dx2 = (b.x - a.x) / n_wid
-        dy2 = (b.y - a.y) / n_wid
-        dz2 = (b.z - a.z) / n_wid
-
-        for j in range(n_wid + 1):
-            for i in range(n_len + 1):
-                n = (n_len + 1) * j + i
-                x = a.x + (i * dx1 + j * dx2)
-                y = a.y + (i * dy1 + j * dy2)
-                z = a.z + (i * dz1 + j * dz2)
-                node = Node(n, x, y, z)
-                mesh.add_node(node)
+        a_xyz = np.array([a.x, a.y, a.z], dtype=float)
+        d1 = (np.array([d.x, d.y, d.z], dtype=float) - a_xyz) / n_len
+        d2 = (np.array([b.x, b.y, b.z], dtype=float) - a_xyz) / n_wid
+
+        # Node n = (n_len + 1) * j + i, i - along the length, j - along the width.
+        i = np.tile(np.arange(n_len + 1), n_wid + 1)
+        j = np.repeat(np.arange(n_wid + 1), n_len + 1)
+        coords = a_xyz + (i[:, np.newaxis] * d1 + j[:, np.newaxis] * d2)
+        return coords
     
-    def __create_elements_tria(self, mesh: Mesh, n_len: int, n_wid: int, start_variant: int):
+    def __create_elements_tria(self, n_len: int, n_wid: int, start_variant: int) -> np.ndarray:
         assert start_variant == 1 or start_variant == -1
-        for j in range(n_wid):
-            variant = start_variant
-            for i in range(0, n_len):
-
-                # n01 --- n11
-                #  |       |
-                #  |       |
-                # n00 --- n10
-
-                n00 = j * (n_len + 1) + i
-                n10 = n00 + 1
-                n01 = (j + 1) * (n_len + 1) + i
-                n11 = n01 + 1
-
-                if variant == 1:
-                    mesh.add_element(n00, n10, n11)
-                    mesh.add_element(n11, n01, n00)
-                else:
-                    mesh.add_element(n00, n10, n01)
-                    mesh.add_element(n11, n01, n10)
-                
-                variant *= -1
-            start_variant *= -1
+
+        # n01 --- n11
+        #  |       |
+        #  |       |
+        # n00 --- n10
+
+        j, i = np.meshgrid(np.arange(n_wid), np.arange(n_len), indexing='ij')
+        n00 = j * (n_len + 1) + i
+        n10 = n00 + 1
+        n01 = (j + 1) * (n_len + 1) + i
+        n11 = n01 + 1
+
+        # Diagonal direction alternates along both directions.
+        variant = start_variant * (1 - 2 * ((i + j) % 2))
+        v1 = (variant == 1)[:, :, np.newaxis]
+
+        elem_1 = np.where(v1,
+                          np.stack([n00, n10, n11], axis=-1),
+                          np.stack([n00, n10, n01], axis=-1))
+        
+        elem_2 = np.where(v1,
+                          np.stack([n11, n01, n00], axis=-1),
+                          np.stack([n11, n01, n10], axis=-1))
+
+        conn = np.stack([elem_1, elem_2], axis=2)
+        return conn.reshape(-1, 3)
     
     def mesh_tria(self, n_len: int, n_wid: int, start_variant: int):
-        m = Mesh()
-        self.__create_nodes(m, n_len, n_wid)
-        self.__create_elements_tria(m, n_len, n_wid, start_variant)
-        return m
+        coords = self.__create_nodes(n_len, n_wid)
+        conn = self.__create_elements_tria(n_len, n_wid, start_variant)
+        return Mesh.new_from_arrays(coords, conn)
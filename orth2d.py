@@ -82,6 +82,18 @@ class Orth2d:
         # Матрица упругости (мембранная)
         self.q12 = np.zeros((3, 3), dtype=float)
 
+        # Обратные величины пределов прочности и коэффициенты критериев,
+        # вычисляются в compute() для векторизованных критериев.
+        self.inv_sig1t = 0.0
+        self.inv_sig1c = 0.0
+        self.inv_sig2t = 0.0
+        self.inv_sig2c = 0.0
+        self.fss       = 0.0  # 1 / tau_max^2
+        self.fx        = 0.0  # 1 / sig1t - 1 / sig1c
+        self.fy        = 0.0  # 1 / sig2t - 1 / sig2c
+        self.fxx       = 0.0  # 1 / (sig1t * sig1c)
+        self.fyy       = 0.0  # 1 / (sig2t * sig2c)
+
     def compute(self):
         '''Подготовить перед использованием в прочностных расчетах'''
 
@@ -107,6 +119,24 @@ class Orth2d:
         self.q12[1, 1] = self.e2 / k
         self.q12[2, 2] = self.g12
 
+        self.__compute_strength_reciprocals()
+
+    def __compute_strength_reciprocals(self):
+        def inv(v: float) -> float:
+            # Незаданный предел прочности оставляем нулевым,
+            # векторизованные критерии проверяют его в __check_strengths().
+            return 1 / v if v != 0.0 else 0.0
+
+        self.inv_sig1t = inv(self.sig1t)
+        self.inv_sig1c = inv(self.sig1c)
+        self.inv_sig2t = inv(self.sig2t)
+        self.inv_sig2c = inv(self.sig2c)
+        self.fss       = inv(self.tau_max) ** 2
+        self.fx        = self.inv_sig1t - self.inv_sig1c
+        self.fy        = self.inv_sig2t - self.inv_sig2c
+        self.fxx       = self.inv_sig1t * self.inv_sig1c
+        self.fyy       = self.inv_sig2t * self.inv_sig2c
+
     def get_sig12(self, eps12: np.ndarray) -> np.ndarray:
         return self.q12.dot(eps12)
     
@@ -223,5 +253,100 @@ class Orth2d:
         ]
         return criteria
     
+    # -------------------------------------------------------------------------
+    # Векторизованные критерии.
+    # sig12 - массив напряжений [N x 3], результат - массивы
+    # (индекс разрушения, коэффициент запаса, запас прочности) длины N.
+    # Коэффициенты берутся из compute(). Как и скалярные критерии, они
+    # требуют заданных пределов прочности.
+
+    def __check_strengths(self):
+        for name in ("sig1t", "sig1c", "sig2t", "sig2c", "tau_max"):
+            if getattr(self, name) == 0.0:
+                raise Exception(f"Parameter {name} of material {self.name} is not setted.")
+
+    def get_criterion_max_stress_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.__check_strengths()
+        sig1  = sig12[..., 0]
+        sig2  = sig12[..., 1]
+        tau12 = sig12[..., 2]
+
+        v1 = np.abs(sig1) * np.where(sig1 >= 0.0, self.inv_sig1t, self.inv_sig1c)
+        v2 = np.abs(sig2) * np.where(sig2 >= 0.0, self.inv_sig2t, self.inv_sig2c)
+        v3 = np.abs(tau12) * np.sqrt(self.fss)
+
+        fi = np.maximum(np.maximum(v1, v2), v3)
+        with np.errstate(divide='ignore'):
+            fos = 1 / fi
+        mos = fos - 1
+        return fi, fos, mos
+
+    def get_criterion_hill_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.__check_strengths()
+        sig1  = sig12[..., 0]
+        sig2  = sig12[..., 1]
+        tau12 = sig12[..., 2]
+
+        fxx = np.where(sig1 >= 0.0, self.inv_sig1t, self.inv_sig1c) ** 2
+        fyy = np.where(sig2 >= 0.0, self.inv_sig2t, self.inv_sig2c) ** 2
+        fxy = -np.where(sig1 * sig2 >= 0.0, self.inv_sig1t, self.inv_sig1c) ** 2
+
+        fi = (fxx * sig1 ** 2 +
+              fyy * sig2 ** 2 +
+              fxy * sig1 * sig2 +
+              self.fss * tau12 ** 2)
+
+        with np.errstate(divide='ignore'):
+            fos = 1 / np.sqrt(fi)
+        mos = fos - 1
+        return fi, fos, mos
+
+    def __get_quadratic_criterion_arrays(self, sig12: np.ndarray, fxy: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.__check_strengths()
+        sig1  = sig12[..., 0]
+        sig2  = sig12[..., 1]
+        tau12 = sig12[..., 2]
+
+        a = (self.fxx * (sig1 ** 2) +
+             self.fyy * (sig2 ** 2) +
+             fxy * (sig1 * sig2) +
+             self.fss * (tau12 ** 2))
+
+        b = self.fx * sig1 + self.fy * sig2
+
+        fi = a + b
+
+        d = np.sqrt(b ** 2 + 4 * a)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fos = (-b + d) / (2 * a)
+        mos = fos - 1
+        return fi, fos, mos
+
+    def get_criterion_tsai_wu_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # coefficient of interaction
+        ixy = 1
+        fxy = -(ixy * sqrt(self.fxx * self.fyy))
+        return self.__get_quadratic_criterion_arrays(sig12, fxy)
+
+    def get_criterion_hoffman_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        fxy = -self.fxx
+        return self.__get_quadratic_criterion_arrays(sig12, fxy)
+
+    def get_criteria_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Все критерии для массива напряжений sig12 [N x 3].
+        Возвращает (fi, fos, mos) - массивы [N x 4], столбцы в порядке CriterionType.
+        '''
+        criteria = [
+            self.get_criterion_max_stress_arrays(sig12),
+            self.get_criterion_hill_arrays(sig12),
+            self.get_criterion_tsai_wu_arrays(sig12),
+            self.get_criterion_hoffman_arrays(sig12)
+        ]
+        fi  = np.stack([c[0] for c in criteria], axis=-1)
+        fos = np.stack([c[1] for c in criteria], axis=-1)
+        mos = np.stack([c[2] for c in criteria], axis=-1)
+        return fi, fos, mos
+
     def is_isotropic(self) -> bool:
         math_utils.nearly_equal(self.e1, self.e2, 1e-3)
@@ -1,12 +1,16 @@
 from enum import Enum
+from typing import Callable
 import math
-from math_utils import SpBuilder
+import math_utils
+from math_utils import AssemblyPattern
 from shellmat import ShellMaterial
 from meshing import *
 from validation import *
-from fea import Fe3
+from fea import Fe3Batch
 import numpy as np
-from scipy.sparse.linalg import spsolve
+from scipy import sparse
+from solvers import LinearSolver, SolveInfo, SpsolveSolver
+from storage import ArrayStore
 import pyvista
 
 
@@ -21,32 +25,185 @@ class NodeGroup(Enum):
     BOT = 8
 
 
+class PanelChange(Enum):
+    MESH        = 1
+    MATERIAL    = 2
+    CONSTRAINTS = 3
+    FORCES      = 4
+    SOLVER      = 5
+
+
+class ElementResults:
+    '''Strains and stresses of all elements, the first axis is element index.'''
+
+    def __init__(self):
+        self.eps_xy: np.ndarray = None
+        '''Membrane strains (eps_x, eps_y, gamma_xy) in panel coordinates [n_elems x 3].'''
+
+        self.kappa_xy: np.ndarray = None
+        '''Curvatures (kappa_x, kappa_y, kappa_xy) in panel coordinates [n_elems x 3], zero for membrane.'''
+
+        self.loads: np.ndarray = None
+        '''Distributed loads (Nx, Ny, Nxy, Mx, My, Mxy) [n_elems x 6].'''
+
+        self.eps12: np.ndarray = None
+        '''Ply strains in ply coordinates (12) [n_elems x n_plies x 3].'''
+
+        self.sig12: np.ndarray = None
+        '''Ply stresses in ply coordinates (12) [n_elems x n_plies x 3].'''
+
+        self.failure_index: np.ndarray = None
+        '''Ply failure indices [n_elems x n_plies x 4], columns in CriterionType order.'''
+
+        self.factor_of_safety: np.ndarray = None
+        '''Ply factors of safety [n_elems x n_plies x 4].'''
+
+        self.margin_of_safety: np.ndarray = None
+        '''Ply margins of safety [n_elems x n_plies x 4].'''
+
+
+class LoadCaseResult:
+    def __init__(self, name: str, f_glob: np.ndarray, d_glob: np.ndarray):
+        self.name = name
+        self.f_glob: np.ndarray = f_glob # force vector
+        self.d_glob: np.ndarray = d_glob # displacement vector
+        self.disp_mag: np.ndarray = None # displacement magnitudes
+        self.elem_results: ElementResults = None # filled on demand by Panel.get_load_case_element_results()
+
+
+class StageListener:
+    '''
+    Observer of Panel.compute() stages. run_stage() is called instead of
+    each stage and has to call stage() itself, so it can measure it.
+    '''
+
+    def begin_compute(self, panel: 'Panel'):
+        '''Called at the start of compute(), after panel.last_changes is set.'''
+        pass
+
+    def run_stage(self, panel: 'Panel', name: str, stage: Callable[[], None]):
+        stage()
+
+    def end_compute(self, panel: 'Panel'):
+        '''Called at the end of compute(), also when one of the stages raised.'''
+        pass
+
+
 class Panel:
     ERR_LENGTH_NOT_SET      = "Panel length is not setted."
     ERR_WIDTH_NOT_SET       = "Panel width is not setted."
     ERR_ELEM_LENGTH_NOT_SET = "Mesh element length is not setted."
 
-    def __init__(self, length: float, width: float):
+    def __init__(self, length: float, width: float, dof: int = 2):
+        if dof not in (2, 6):
+            raise Exception(f"Panel supports 2 (membrane) or 6 (shell) dofs per node, not {dof}.")
+
         self.length:      float = length
         self.width:       float = width
         self.material:    ShellMaterial = None
         self.elem_length: float = 0.0
         self.mesh:        Mesh = None
-        self.node_groups: dict[NodeGroup, list[Node]] = None
+        self.node_groups: dict[NodeGroup | str, np.ndarray] = None # node indeces of groups
+        self.user_node_groups: dict[str, Callable[[Mesh], np.ndarray]] = {}
         self.constraints: dict[NodeGroup, ConstraintVector] = {}
         self.forces:      dict[NodeGroup, ForceVector] = {}
-        self.dof = 2
+        self.load_cases:  dict[str, dict[NodeGroup, ForceVector]] = {}
+        self.node_group_weights: dict[NodeGroup | str, np.ndarray] = {}
+        '''
+        Force multipliers of the nodes of loaded groups after refine_mesh(),
+        the force of a group without weights is applied to every its node.
+        '''
+
+        self.dof = dof
+        '''Dofs per node: 2 - membrane (u, v), 6 - shell (u, v, w, rx, ry, rz).'''
+
+        self.reduce_fixed_dofs: bool = False
+        '''
+        If True, fixed dofs are removed from the system of equations,
+        otherwise their rows and columns are zeroed out and 1.0 is placed
+        on the diagonal.
+        '''
+
+        self.memory_limit: int = None
+        '''
+        Memory ceiling for element data, bytes. If set, elements are computed
+        and assembled in chunks that fit in it, then discarded; only compact
+        element arrays (Fe3Batch.COMPACT_ARRAYS) are kept for results.
+        The sparsity pattern (assembly_pattern) is kept during the whole
+        computation, it is counted in the ceiling and chunks get the rest,
+        but not less than 64 elements. None - all elements at once.
+        The matrix itself and compact arrays are not limited.
+        '''
+
+        self.elem_data_path: str = None
+        '''Directory for memory-mapped compact element arrays if memory_limit is set, None - in RAM.'''
+
+        self.elem_chunk_size: int = 0
+        '''Elements per chunk of the last chunked computation, 0 - all at once.'''
+
+        self.renumber_nodes: bool = False
+        '''If True, do_mesh() renumbers nodes to reduce the stiffeness matrix bandwidth.'''
+
+        self.renumbering_fill: bool = False
+        '''If True, renumbering report also contains factorization fill (expensive).'''
+
+        self.renumbering_report: RenumberingReport = None
+
+        self.solver: LinearSolver = SpsolveSolver()
+        '''Solver for the system of equations, see module solvers.'''
+
+        self.stage_listener: StageListener = None
+        '''Observer of compute() stages (profiling, logging), None - stages are just run.'''
+
+        self.plotter: pyvista.Plotter = None
+        '''Plotter reused by show functions, see get_plotter().'''
 
         # --- fea data and results --- #
-        self.fin_elems:   list[Fe3] = None
-        self.fixed_dofs:  list[int] = None
-        self.sp_builder:  SpBuilder = None
+        self.fe3_batch:   Fe3Batch = None
+        self.fixed_dofs:  np.ndarray = None
+        self.free_dofs:   np.ndarray = None
+        self.assembly_pattern: AssemblyPattern = None
+        '''Sparsity pattern of the stiffeness matrix, it's built once per mesh and dof.'''
 
         # [K] * {F} = {D}
         self.k_glob = None # stiffeness matrix of the whole construction
         self.f_glob: np.ndarray = None # force vector
         self.d_glob: np.ndarray = None # displacement vector
         self.disp_mag: np.ndarray = None # displacement magnitudes
+        self.solve_info: SolveInfo = None # residual, iterations and timings of the last solve
+        self.load_case_results: dict[str, LoadCaseResult] = {} # results of named load cases
+        self.elem_results: ElementResults = None # strains and stresses of elements
+        self.k_glob_raw = None # stiffeness matrix without constraints
+
+        # --- state of the last compute() --- #
+        self.last_changes: set[PanelChange] = set()
+        '''Changes detected by the last compute(), they define recomputed stages.'''
+
+        self.__pending_changes:      set[PanelChange] = set(PanelChange)
+        self.__computed_mesh:        Mesh = None
+        self.__computed_dof:         int = None
+        self.__computed_material:    ShellMaterial = None
+        self.__computed_constraints: tuple = None
+        self.__computed_forces:      tuple = None
+        self.__computed_solver:      tuple = None
+        self.__assembly_pattern_key: tuple = None
+        self.__k_glob_data: np.ndarray = None
+
+        # --- visualization cache --- #
+        self.__poly_data:      pyvista.PolyData = None
+        self.__poly_data_mesh: Mesh = None
+
+    def mark_changed(self, change: PanelChange):
+        '''
+        Force recomputation of the stages that depend on change. It's needed
+        only for in-place modifications, e.g. when the material object is
+        recomputed with other plies. Reassigning mesh, material, solver and
+        setting constraints or forces are detected by compute() itself.
+        '''
+        self.__pending_changes.add(change)
+
+    def set_solver(self, solver: LinearSolver):
+        self.solver = solver
 
     def set_material(self, material: ShellMaterial):
         self.material = material
@@ -75,26 +232,29 @@ class Panel:
         W = self.width
         eps = 1e-6
 
-        self.node_groups[NodeGroup.N00] = self.mesh.select_nodes_near_point(0, 0, 0, eps)
-        self.node_groups[NodeGroup.N01] = self.mesh.select_nodes_near_point(0, W, 0, eps)
-        self.node_groups[NodeGroup.N10] = self.mesh.select_nodes_near_point(L, 0, 0, eps)
-        self.node_groups[NodeGroup.N11] = self.mesh.select_nodes_near_point(L, W, 0, eps)
+        self.node_groups[NodeGroup.N00] = self.mesh.find_nodes_near_point(0, 0, 0, eps)
+        self.node_groups[NodeGroup.N01] = self.mesh.find_nodes_near_point(0, W, 0, eps)
+        self.node_groups[NodeGroup.N10] = self.mesh.find_nodes_near_point(L, 0, 0, eps)
+        self.node_groups[NodeGroup.N11] = self.mesh.find_nodes_near_point(L, W, 0, eps)
 
-        self.node_groups[NodeGroup.LFT] = self.mesh.select_nodes_on_edge(0, 0, 0, 
-                                                                         0, W, 0,
-                                                                         eps)
+        self.node_groups[NodeGroup.LFT] = self.mesh.find_nodes_on_edge(0, 0, 0, 
+                                                                       0, W, 0,
+                                                                       eps)
         
-        self.node_groups[NodeGroup.RGT] = self.mesh.select_nodes_on_edge(L, 0, 0, 
-                                                                         L, W, 0,
-                                                                         eps)
+        self.node_groups[NodeGroup.RGT] = self.mesh.find_nodes_on_edge(L, 0, 0, 
+                                                                       L, W, 0,
+                                                                       eps)
         
-        self.node_groups[NodeGroup.TOP] = self.mesh.select_nodes_on_edge(0, W, 0, 
-                                                                         L, W, 0,
-                                                                         eps)
+        self.node_groups[NodeGroup.TOP] = self.mesh.find_nodes_on_edge(0, W, 0, 
+                                                                       L, W, 0,
+                                                                       eps)
         
-        self.node_groups[NodeGroup.BOT] = self.mesh.select_nodes_on_edge(0, 0, 0, 
-                                                                         L, 0, 0,
-                                                                         eps)
+        self.node_groups[NodeGroup.BOT] = self.mesh.find_nodes_on_edge(0, 0, 0, 
+                                                                       L, 0, 0,
+                                                                       eps)
+
+        for name in self.user_node_groups:
+            self.node_groups[name] = self.user_node_groups[name](self.mesh)
         
     def do_mesh(self):
         v = self.validate_before_meshing()
@@ -111,244 +271,697 @@ class Panel:
         n_len = self.__get_n_elems_on_edge(self.length)
         n_wid = self.__get_n_elems_on_edge(self.width)
         self.mesh = q.mesh_tria(n_len, n_wid, 1)
+
+        self.renumbering_report = None
+        if self.renumber_nodes:
+            self.renumbering_report = self.mesh.renumber_rcm(self.renumbering_fill)
+
         self.__create_node_groups()
+        self.node_group_weights = {}
+
+    def refine_mesh(self, marked: np.ndarray) -> int:
+        '''
+        Refine the mesh by longest edge bisection of marked elements (bool
+        mask or indeces), neighbours are split too to keep the mesh conforming.
+        Node groups are selected again on the new mesh, loads of the loaded
+        groups are spread over their new nodes as in distribute_loads().
+        Returns the number of new elements.
+        '''
+        n_elems = self.mesh.get_n_elements()
+        mask = np.zeros(n_elems, dtype=bool)
+        mask[marked] = True
+
+        totals = self.__get_loaded_group_totals()
+
+        self.mesh = self.mesh.refine(mask)
+
+        self.renumbering_report = None
+        if self.renumber_nodes:
+            self.renumbering_report = self.mesh.renumber_rcm(self.renumbering_fill)
 
-    def set_constraint(self, node_group: NodeGroup, constraint: Constraint):
+        self.__create_node_groups()
+        self.__distribute_loads(totals)
+        return self.mesh.get_n_elements() - n_elems
+
+    def distribute_loads(self):
+        '''
+        Forces are applied per node, on a mesh from do_mesh() every node of
+        a loaded group gets the whole force. This keeps the total force
+        multiplier of every loaded group and spreads it over the group nodes
+        by tributary length (node_group_weights): an edge load becomes a line
+        load with the same resultant, corner nodes get half of the inner ones.
+        refine_mesh() does it on every new mesh.
+        '''
+        self.__distribute_loads(self.__get_loaded_group_totals())
+        self.mark_changed(PanelChange.FORCES)
+
+    def __get_loaded_group_totals(self) -> dict[NodeGroup | str, float]:
+        loaded_keys = set(self.forces)
+        for case in self.load_cases.values():
+            loaded_keys |= set(case)
+        return {key: self.__get_node_group_weights(key).sum() for key in loaded_keys}
+
+    def __distribute_loads(self, totals: dict[NodeGroup | str, float]):
+        self.node_group_weights = {}
+        for key, total in totals.items():
+            nodes = self.node_groups[key]
+            if len(nodes) == 0:
+                continue
+            lengths = self.mesh.get_tributary_lengths(nodes)
+            if lengths.sum() > 0.0:
+                self.node_group_weights[key] = total * lengths / lengths.sum()
+            else:
+                # Separate nodes (e.g. a point load) share the total equally.
+                self.node_group_weights[key] = np.full(len(nodes), total / len(nodes))
+
+    def __get_node_group_weights(self, node_group_key: NodeGroup | str) -> np.ndarray:
+        weights = self.node_group_weights.get(node_group_key)
+        if weights is None:
+            return np.ones(len(self.node_groups[node_group_key]), dtype=float)
+        return weights
+
+    def __get_node_group_forces(self, node_group_key: NodeGroup | str, force: ForceVector) -> np.ndarray:
+        # Forces of the group nodes [n_group_nodes x DOF].
+        weights = self.__get_node_group_weights(node_group_key)
+        return weights[:, np.newaxis] * force.to_array()
+
+    def add_node_group(self, name: str, selector: Callable[[Mesh], np.ndarray]):
+        '''
+        Add user-defined node group. Selector takes the mesh and returns node
+        indeces, e.g. lambda m: m.find_nodes_in_box(0, 0, 0, 0.1, 0.1, 0).
+        It's evaluated again after each do_mesh(). The name can be used
+        in set_constraint() and set_force() as a node group.
+        '''
+        self.user_node_groups[name] = selector
+        self.node_group_weights.pop(name, None)
+        if self.mesh is not None:
+            self.node_groups[name] = selector(self.mesh)
+        self.mark_changed(PanelChange.CONSTRAINTS)
+        self.mark_changed(PanelChange.FORCES)
+
+    def set_constraint(self, node_group: NodeGroup | str, constraint: Constraint):
         self.constraints[node_group] = constraint
 
-    def set_force(self, node_group: NodeGroup, force: ForceVector):
+    def set_force(self, node_group: NodeGroup | str, force: ForceVector):
         self.forces[node_group] = force
 
+    def set_load_case_force(self, load_case: str, node_group: NodeGroup | str, force: ForceVector):
+        '''
+        Add force to a named load case. All load cases are solved together
+        with the main load (set_force) using one factorization of k_glob,
+        results are stored in load_case_results.
+        '''
+        if load_case not in self.load_cases:
+            self.load_cases[load_case] = {}
+        self.load_cases[load_case][node_group] = force
+
+    def remove_load_case(self, load_case: str):
+        self.load_cases.pop(load_case)
+
     def compute(self):
-        self.__apply_constraints_to_nodes()
-        self.__apply_forces_to_nodes()
-        self.__create_fixed_dofs_list()
-        self.__create_finite_elements()
-        self.__create_global_stiffeness_matrix()
-        self.__create_global_force_vector()
-        self.__solve_disp()
-        self.__compute_disp_magnitudes()
+        # Only the stages affected by changes since the last compute() are redone:
+        # - mesh or material: finite elements and stiffeness matrix;
+        # - constraints: fixed dofs and constrained stiffeness matrix,
+        #   unconstrained matrix is reused;
+        # - forces only: force vector and solution with the existing factorization.
+        changes = self.__get_changes()
+        self.last_changes = changes
+
+        mesh_changed = PanelChange.MESH in changes
+        material_changed = PanelChange.MATERIAL in changes
+        constraints_changed = PanelChange.CONSTRAINTS in changes
+        solver_changed = PanelChange.SOLVER in changes
+
+        listener = self.stage_listener
+        if listener is not None:
+            listener.begin_compute(self)
+
+        # end_compute() is called also when a stage fails, so the listener
+        # records the failed compute().
+        try:
+            stage = self.__run_stage
+
+            if mesh_changed or constraints_changed:
+                stage("apply_constraints_to_nodes", self.__apply_constraints_to_nodes)
+                stage("create_fixed_dofs_list", self.__create_fixed_dofs_list)
+
+            if mesh_changed or material_changed:
+                stage("create_finite_elements", self.__create_finite_elements)
+                stage("create_global_stiffeness_matrix", self.__create_global_stiffeness_matrix)
+
+            if mesh_changed or material_changed or constraints_changed or solver_changed:
+                stage("apply_constraints_to_stiffeness_matrix", self.__apply_constraints_to_stiffeness_matrix)
+                stage("factorize_stiffeness_matrix", self.__factorize_stiffeness_matrix)
+
+            stage("apply_forces_to_nodes", self.__apply_forces_to_nodes)
+            stage("create_global_force_vector", self.__create_global_force_vector)
+            stage("solve_disp", self.__solve_disp)
+            stage("compute_disp_magnitudes", self.__compute_disp_magnitudes)
+            stage("compute_element_results", self.__compute_element_results)
+
+            self.__save_computed_state()
+        finally:
+            if listener is not None:
+                listener.end_compute(self)
+
+    def __run_stage(self, name: str, stage: Callable[[], None]):
+        if self.stage_listener is None:
+            stage()
+        else:
+            self.stage_listener.run_stage(self, name, stage)
+
+    def __get_constraints_signature(self) -> tuple:
+        return tuple((key, self.constraints[key].as_tuple()) for key in self.constraints)
+
+    def __get_forces_signature(self) -> tuple:
+        forces = tuple((key, self.forces[key].as_tuple()) for key in self.forces)
+        load_cases = tuple(
+            (name, tuple((key, case[key].as_tuple()) for key in case))
+            for name, case in self.load_cases.items())
+        return (forces, load_cases)
+
+    def __get_solver_signature(self) -> tuple:
+        return (id(self.solver), self.reduce_fixed_dofs)
+
+    def __get_changes(self) -> set[PanelChange]:
+        changes = set(self.__pending_changes)
+
+        # Other number of dofs per node changes all dof numbering as a new mesh does.
+        if self.mesh is not self.__computed_mesh or self.dof != self.__computed_dof:
+            changes.add(PanelChange.MESH)
+
+        if self.material is not self.__computed_material:
+            changes.add(PanelChange.MATERIAL)
+
+        if self.__get_constraints_signature() != self.__computed_constraints:
+            changes.add(PanelChange.CONSTRAINTS)
+
+        if self.__get_forces_signature() != self.__computed_forces:
+            changes.add(PanelChange.FORCES)
+
+        if self.__get_solver_signature() != self.__computed_solver:
+            changes.add(PanelChange.SOLVER)
+
+        return changes
+
+    def __save_computed_state(self):
+        self.__pending_changes = set()
+        self.__computed_mesh = self.mesh
+        self.__computed_dof = self.dof
+        self.__computed_material = self.material
+        self.__computed_constraints = self.__get_constraints_signature()
+        self.__computed_forces = self.__get_forces_signature()
+        self.__computed_solver = self.__get_solver_signature()
 
     def __apply_constraints_to_nodes(self):
         self.mesh.clear_constraints()
         for node_group_key in self.constraints:
             constraint = self.constraints[node_group_key]
             nodes = self.node_groups[node_group_key]
-            for node in nodes:
-                node.constraint_superposition(constraint)
+            self.mesh.dof_fixed[nodes] |= constraint.to_array()
 
     def __apply_forces_to_nodes(self):
         self.mesh.clear_forces()
         for node_group_key in self.forces:
             force = self.forces[node_group_key]
             nodes = self.node_groups[node_group_key]
-            for node in nodes:
-                node.force_superposition(force)
+            self.mesh.loads[nodes] += self.__get_node_group_forces(node_group_key, force)
         
     def __create_fixed_dofs_list(self):
-        fixed_dofs = []
-        for node in self.mesh.nodes:
-            if not node.is_free():
-                i = node.index
-                p = self.dof * i
-                c = node.constraint_vector
-
-                if c.tx == Constraint.FIXED:
-                    fixed_dofs.append(p)
-
-                if c.ty == Constraint.FIXED:
-                    fixed_dofs.append(p + 1)
-
-                """ if c.tz == Constraint.FIXED:
-                    fixed_dofs.append(p + 2)
-                    
-                if c.rx == Constraint.FIXED:
-                    fixed_dofs.append(p + 3)
-
-                if c.ry == Constraint.FIXED:
-                    fixed_dofs.append(p + 4)
-                    
-                if c.rz == Constraint.FIXED:
-                    fixed_dofs.append(p + 5) """
-
-        self.fixed_dofs = fixed_dofs
+        # Columns of dof_fixed are ordered as DofType (tx, ty, tz, rx, ry, rz),
+        # the first self.dof of them are dofs of the panel.
+        is_fixed = self.mesh.dof_fixed[:, :self.dof].ravel()
+        self.fixed_dofs = np.flatnonzero(is_fixed)
+        self.free_dofs = np.flatnonzero(~is_fixed)
 
 
     def __create_finite_elements(self):
         assert(self.material != None)
-        fin_elems = []
-        for elem in self.mesh.elements:
-            fe3_elem = Fe3(elem.i, elem.j, elem.k)
-            fe3_elem.set_material(self.material)
-            fe3_elem.compute()
-            fin_elems.append(fe3_elem)
-
-        self.fin_elems = fin_elems
-
+        if self.memory_limit is not None:
+            self.__create_finite_elements_chunked()
+            return
+        self.elem_chunk_size = 0
+        self.fe3_batch = self.__compute_elements(self.mesh.get_coords(), self.mesh.get_connectivity())
+
+    def __compute_elements(self, coords: np.ndarray, conn: np.ndarray) -> Fe3Batch:
+        fe3_batch = Fe3Batch(coords, conn)
+        fe3_batch.set_material(self.material)
+        fe3_batch.compute()
+        if self.dof == 6:
+            fe3_batch.compute_shell()
+        return fe3_batch
+
+    def __get_element_matrices(self, fe3_batch: Fe3Batch) -> np.ndarray:
+        return fe3_batch.k_shell_glb_18x18 if self.dof == 6 else fe3_batch.k_mbr_glb_6x6
+
+    def __get_elem_chunk_size(self, coords: np.ndarray, conn: np.ndarray, pattern: AssemblyPattern) -> int:
+        # Memory per element is measured on a small batch,
+        # temporary arrays of the computation are taken as much again.
+        probe = self.__compute_elements(coords, conn[:64])
+        bytes_per_elem = 2 * probe.get_nbytes() / probe.n_elems
+        budget = self.memory_limit - pattern.get_nbytes()
+        return max(probe.n_elems, int(budget // bytes_per_elem))
+
+    def __create_finite_elements_chunked(self):
+        # Stiffeness matrices of a chunk are added to the data of the
+        # sparsity pattern right away, the chunk is discarded after that.
+        coords = self.mesh.get_coords()
+        conn = self.mesh.get_connectivity()
+        n_elems = conn.shape[0]
+        pattern = self.__get_assembly_pattern()
+        data = pattern.new_data()
+
+        store = None
+        if self.elem_data_path is not None:
+            store = ArrayStore(self.elem_data_path)
+            store.create()
+
+        compact = Fe3Batch(coords, conn)
+        compact.set_material(self.material)
+
+        chunk_size = self.__get_elem_chunk_size(coords, conn, pattern)
+        for elem_from in range(0, n_elems, chunk_size):
+            elem_to = min(elem_from + chunk_size, n_elems)
+            batch = self.__compute_elements(coords, conn[elem_from:elem_to])
+            pattern.add_elements(data, self.__get_element_matrices(batch), elem_from)
+
+            for name in Fe3Batch.COMPACT_ARRAYS:
+                value = getattr(batch, name)
+                if value is None:
+                    continue
+                arr = getattr(compact, name)
+                if arr is None:
+                    shape = (n_elems,) + value.shape[1:]
+                    if store is None:
+                        arr = np.empty(shape, dtype=value.dtype)
+                    else:
+                        arr = store.create_array(f"fe3_batch.{name}", shape, value.dtype)
+                    setattr(compact, name, arr)
+                arr[elem_from:elem_to] = value
+
+        self.fe3_batch = compact
+        self.elem_chunk_size = chunk_size
+        self.__k_glob_data = data
+
+
+    def __get_assembly_pattern(self) -> AssemblyPattern:
+        # Symbolic phase (structure of the matrix) depends only on the mesh
+        # connectivity, for a new material only the values are refilled.
+        pattern = self.assembly_pattern
+        if pattern is None or self.__assembly_pattern_key != (self.mesh, self.dof):
+            # Shell: 6x6 blocks of nodes are summed and stored as BSR matrix.
+            pattern = AssemblyPattern(self.mesh.get_connectivity(),
+                                      self.dof,
+                                      self.mesh.get_n_nodes(),
+                                      blocked=(self.dof == 6))
+            self.assembly_pattern = pattern
+            self.__assembly_pattern_key = (self.mesh, self.dof)
+        return pattern
 
     def __create_global_stiffeness_matrix(self):
-        # Building global stiffeness matrix
-        n_elems = len(self.fin_elems)
-        n_indeces = 3 # number of nodes per element
-        block_size = 2
-        mat_size = 6
-        mat_n_entries = mat_size ** 2
-        max_arr_size = n_elems * mat_n_entries
-        n_nodes = self.mesh.get_n_nodes()
-        sp_size = n_nodes * self.dof
-        sp_builder = SpBuilder(max_arr_size, n_indeces, block_size, sp_size)
-        for elem in self.fin_elems:
-            sp_builder.accept_matrix(elem.k_mbr_6x6, elem.get_index_vector())
-
-        # Applying constraints to global stiffeness matrix.
-        # All fixed degrees of freedom are indeces of rows and columns.
-        # We zero out this rows and columns and place 1.0 at position k[i, i],
-        # where k is global stiffeness matrix, i is index.
-        for i in self.fixed_dofs:
-            sp_builder.set_row_col_to_zero_and_place_1(i)
-
-        self.k_glob = sp_builder.get_csr()
-
-
-    def __create_global_force_vector(self):
-        # Building global force vector
+        if self.__k_glob_data is not None:
+            # Chunked computation has already summed element matrices.
+            self.k_glob_raw = self.assembly_pattern.get_matrix(self.__k_glob_data)
+            self.__k_glob_data = None
+            return
+
+        pattern = self.__get_assembly_pattern()
+        self.k_glob_raw = pattern.assemble(self.__get_element_matrices(self.fe3_batch))
+
+    def __apply_constraints_to_stiffeness_matrix(self):
+        if self.reduce_fixed_dofs:
+            # Fixed degrees of freedom are removed from the system,
+            # the solver works only with rows and columns of free dofs.
+            self.k_glob = math_utils.extract_free_csr(sparse.csr_matrix(self.k_glob_raw), self.free_dofs)
+        else:
+            # Applying constraints to global stiffeness matrix.
+            # All fixed degrees of freedom are indeces of rows and columns.
+            # We zero out this rows and columns and place 1.0 at position k[i, i],
+            # where k is global stiffeness matrix, i is index.
+            if sparse.issparse(self.k_glob_raw) and self.k_glob_raw.format == 'bsr':
+                self.k_glob = math_utils.constrain_bsr(self.k_glob_raw, self.fixed_dofs)
+            else:
+                self.k_glob = math_utils.constrain_csr(self.k_glob_raw, self.fixed_dofs)
+
+    def __factorize_stiffeness_matrix(self):
+        self.solver.factorize(self.k_glob)
+
+
+    def __get_force_vector(self, forces: dict[NodeGroup, ForceVector]) -> np.ndarray:
+        # Building global force vector from forces applied to node groups
         n_nodes = self.mesh.get_n_nodes()
-        v_size = n_nodes * self.dof
-        f_glob = np.zeros((v_size, 1), dtype=float)
-        for node in self.mesh.nodes:
-            p = node.index * self.dof
-            f = node.force_vector
-
-            if f.fx != 0:
-                f_glob[p, 0] += f.fx
-
-            if f.fy != 0:
-                f_glob[p + 1, 0] += f.fy
-
-            """ if f.fz != 0:
-                f_glob[p + 2, 0] += f.fz
-
-            if f.mx != 0:
-                f_glob[p + 3, 0] += f.mx
+        loads = np.zeros((n_nodes, DOF), dtype=float)
+        for node_group_key in forces:
+            f = forces[node_group_key]
+            nodes = self.node_groups[node_group_key]
+            np.add.at(loads, nodes, self.__get_node_group_forces(node_group_key, f))
+        f_glob = loads[:, :self.dof].ravel()
 
-            if f.my != 0:
-                f_glob[p + 4, 0] += f.my
-            
-            if f.mz != 0:
-                f_glob[p + 5, 0] += f.mz """
-        
         # Applying constraints to global force vector.
         # All fixed degrees of freedom are indeces of components in force vector
         # We zero out this components.
-        for i in self.fixed_dofs:
-            f_glob[i, 0] = 0.0
+        f_glob[self.fixed_dofs] = 0.0
+        return f_glob
 
-        self.f_glob = f_glob
+    def __create_global_force_vector(self):
+        # The first column is the load set with set_force(),
+        # the next ones are load cases in the order of self.load_cases.
+        columns = [self.__get_force_vector(self.forces)]
+        for name in self.load_cases:
+            columns.append(self.__get_force_vector(self.load_cases[name]))
+
+        self.f_glob = np.stack(columns, axis=1)
 
 
     def __solve_disp(self):
-        self.d_glob = spsolve(self.k_glob, self.f_glob)
+        # All load cases are solved with one factorization of k_glob.
+        if self.reduce_fixed_dofs:
+            free = self.free_dofs
+            d_glob = np.zeros(self.f_glob.shape, dtype=float)
+            d_glob[free] = self.solver.solve(self.f_glob[free])
+        else:
+            d_glob = self.solver.solve(self.f_glob)
+        self.solve_info = self.solver.info
+
+        self.d_glob = d_glob[:, 0]
+        self.load_case_results = {}
+        for j, name in enumerate(self.load_cases, start=1):
+            self.load_case_results[name] = LoadCaseResult(name, self.f_glob[:, j], d_glob[:, j])
+
+    def __get_disp_magnitudes(self, d_glob: np.ndarray) -> np.ndarray:
+        # Rows are dofs, columns are min and max displacement (including zero).
+        d = d_glob.reshape(-1, self.dof)
+        disp_mag = np.zeros((self.dof, 2), dtype=float)
+        disp_mag[:, 0] = np.minimum(d.min(axis=0), 0.0)
+        disp_mag[:, 1] = np.maximum(d.max(axis=0), 0.0)
+        return disp_mag
 
     def __compute_disp_magnitudes(self):
-        disp_mag = np.zeros((2, 2), dtype=float)
-
-        for node in self.mesh.nodes:
-            p = node.index * self.dof
-            for i in range(self.dof):
-                v = self.d_glob[p + i]
-                disp_mag[i, 0] = min(disp_mag[i, 0], v)
-                disp_mag[i, 1] = max(disp_mag[i, 1], v)
-
-        self.disp_mag = disp_mag
-
-
-    def show_just_mesh(self):
+        self.disp_mag = self.__get_disp_magnitudes(self.d_glob)
+        for result in self.load_case_results.values():
+            result.disp_mag = self.__get_disp_magnitudes(result.d_glob)
+
+
+    @staticmethod
+    def __rotate_strains_to_panel(eps_loc: np.ndarray, r_2x2: np.ndarray) -> np.ndarray:
+        # Rotate strain tensor back to panel coordinates: E_xy = R^T * E_loc * R
+        e_loc = np.empty((eps_loc.shape[0], 2, 2), dtype=float)
+        e_loc[:, 0, 0] = eps_loc[:, 0]
+        e_loc[:, 1, 1] = eps_loc[:, 1]
+        e_loc[:, 0, 1] = e_loc[:, 1, 0] = 0.5 * eps_loc[:, 2]
+        e_xy = np.einsum('nki,nkl,nlj->nij', r_2x2, e_loc, r_2x2)
+        return np.stack([e_xy[:, 0, 0], e_xy[:, 1, 1], 2 * e_xy[:, 0, 1]], axis=1)
+
+    def get_element_results(self, d_glob: np.ndarray) -> ElementResults:
+        '''Compute strains and stresses of all elements for displacement vector d_glob.'''
+        batch = self.fe3_batch
+        n_elems = batch.n_elems
+        r_3x3 = batch.r_3x3
+
+        # In-plane rotation of element coordinate systems [n_elems x 2 x 2]
+        r_2x2 = r_3x3[:, 0:2, 0:2]
+
+        # Nodal translations (u, v, w) of elements [n_elems x 3 x 3]
+        node_dofs = batch.indeces[:, :, np.newaxis] * self.dof
+        n_trans = min(self.dof, 3)
+        trans_glb = np.zeros((n_elems, 3, 3), dtype=float)
+        trans_glb[:, :, :n_trans] = d_glob[node_dofs + np.arange(n_trans)]
+        trans_loc = np.einsum('nij,nkj->nki', r_3x3, trans_glb)
+
+        # Membrane strains in element coordinates
+        d_mbr = trans_loc[:, :, 0:2].reshape(-1, 6)
+        eps_loc = np.einsum('nij,nj->ni', batch.b_mbr_3x6, d_mbr)
+        eps_xy = self.__rotate_strains_to_panel(eps_loc, r_2x2)
+
+        # Curvatures at element center, zero for membrane model
+        kappa_xy = np.zeros((n_elems, 3), dtype=float)
+        if self.dof == 6:
+            rot_glb = d_glob[node_dofs + np.arange(3, 6)]
+            rot_loc = np.einsum('nij,nkj->nki', r_3x3, rot_glb)
+            d_bnd = np.concatenate([trans_loc[:, :, 2:3], rot_loc[:, :, 0:2]], axis=2).reshape(-1, 9)
+            kappa_loc = np.einsum('nij,nj->ni', batch.b_bnd_3x9_c, d_bnd)
+            kappa_xy = self.__rotate_strains_to_panel(kappa_loc, r_2x2)
+
+        eps_shellmat_xy = np.concatenate([eps_xy, kappa_xy], axis=1)
+
+        results = ElementResults()
+        results.eps_xy = eps_xy
+        results.kappa_xy = kappa_xy
+        results.loads = eps_shellmat_xy @ self.material.dxy.transpose()
+        results.eps12, results.sig12 = self.material.get_ply_strains_stresses(eps_shellmat_xy)
+        (results.failure_index,
+         results.factor_of_safety,
+         results.margin_of_safety) = self.material.get_ply_criteria_arrays(results.sig12)
+        return results
+
+    def get_load_case_element_results(self, load_case: str) -> ElementResults:
+        '''Strains and stresses for a load case, computed on first request.'''
+        result = self.load_case_results[load_case]
+        if result.elem_results is None:
+            result.elem_results = self.get_element_results(result.d_glob)
+        return result.elem_results
+
+    def __compute_element_results(self):
+        self.elem_results = self.get_element_results(self.d_glob)
+
+    # --- persistence --- #
+
+    STORAGE_FORMAT = 1
+
+    @staticmethod
+    def __encode_group_key(key: NodeGroup | str) -> list:
+        if isinstance(key, NodeGroup):
+            return ["NodeGroup", key.name]
+        return ["user", key]
+
+    @staticmethod
+    def __decode_group_key(key: list) -> NodeGroup | str:
+        kind, name = key
+        return NodeGroup[name] if kind == "NodeGroup" else name
+
+    def save(self, path: str):
+        '''
+        Save the panel to directory path: mesh, node groups, boundary conditions,
+        material and, if computed, stiffeness matrices, solution and element data.
+        User node group selectors and the solver factorization are not saved.
+        '''
+        store = ArrayStore(path)
+        store.create()
+        enc = self.__encode_group_key
+
+        computed = (self.__computed_mesh is not None and self.__computed_mesh is self.mesh
+                    and self.__computed_dof == self.dof)
+        info = {
+            "format":            self.STORAGE_FORMAT,
+            "length":            self.length,
+            "width":             self.width,
+            "elem_length":       self.elem_length,
+            "dof":               self.dof,
+            "reduce_fixed_dofs": self.reduce_fixed_dofs,
+            "renumber_nodes":    self.renumber_nodes,
+            "constraints":       [[enc(k), c.to_array().tolist()] for k, c in self.constraints.items()],
+            "forces":            [[enc(k), f.to_array().tolist()] for k, f in self.forces.items()],
+            "load_cases":        [[name, [[enc(k), f.to_array().tolist()] for k, f in case.items()]]
+                                  for name, case in self.load_cases.items()],
+            "node_groups":       [],
+            "computed":          computed,
+        }
+
+        store.save_pickle("material", self.material)
+
+        if self.mesh is not None:
+            store.save_array("mesh.coords",    self.mesh.coords)
+            store.save_array("mesh.conn",      self.mesh.conn)
+            store.save_array("mesh.tags",      self.mesh.tags)
+            store.save_array("mesh.dof_fixed", self.mesh.dof_fixed)
+            store.save_array("mesh.loads",     self.mesh.loads)
+
+        for i, (key, nodes) in enumerate((self.node_groups or {}).items()):
+            store.save_array(f"node_group.{i}", nodes)
+            if key in self.node_group_weights:
+                store.save_array(f"node_group_weights.{i}", self.node_group_weights[key])
+            info["node_groups"].append(enc(key))
+
+        if computed:
+            store.save_array("fixed_dofs", self.fixed_dofs)
+            store.save_array("free_dofs", self.free_dofs)
+            store.save_sparse("k_glob_raw", self.k_glob_raw)
+            store.save_sparse("k_glob", self.k_glob)
+
+            # Columns: main forces, then load cases in order.
+            d_all = [self.d_glob] + [r.d_glob for r in self.load_case_results.values()]
+            disp_mag = [self.disp_mag] + [r.disp_mag for r in self.load_case_results.values()]
+            store.save_array("f_glob", self.f_glob)
+            store.save_array("d_glob", np.stack(d_all, axis=1))
+            store.save_array("disp_mag", np.stack(disp_mag))
+            info["load_case_results"] = list(self.load_case_results.keys())
+
+            info["fe3_batch"] = store.save_arrays("fe3_batch.", self.fe3_batch)
+            info["elem_results"] = store.save_arrays("elem_results.", self.elem_results)
+
+        store.save_json("panel", info)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = 'r') -> 'Panel':
+        '''
+        Load a panel saved with save(). Matrices, solution and element data
+        are opened with mmap_mode (None - read into memory). Mesh and node
+        groups are always read into memory.
+        The panel can be post-processed at once; the next compute()
+        refactorizes the stiffeness matrix, the rest is reused.
+        '''
+        store = ArrayStore(path, mmap_mode)
+        info = store.load_json("panel")
+        if info["format"] != cls.STORAGE_FORMAT:
+            raise Exception(f"Unsupported panel storage format {info['format']}.")
+        dec = cls.__decode_group_key
+
+        p = cls(length=info["length"], width=info["width"])
+        p.elem_length = info["elem_length"]
+        p.dof = info["dof"]
+        p.reduce_fixed_dofs = info["reduce_fixed_dofs"]
+        p.renumber_nodes = info["renumber_nodes"]
+        p.material = store.load_pickle("material")
+
+        p.constraints = {dec(k): ConstraintVector.new_from_array(c) for k, c in info["constraints"]}
+        p.forces = {dec(k): ForceVector.new_from_array(f) for k, f in info["forces"]}
+        p.load_cases = {name: {dec(k): ForceVector.new_from_array(f) for k, f in case}
+                        for name, case in info["load_cases"]}
+
+        if store.has_array("mesh.coords"):
+            p.mesh = Mesh.new_from_arrays(store.load_array("mesh.coords", None),
+                                          store.load_array("mesh.conn", None))
+            p.mesh.tags[:]      = store.load_array("mesh.tags", None)
+            p.mesh.dof_fixed[:] = store.load_array("mesh.dof_fixed", None)
+            p.mesh.loads[:]     = store.load_array("mesh.loads", None)
+            p.node_groups = {dec(k): store.load_array(f"node_group.{i}", None)
+                             for i, k in enumerate(info["node_groups"])}
+            p.node_group_weights = {dec(k): store.load_array(f"node_group_weights.{i}", None)
+                                    for i, k in enumerate(info["node_groups"])
+                                    if store.has_array(f"node_group_weights.{i}")}
+
+        if info["computed"]:
+            p.fixed_dofs = store.load_array("fixed_dofs", None)
+            p.free_dofs = store.load_array("free_dofs", None)
+            p.k_glob_raw = store.load_sparse("k_glob_raw")
+            p.k_glob = store.load_sparse("k_glob")
+
+            p.f_glob = store.load_array("f_glob")
+            d_all = store.load_array("d_glob")
+            disp_mag = store.load_array("disp_mag", None)
+            p.d_glob = d_all[:, 0]
+            p.disp_mag = disp_mag[0]
+            p.load_case_results = {}
+            for j, name in enumerate(info["load_case_results"], start=1):
+                result = LoadCaseResult(name, p.f_glob[:, j], d_all[:, j])
+                result.disp_mag = disp_mag[j]
+                p.load_case_results[name] = result
+
+            p.fe3_batch = Fe3Batch.new_from_mesh(p.mesh)
+            store.load_arrays("fe3_batch.", p.fe3_batch, info["fe3_batch"])
+            p.fe3_batch.material = p.material
+
+            p.elem_results = ElementResults()
+            store.load_arrays("elem_results.", p.elem_results, info["elem_results"])
+
+            p.__save_computed_state()
+            # Factorization is not saved.
+            p.__pending_changes = {PanelChange.SOLVER}
+
+        return p
+
+    # --- visualization --- #
+
+    def get_poly_data(self) -> pyvista.PolyData:
+        '''
+        PyVista surface of the mesh, built from mesh arrays once per mesh and
+        cached. Use update_poly_data() to attach results and deform it.
+        '''
         assert self.mesh != None
-        nodes = self.mesh.nodes
-        n_nodes = self.mesh.get_n_nodes()
-        points = np.zeros((n_nodes, 3), dtype=float)
-        for i in range(n_nodes):
-            node = nodes[i]
-            index = node.index
-            points[index, 0] = node.x
-            points[index, 1] = node.y
-            points[index, 2] = node.z
-
-        n_elems = self.mesh.get_n_elements()
-        cells = np.zeros((n_elems, 4), dtype=int)
-        for i in range(n_elems):
-            elem = self.mesh.elements[i]
-            cells[i, 0] = 3
-            cells[i, 1] = elem.i.index
-            cells[i, 2] = elem.j.index
-            cells[i, 3] = elem.k.index
-        
-        pv_mesh = pyvista.PolyData(points, cells)
-        pl = pyvista.Plotter()
-        pl.add_mesh(pv_mesh, show_edges=True, line_width=1)
+        if self.__poly_data is None or self.__poly_data_mesh is not self.mesh:
+            conn = self.mesh.conn
+            faces = np.empty((conn.shape[0], 4), dtype=np.int64)
+            faces[:, 0] = 3
+            faces[:, 1:] = conn
+            self.__poly_data = pyvista.PolyData(self.mesh.coords.copy(), faces.ravel())
+            self.__poly_data_mesh = self.mesh
+        return self.__poly_data
+
+    @staticmethod
+    def __set_data(data, name: str, values: np.ndarray):
+        # Existing arrays are overwritten in place, geometry isn't touched.
+        if name in data.keys() and data[name].shape == values.shape:
+            data[name][:] = values
+        else:
+            data[name] = values
+
+    POLY_CELL_DATA_NAMES = ("eps_x", "eps_y", "gamma_xy", "kappa_x", "kappa_y", "kappa_xy", "failure_index")
+
+    def update_poly_data(self,
+                         deform_scale: float = 0.0,
+                         d_glob: np.ndarray = None,
+                         elem_results: ElementResults = None) -> pyvista.PolyData:
+        '''
+        Attach results to the cached surface and move its points to
+        coords + deform_scale * displacement. By default the results of the
+        last compute() are used, d_glob and elem_results select others
+        (e.g. a load case or an animation frame). Cell data is removed
+        when d_glob is given without its elem_results, so it never shows
+        another solution than the displacement.
+        Point data: "displacement", "disp_magnitude".
+        Cell data: "eps_x", "eps_y", "gamma_xy", "failure_index" (maximum over plies and criteria),
+        for shells also "kappa_x", "kappa_y", "kappa_xy".
+        '''
+        poly = self.get_poly_data()
+        if d_glob is None:
+            d_glob = self.d_glob
+        if elem_results is None and d_glob is self.d_glob:
+            elem_results = self.elem_results
+
+        disp = np.zeros((self.mesh.get_n_nodes(), 3), dtype=float)
+        if d_glob is not None:
+            n_trans = min(self.dof, 3)
+            disp[:, 0:n_trans] = np.reshape(d_glob, (-1, self.dof))[:, 0:n_trans]
+            self.__set_data(poly.point_data, "displacement", disp)
+            self.__set_data(poly.point_data, "disp_magnitude", np.linalg.norm(disp, axis=1))
+
+        if elem_results is None:
+            for name in self.POLY_CELL_DATA_NAMES:
+                poly.cell_data.pop(name, None)
+        else:
+            self.__set_data(poly.cell_data, "eps_x",    elem_results.eps_xy[:, 0])
+            self.__set_data(poly.cell_data, "eps_y",    elem_results.eps_xy[:, 1])
+            self.__set_data(poly.cell_data, "gamma_xy", elem_results.eps_xy[:, 2])
+            if self.dof == 6:
+                self.__set_data(poly.cell_data, "kappa_x",  elem_results.kappa_xy[:, 0])
+                self.__set_data(poly.cell_data, "kappa_y",  elem_results.kappa_xy[:, 1])
+                self.__set_data(poly.cell_data, "kappa_xy", elem_results.kappa_xy[:, 2])
+            fi = elem_results.failure_index.reshape(elem_results.failure_index.shape[0], -1)
+            self.__set_data(poly.cell_data, "failure_index", fi.max(axis=1))
+
+        poly.points[:] = self.mesh.coords + deform_scale * disp
+        return poly
+
+    def get_plotter(self) -> pyvista.Plotter:
+        '''Plotter reused between show calls until its window is closed.'''
+        if self.plotter is None or self.plotter.render_window is None:
+            self.plotter = pyvista.Plotter()
+        return self.plotter
+
+    def __show(self, deform_scale: float = 0.0, scalars: str = None):
+        poly = self.update_poly_data(deform_scale)
+        pl = self.get_plotter()
+        # The named actor is replaced, not duplicated, on repeated calls.
+        pl.add_mesh(poly, name="panel", scalars=scalars, show_edges=True, line_width=1)
         pl.camera_position = 'xy'
         pl.show_bounds()
         pl.show()
 
-    def show_static_deform_mesh(self):
-        assert self.mesh != None
-        nodes = self.mesh.nodes
-        n_nodes = self.mesh.get_n_nodes()
-        points = np.zeros((n_nodes, 3), dtype=float)
-        for i in range(n_nodes):
-            node = nodes[i]
-            index = node.index
-            p = index * self.dof
-            points[index, 0] = node.x + self.d_glob[p + 0]
-            points[index, 1] = node.y + self.d_glob[p + 1]
-            points[index, 2] = node.z
-
-        n_elems = self.mesh.get_n_elements()
-        cells = np.zeros((n_elems, 4), dtype=int)
-        for i in range(n_elems):
-            elem = self.mesh.elements[i]
-            cells[i, 0] = 3
-            cells[i, 1] = elem.i.index
-            cells[i, 2] = elem.j.index
-            cells[i, 3] = elem.k.index
-        
-        pv_mesh = pyvista.PolyData(points, cells)
-        pl = pyvista.Plotter()
-        pl.add_mesh(pv_mesh, show_edges=True, line_width=1)
-        pl.camera_position = 'xy'
-        pl.show_bounds()
-        pl.show()
-    
-    def show(self):
-        assert self.mesh != None
-        nodes = self.mesh.nodes
-        n_nodes = self.mesh.get_n_nodes()
-        points = np.zeros((n_nodes, 3), dtype=float)
-        labels = [None] * n_nodes
-        for i in range(n_nodes):
-            node = nodes[i]
-            index = node.index
-            points[index, 0] = node.x
-            points[index, 1] = node.y
-            points[index, 2] = node.z
-            labels[index] = str(index)
+    def show_just_mesh(self):
+        self.__show()
 
-        n_elems = self.mesh.get_n_elements()
-        cells = np.zeros((n_elems, 4), dtype=int)
-        for i in range(n_elems):
-            elem = self.mesh.elements[i]
-            cells[i, 0] = 3
-            cells[i, 1] = elem.i.index
-            cells[i, 2] = elem.j.index
-            cells[i, 3] = elem.k.index
-        
-        pv_mesh = pyvista.PolyData(points, cells)
-        # pv_mesh.plot(show_bounds=True, cpos='xy', show_edges=True)
+    def show_static_deform_mesh(self, deform_scale: float = 1.0, scalars: str = None):
+        self.__show(deform_scale, scalars)
 
-        pl = pyvista.Plotter()
-        pl.add_mesh(pv_mesh, show_edges=True, line_width=1)
-        # pl.add_point_labels(pv_mesh.points, labels, font_size=10, point_size=10)
-        pl.camera_position = 'xy'
-        pl.show_bounds()
-        pl.show()
-    
\ No newline at end of file
+    def show(self, scalars: str = None):
+        self.__show(scalars=scalars)
@@ -1,9 +1,97 @@
 import math
+from collections import OrderedDict
 from orth2d import *
 from validation import *
 import numpy as np
 
 
+def get_t1_t2_arrays(angle_radian: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Матрицы трансформации t1 и t2 для массива углов.
+    angle_radian - углы поворота [...], результат - массивы [... x 3 x 3].
+    '''
+    c = np.cos(angle_radian)
+    s = np.sin(angle_radian)
+
+    c_sq = c ** 2
+    s_sq = s ** 2
+    sc   = s * c
+    _2sc = 2 * sc
+
+    t1 = np.empty(np.shape(angle_radian) + (3, 3), dtype=float)
+    t1[..., 0, 0] = c_sq
+    t1[..., 0, 1] = s_sq
+    t1[..., 0, 2] = -_2sc
+
+    t1[..., 1, 0] = s_sq
+    t1[..., 1, 1] = c_sq
+    t1[..., 1, 2] = _2sc
+
+    t1[..., 2, 0] = sc
+    t1[..., 2, 1] = -sc
+    t1[..., 2, 2] = c_sq - s_sq
+
+    t2 = np.empty(np.shape(angle_radian) + (3, 3), dtype=float)
+    t2[..., 0, 0] = c_sq
+    t2[..., 0, 1] = s_sq
+    t2[..., 0, 2] = -sc
+
+    t2[..., 1, 0] = s_sq
+    t2[..., 1, 1] = c_sq
+    t2[..., 1, 2] = sc
+
+    t2[..., 2, 0] = _2sc
+    t2[..., 2, 1] = -_2sc
+    t2[..., 2, 2] = c_sq - s_sq
+
+    return t1, t2
+
+
+def get_ply_abd_arrays(t1: np.ndarray,
+                       q12: np.ndarray,
+                       zbot: np.ndarray,
+                       ztop: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Вклады слоев в подматрицы A, B, D матрицы упругости пакета.
+    t1, q12    - матрицы [... x 3 x 3].
+    zbot, ztop - координаты нижней и верхней поверхностей слоев [...].
+    '''
+    qxy = np.matmul(np.matmul(t1, q12), np.swapaxes(t1, -1, -2))
+
+    zbot = np.asarray(zbot)[..., np.newaxis, np.newaxis]
+    ztop = np.asarray(ztop)[..., np.newaxis, np.newaxis]
+
+    a = qxy * (ztop - zbot)
+    b = qxy * ((ztop ** 2 - zbot ** 2) / 2)
+    d = qxy * ((ztop ** 3 - zbot ** 3) / 3)
+    return a, b, d
+
+
+def get_engineering_constants_arrays(dxy: np.ndarray, thickness: np.ndarray) -> tuple:
+    '''
+    Упругие технические постоянные (ex, ey, gxy, nu_xy, nu_yx)
+    для матриц упругости пакетов dxy [... x 6 x 6] и толщин thickness [...].
+    '''
+    g11 = dxy[..., 0, 0]
+    g12 = dxy[..., 0, 1]
+    g22 = dxy[..., 1, 1]
+    g66 = dxy[..., 2, 2]
+
+    # Book: 'Engineering Mechanics of Composite Materials'
+    # Author: Isaac Daniel, Ori Ishai
+    # Page: 169
+    # Eq: (5.70)..(5.72)
+    _1_h = 1 / thickness
+    g12_sq = g12 ** 2
+
+    ex    = _1_h * (g11 - g12_sq / g22)
+    ey    = _1_h * (g22 - g12_sq / g11)
+    gxy   = _1_h * g66
+    nu_xy = g12 / g22
+    nu_yx = g12 / g11
+    return ex, ey, gxy, nu_xy, nu_yx
+
+
 class PlyStress:
     def __init__(self, eps12: np.ndarray, sig12: np.ndarray, criteria: list[Criterion]):
         self.eps12 = eps12
@@ -45,59 +133,10 @@ class Ply:
         self.__compute_stiffness_matrix()
 
     def __compute_t1_and_t2(self):
-        c = math.cos(self.angle_radian)
-        s = math.sin(self.angle_radian)
-
-        c_sq = c ** 2
-        s_sq = s ** 2
-        sc   = s * c
-        _2sc = 2 * sc
-
-        # -----------------------------
-
-        self.t1.fill(0.0)
-
-        self.t1[0, 0] = c_sq
-        self.t1[0, 1] = s_sq
-        self.t1[0, 2] = -_2sc
-
-        self.t1[1, 0] = s_sq
-        self.t1[1, 1] = c_sq
-        self.t1[1, 2] = _2sc
-
-        self.t1[2, 0] = sc
-        self.t1[2, 1] = -sc
-        self.t1[2, 2] = c_sq - s_sq
-
-        # -----------------------------
-
-        self.t2.fill(0.0)
-
-        self.t2[0, 0] = c_sq
-        self.t2[0, 1] = s_sq
-        self.t2[0, 2] = -sc
-
-        self.t2[1, 0] = s_sq
-        self.t2[1, 1] = c_sq
-        self.t2[1, 2] = sc
-
-        self.t2[2, 0] = _2sc
-        self.t2[2, 1] = -_2sc
-        self.t2[2, 2] = c_sq - s_sq
+        self.t1, self.t2 = get_t1_t2_arrays(self.angle_radian)
 
     def __compute_stiffness_matrix(self):
-        qxy = np.matmul(self.t1, self.material.q12)
-        qxy = np.matmul(qxy, self.t1.transpose())
-
-        coeff = self.ztop - self.zbot
-        a = qxy * coeff
-
-        coeff = (self.ztop ** 2 - self.zbot ** 2) / 2
-        b = qxy * coeff
-
-        coeff = (self.ztop ** 3 - self.zbot ** 3) / 3
-        d = qxy * coeff  
-
+        a, b, d = get_ply_abd_arrays(self.t1, self.material.q12, self.zbot, self.ztop)
         self.dxy = np.block([[a, b], 
                              [b, d]])
         
@@ -150,6 +189,99 @@ class ShellMaterialStress:
         return np.stack(crit_vectors)
 
 
+class LaminateCacheEntry:
+    '''Результаты ShellMaterial.compute() для одной укладки.'''
+
+    def __init__(self, sm: 'ShellMaterial'):
+        self.dxy     = sm.dxy.copy()
+        self.dxy_inv = sm.dxy_inv.copy()
+        self.a_3x3   = sm.a_3x3.copy()
+        self.c_3x3   = sm.c_3x3.copy()
+        self.d_3x3   = sm.d_3x3.copy()
+
+        self.ex    = sm.ex
+        self.ey    = sm.ey
+        self.gxy   = sm.gxy
+        self.nu_xy = sm.nu_xy
+        self.nu_yx = sm.nu_yx
+
+        # Состояние слоев, нужное для вычисления напряжений.
+        self.ply_z   = [(ply.zbot, ply.ztop) for ply in sm.plies]
+        self.ply_t1  = np.stack([ply.t1 for ply in sm.plies])
+        self.ply_t2  = np.stack([ply.t2 for ply in sm.plies])
+        self.ply_dxy = np.stack([ply.dxy for ply in sm.plies])
+
+    def apply(self, sm: 'ShellMaterial'):
+        sm.dxy     = self.dxy.copy()
+        sm.dxy_inv = self.dxy_inv.copy()
+        sm.a_3x3   = self.a_3x3.copy()
+        sm.c_3x3   = self.c_3x3.copy()
+        sm.d_3x3   = self.d_3x3.copy()
+
+        sm.ex    = self.ex
+        sm.ey    = self.ey
+        sm.gxy   = self.gxy
+        sm.nu_xy = self.nu_xy
+        sm.nu_yx = self.nu_yx
+
+        for i, ply in enumerate(sm.plies):
+            ply.zbot, ply.ztop = self.ply_z[i]
+            ply.t1[:] = self.ply_t1[i]
+            ply.t2[:] = self.ply_t2[i]
+            ply.dxy = self.ply_dxy[i].copy()
+
+
+class LaminateCache:
+    '''
+    LRU кэш матриц упругости пакетов.
+    Ключ - последовательность (q12 материала, толщина, угол) слоев. Материал
+    учитывается по значениям матрицы q12, а не по идентичности объекта:
+    изменение свойств материала с последующим Orth2d.compute() дает новый
+    ключ, а кэш не удерживает объекты материалов.
+    '''
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize: int = maxsize
+        self.entries: OrderedDict[tuple, LaminateCacheEntry] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def get_key(plies: list[Ply]) -> tuple:
+        return tuple((ply.material.q12.tobytes(), ply.thickness, ply.angle_radian) for ply in plies)
+
+    def get(self, key: tuple) -> LaminateCacheEntry:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: LaminateCacheEntry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __str__(self):
+        return (f"LaminateCache: size {len(self.entries)}/{self.maxsize}, "
+                f"hits {self.hits}, misses {self.misses}")
+
+
+laminate_cache = LaminateCache()
+'''Общий кэш пакетов, используемый ShellMaterial по умолчанию.'''
+
+
 class ShellMaterial:
     def __init__(self):
         self.plies: list[Ply] = []
@@ -180,6 +312,20 @@ class ShellMaterial:
         self.nu_xy: float = 0.0
         self.nu_yx: float = 0.0
 
+        self.cache: LaminateCache = laminate_cache
+        '''Кэш матриц упругости пакетов, None - вычислять всегда заново.'''
+
+    def __getstate__(self):
+        # Общий кэш пакетов не сохраняется вместе с материалом.
+        state = self.__dict__.copy()
+        state["cache"] = None if self.cache is None else True
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if self.cache is True:
+            self.cache = laminate_cache
+
     def add_ply(self, material: Orth2d, ply_thickness: float, angle_degree: float):
         angle_radian = math.radians(angle_degree)
         ply = Ply(material, ply_thickness, angle_radian)
@@ -254,12 +400,23 @@ class ShellMaterial:
         if not v.is_ok():
             raise Exception(v)
         
-        self.__compute_materials()
         self.__compute_thickness()
         self.__compute_area_density()
+
+        if self.cache is not None:
+            key = LaminateCache.get_key(self.plies)
+            entry = self.cache.get(key)
+            if entry is not None:
+                entry.apply(self)
+                return
+
+        self.__compute_materials()
         self.__compute_matrices()
         self.__compute_engeneering_constants()
 
+        if self.cache is not None:
+            self.cache.put(key, LaminateCacheEntry(self))
+
     def __compute_materials(self):
         used_materials = set(self.plies)
         for m in used_materials:
@@ -298,27 +455,198 @@ class ShellMaterial:
         self.d_3x3 = math_utils.extract_submatrix(self.dxy, 3, 3, 3, 3)
 
     def __compute_engeneering_constants(self):
-        g11 = self.dxy[0, 0]
-        g12 = self.dxy[0, 1]
-        g22 = self.dxy[1, 1]
-        g66 = self.dxy[2, 2]
-
-        # Book: 'Engineering Mechanics of Composite Materials'
-        # Author: Isaac Daniel, Ori Ishai
-        # Page: 169
-        # Eq: (5.70)..(5.72)
-        _1_h = 1 / self.thickness
-        g12_sq = g12 ** 2
-
-        self.ex    = _1_h * (g11 - g12_sq / g22)
-        self.ey    = _1_h * (g22 - g12_sq / g11)
-        self.gxy   = _1_h * g66
-        self.nu_xy = g12 / g22
-        self.nu_yx = g12 / g11
+        (self.ex,
+         self.ey,
+         self.gxy,
+         self.nu_xy,
+         self.nu_yx) = (float(v) for v in get_engineering_constants_arrays(self.dxy, self.thickness))
+
+    def get_ply_strains_stresses(self, eps_shellmat_xy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Деформации и напряжения в слоях для многих векторов деформаций пакета.
+        eps_shellmat_xy - деформации пакета в координатах XY [n x 6]
+                          (3 мембранные компоненты и 3 кривизны).
+        Возвращает (eps12, sig12) - деформации и напряжения на серединных
+        поверхностях слоев в координатах 12, массивы [n x nplies x 3].
+        '''
+        # Вектор мембранных деформаций и кривизн пакета в координатах XY
+        eps_mbr_xy = eps_shellmat_xy[:, np.newaxis, 0:3]
+        eps_bnd_xy = eps_shellmat_xy[:, np.newaxis, 3:6]
+
+        # Координаты z срединных поверхностей слоев
+        h_mid = np.array([(ply.zbot + ply.ztop) / 2 for ply in self.plies], dtype=float)
+
+        # Деформации на серединных поверхностях слоев в координатах XY [n x nplies x 3]
+        eps_xy = eps_mbr_xy + eps_bnd_xy * h_mid[np.newaxis, :, np.newaxis]
+
+        # Перевод (XY) -> (12) транспонированными матрицами t1 слоев
+        t1 = np.stack([ply.t1 for ply in self.plies])
+        eps12 = np.einsum('pji,npj->npi', t1, eps_xy)
+
+        q12 = np.stack([ply.material.q12 for ply in self.plies])
+        sig12 = np.einsum('pij,npj->npi', q12, eps12)
+        return eps12, sig12
+
+    def get_ply_criteria_arrays(self, sig12: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Критерии прочности слоев для массива напряжений sig12 [n x nplies x 3].
+        Возвращает (fi, fos, mos) - массивы [n x nplies x 4], столбцы в порядке CriterionType.
+        '''
+        shape = sig12.shape[:-1] + (len(CriterionType),)
+        fi  = np.empty(shape, dtype=float)
+        fos = np.empty(shape, dtype=float)
+        mos = np.empty(shape, dtype=float)
+        for i, ply in enumerate(self.plies):
+            fi[:, i], fos[:, i], mos[:, i] = ply.material.get_criteria_arrays(sig12[:, i])
+        return fi, fos, mos
 
     def get_stress(self, distributed_load: np.ndarray) -> ShellMaterialStress:
         ply_stress_list = []
         eps_xy = np.matmul(self.dxy_inv, distributed_load)
         for ply in self.plies:
             ply_stress_list.append(ply.get_ply_stress_data(eps_xy))
-        return ShellMaterialStress(ply_stress_list)
\ No newline at end of file
+        return ShellMaterialStress(ply_stress_list)
+
+class LaminateBatch:
+    '''
+    Пачка из K пакетов, вычисляемых одновременно.
+    Укладки задаются выровненными массивами [K x P], где P - наибольшее
+    число слоев. Слои с нулевой толщиной считаются отсутствующими
+    (заполнение), их материал и угол не учитываются.
+    Слои перечисляются так же, как в ShellMaterial: первый слой - верхний.
+    '''
+
+    def __init__(self,
+                 materials: list[Orth2d],
+                 material_indeces: np.ndarray,
+                 thicknesses: np.ndarray,
+                 angles_degree: np.ndarray):
+        self.materials: list[Orth2d] = materials
+        '''Материалы, на которые ссылается material_indeces.'''
+
+        self.material_indeces: np.ndarray = np.asarray(material_indeces, dtype=int)
+        '''Индексы материалов слоев в списке materials [K x P].'''
+
+        self.thicknesses: np.ndarray = np.asarray(thicknesses, dtype=float)
+        '''Толщины слоев [K x P], 0.0 - отсутствующий слой.'''
+
+        self.angles_radian: np.ndarray = np.radians(np.asarray(angles_degree, dtype=float))
+        '''Углы укладки слоев [K x P].'''
+
+        assert self.material_indeces.shape == self.thicknesses.shape == self.angles_radian.shape
+        assert self.material_indeces.ndim == 2
+
+        self.n_laminates: int = self.thicknesses.shape[0]
+
+        self.thickness: np.ndarray = None
+        '''Толщины пакетов [K].'''
+
+        self.area_density: np.ndarray = None
+        '''Распределенные веса пакетов [K].'''
+
+        self.dxy: np.ndarray = None
+        '''Матрицы упругости пакетов [K x 6 x 6].'''
+
+        self.dxy_inv: np.ndarray = None
+        '''Матрицы податливости пакетов [K x 6 x 6].'''
+
+        # Подматрицы матриц упругости [K x 3 x 3].
+        self.a_3x3: np.ndarray = None
+        self.c_3x3: np.ndarray = None
+        self.d_3x3: np.ndarray = None
+
+        # Упругие технические постоянные [K]
+        self.ex:    np.ndarray = None
+        self.ey:    np.ndarray = None
+        self.gxy:   np.ndarray = None
+        self.nu_xy: np.ndarray = None
+        self.nu_yx: np.ndarray = None
+
+    @classmethod
+    def new_from_ragged(cls,
+                        materials: list[Orth2d],
+                        material_indeces: list[list[int]],
+                        thicknesses: list[list[float]],
+                        angles_degree: list[list[float]]) -> 'LaminateBatch':
+        '''Создать пачку из укладок разной длины, дополнив их пустыми слоями.'''
+        n = len(thicknesses)
+        max_nplies = max((len(t) for t in thicknesses), default=0)
+        m = np.zeros((n, max_nplies), dtype=int)
+        t = np.zeros((n, max_nplies), dtype=float)
+        a = np.zeros((n, max_nplies), dtype=float)
+        for k in range(n):
+            nplies = len(thicknesses[k])
+            assert len(material_indeces[k]) == nplies and len(angles_degree[k]) == nplies
+            m[k, :nplies] = material_indeces[k]
+            t[k, :nplies] = thicknesses[k]
+            a[k, :nplies] = angles_degree[k]
+        return cls(materials, m, t, a)
+
+    def compute(self):
+        if np.any(self.thicknesses < 0.0):
+            raise Exception("Negative ply thicknesses are not allowed.")
+
+        for m in self.materials:
+            m.compute()
+
+        self.__compute_thickness()
+        self.__compute_area_density()
+        self.__compute_matrices()
+        self.__compute_engeneering_constants()
+
+    def __compute_thickness(self):
+        self.thickness = self.thicknesses.sum(axis=1)
+        if np.any(self.thickness == 0.0):
+            raise Exception("Laminate without plies in the batch.")
+
+    def __compute_area_density(self):
+        density = np.array([m.density for m in self.materials], dtype=float)
+        self.area_density = np.sum(density[self.material_indeces] * self.thicknesses, axis=1)
+
+    def __compute_matrices(self):
+        # Последний слой - нижний: ztop[k, i] = -h/2 + сумма толщин слоев i..P-1.
+        tail = np.cumsum(self.thicknesses[:, ::-1], axis=1)[:, ::-1]
+        ztop = tail - self.thickness[:, np.newaxis] / 2
+        zbot = ztop - self.thicknesses
+
+        q12 = np.stack([m.q12 for m in self.materials])
+
+        # Цикл по слоям, векторизация по пакетам - промежуточные
+        # массивы имеют размер [K x 3 x 3].
+        k = self.n_laminates
+        a = np.zeros((k, 3, 3), dtype=float)
+        b = np.zeros((k, 3, 3), dtype=float)
+        d = np.zeros((k, 3, 3), dtype=float)
+        for p in range(self.thicknesses.shape[1]):
+            t1, _ = get_t1_t2_arrays(self.angles_radian[:, p])
+            a_p, b_p, d_p = get_ply_abd_arrays(t1,
+                                               q12[self.material_indeces[:, p]],
+                                               zbot[:, p],
+                                               ztop[:, p])
+            a += a_p
+            b += b_p
+            d += d_p
+
+        self.dxy = np.block([[a, b],
+                             [b, d]])
+        self.dxy_inv = np.linalg.inv(self.dxy)
+
+        self.a_3x3 = self.dxy[:, 0:3, 0:3]
+        self.c_3x3 = self.dxy[:, 0:3, 3:6]
+        self.d_3x3 = self.dxy[:, 3:6, 3:6]
+
+    def __compute_engeneering_constants(self):
+        (self.ex,
+         self.ey,
+         self.gxy,
+         self.nu_xy,
+         self.nu_yx) = get_engineering_constants_arrays(self.dxy, self.thickness)
+
+    def get_shell_material(self, k: int) -> ShellMaterial:
+        '''Пакет с индексом k как отдельный ShellMaterial (не вычисленный).'''
+        sm = ShellMaterial()
+        for p in np.flatnonzero(self.thicknesses[k] != 0.0):
+            sm.add_ply(self.materials[self.material_indeces[k, p]],
+                       self.thicknesses[k, p],
+                       math.degrees(self.angles_radian[k, p]))
+        return sm
@@ -0,0 +1,316 @@
+import abc
+from enum import Enum
+import time
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as splinalg
+
+try:
+    from sksparse.cholmod import cholesky as cholmod_cholesky
+except ImportError:
+    cholmod_cholesky = None
+
+
+class Preconditioner(Enum):
+    NONE   = 0
+    JACOBI = 1
+    ILU    = 2
+
+
+class SolveInfo:
+    '''Сведения о последнем решении системы [K] * {D} = {F}.'''
+
+    def __init__(self, solver_name: str):
+        self.solver_name: str = solver_name
+
+        self.factorize_time: float = 0.0
+        '''Время подготовки матрицы (факторизация, предобуславливатель), с.'''
+
+        self.solve_time: float = 0.0
+        '''Время решения для правой части, с.'''
+
+        self.iterations: int = 0
+        '''Число итераций (0 для прямых методов).'''
+
+        self.residual: float = 0.0
+        '''Относительная невязка ||F - K * D|| / ||F||.'''
+
+    def __str__(self):
+        return (f"{self.solver_name}: "
+                f"factorize {self.factorize_time:.3e} s, "
+                f"solve {self.solve_time:.3e} s, "
+                f"iterations {self.iterations}, "
+                f"residual {self.residual:.3e}")
+
+
+def get_relative_residual(k: sparse.spmatrix, f: np.ndarray, d: np.ndarray) -> float:
+    f_norm = np.linalg.norm(f)
+    r_norm = np.linalg.norm(f - k @ d)
+    return r_norm / f_norm if f_norm != 0.0 else r_norm
+
+
+class LinearSolver(abc.ABC):
+    '''
+    Базовый класс решателя системы [K] * {D} = {F}.
+    Матрица передается один раз в factorize(), после чего solve() можно
+    вызывать многократно для разных правых частей.
+    '''
+
+    name = "base"
+
+    def __init__(self):
+        self.k: sparse.spmatrix = None
+        self.info: SolveInfo = SolveInfo(self.name)
+
+    def factorize(self, k: sparse.spmatrix):
+        t = time.perf_counter()
+        self.k = k
+        self._factorize(k)
+        self.info = SolveInfo(self.name)
+        self.info.factorize_time = time.perf_counter() - t
+
+    def solve(self, f: np.ndarray) -> np.ndarray:
+        '''
+        Решить систему для правой части f. Правая часть - вектор [n]
+        или матрица [n x m] из m векторов, результат имеет ту же форму.
+        '''
+        assert self.k is not None
+        t = time.perf_counter()
+        d, iterations = self._solve(f)
+        self.info.solve_time = time.perf_counter() - t
+        self.info.iterations = iterations
+        self.info.residual = get_relative_residual(self.k, f, d)
+        return d
+
+    @abc.abstractmethod
+    def _factorize(self, k: sparse.spmatrix):
+        pass
+
+    @abc.abstractmethod
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        pass
+
+
+class SpsolveSolver(LinearSolver):
+    '''Прямое решение через spsolve, без повторного использования факторизации.'''
+
+    name = "spsolve"
+
+    def _factorize(self, k: sparse.spmatrix):
+        self.k = sparse.csr_matrix(k)
+
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        d = splinalg.spsolve(self.k, f)
+        return d.reshape(f.shape), 0
+
+
+class SpluSolver(LinearSolver):
+    '''Прямое решение через разреженное LU разложение (SuperLU).'''
+
+    name = "splu"
+
+    def __init__(self, permc_spec: str = "COLAMD"):
+        super().__init__()
+        self.permc_spec = permc_spec
+        self.lu = None
+
+    def _factorize(self, k: sparse.spmatrix):
+        self.lu = splinalg.splu(sparse.csc_matrix(k), permc_spec=self.permc_spec)
+
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        return self.lu.solve(f), 0
+
+
+class CholeskySolver(LinearSolver):
+    '''
+    Решение для симметричных положительно определенных матриц.
+    Использует CHOLMOD (scikit-sparse), если он установлен, иначе - SuperLU
+    в симметричном режиме (упорядочивание по K + K^T, без выбора ведущего
+    элемента вне диагонали).
+    '''
+
+    name = "cholesky"
+
+    def __init__(self):
+        self.name = "cholesky" if cholmod_cholesky is not None else "cholesky(splu)"
+        super().__init__()
+        self.factor = None
+
+    def _factorize(self, k: sparse.spmatrix):
+        k = sparse.csc_matrix(k)
+        if cholmod_cholesky is not None:
+            self.factor = cholmod_cholesky(k)
+        else:
+            lu = splinalg.splu(k,
+                               permc_spec="MMD_AT_PLUS_A",
+                               diag_pivot_thresh=0.0,
+                               options=dict(SymmetricMode=True))
+            self.factor = lu.solve
+
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        return self.factor(f), 0
+
+
+class CgSolver(LinearSolver):
+    '''Метод сопряженных градиентов с предобуславливанием.'''
+
+    name = "cg"
+
+    def __init__(self,
+                 preconditioner: Preconditioner = Preconditioner.JACOBI,
+                 rtol: float = 1e-10,
+                 maxiter: int = None,
+                 ilu_drop_tol: float = 1e-4,
+                 ilu_fill_factor: float = 10.0):
+        super().__init__()
+        self.preconditioner = preconditioner
+        self.rtol = rtol
+        self.maxiter = maxiter
+        self.ilu_drop_tol = ilu_drop_tol
+        self.ilu_fill_factor = ilu_fill_factor
+        self.m = None
+
+    def _factorize(self, k: sparse.spmatrix):
+        self.k = sparse.csr_matrix(k)
+        n = k.shape[0]
+        match self.preconditioner:
+            case Preconditioner.NONE:
+                self.m = None
+
+            case Preconditioner.JACOBI:
+                inv_diag = 1.0 / self.k.diagonal()
+                self.m = splinalg.LinearOperator((n, n),
+                                                 matvec=lambda x: inv_diag * x.ravel(),
+                                                 dtype=float)
+
+            case Preconditioner.ILU:
+                # Симметричный режим сохраняет предобуславливатель близким
+                # к симметричному, иначе CG может расходиться.
+                ilu = splinalg.spilu(sparse.csc_matrix(k),
+                                     drop_tol=self.ilu_drop_tol,
+                                     fill_factor=self.ilu_fill_factor,
+                                     permc_spec="MMD_AT_PLUS_A",
+                                     diag_pivot_thresh=0.0,
+                                     options=dict(SymmetricMode=True))
+                self.m = splinalg.LinearOperator((n, n), matvec=ilu.solve, dtype=float)
+
+            case _:
+                raise Exception(f"Unknown preconditioner {self.preconditioner}.")
+
+    def _solve_one(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        iterations = 0
+
+        def callback(_):
+            nonlocal iterations
+            iterations += 1
+
+        d, status = splinalg.cg(self.k, f,
+                                rtol=self.rtol,
+                                maxiter=self.maxiter,
+                                M=self.m,
+                                callback=callback)
+        if status < 0:
+            raise Exception(f"CG solver failed with status {status}.")
+        if status > 0:
+            raise Exception(f"CG solver did not converge in {status} iterations.")
+        return d, iterations
+
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        if f.ndim == 1:
+            return self._solve_one(f)
+
+        d = np.zeros(f.shape, dtype=float)
+        iterations = 0
+        for j in range(f.shape[1]):
+            d[:, j], it = self._solve_one(f[:, j])
+            iterations += it
+        return d, iterations
+
+
+class MixedPrecisionSolver(LinearSolver):
+    '''
+    LU разложение в одинарной точности (float32) с итерационным уточнением
+    по матрице двойной точности: d += K32^-1 * (F - K * d), пока
+    относительная невязка не станет меньше rtol. Разложение занимает
+    примерно вдвое меньше памяти и времени, чем в float64.
+    Матрица перед разложением масштабируется по диагонали (S * K * S,
+    S = 1 / sqrt(|diag K|)), чтобы уменьшить разброс величин для float32.
+    Если уточнение не сходится (невязка уменьшается меньше, чем в
+    1 / stall_factor раз за итерацию) или разложение float32 не удалось,
+    решение выполняется через LU разложение float64.
+    '''
+
+    name = "mixed"
+
+    def __init__(self,
+                 rtol: float = 1e-10,
+                 maxiter: int = 20,
+                 stall_factor: float = 0.5,
+                 permc_spec: str = "COLAMD"):
+        super().__init__()
+        self.rtol = rtol
+        self.maxiter = maxiter
+        self.stall_factor = stall_factor
+        self.permc_spec = permc_spec
+        self.scale: np.ndarray = None
+        self.lu32 = None
+        self.lu64 = None
+
+        self.fallback: bool = False
+        '''True, если последнее решение выполнено в float64.'''
+
+    def _factorize(self, k: sparse.spmatrix):
+        self.k = sparse.csr_matrix(k, dtype=float)
+        self.lu64 = None
+        self.fallback = False
+
+        diag = np.abs(self.k.diagonal())
+        diag[diag == 0.0] = 1.0
+        self.scale = 1.0 / np.sqrt(diag)
+        s = sparse.diags(self.scale)
+        k32 = sparse.csc_matrix(s @ self.k @ s, dtype=np.float32)
+        try:
+            self.lu32 = splinalg.splu(k32, permc_spec=self.permc_spec)
+        except RuntimeError:
+            # Матрица вырождена в одинарной точности
+            self.lu32 = None
+
+    def __get_lu64(self):
+        if self.lu64 is None:
+            self.lu64 = splinalg.splu(sparse.csc_matrix(self.k), permc_spec=self.permc_spec)
+        return self.lu64
+
+    def __solve32(self, r: np.ndarray) -> np.ndarray:
+        # Каждый столбец нормируется, чтобы малые невязки не терялись в float32.
+        r_max = np.abs(r).max(axis=0)
+        r_max = np.where(r_max > 0.0, r_max, 1.0)
+        s = self.scale if r.ndim == 1 else self.scale[:, np.newaxis]
+        x = self.lu32.solve((s * r / r_max).astype(np.float32))
+        return s * x.astype(float) * r_max
+
+    def __get_residual(self, f: np.ndarray, d: np.ndarray) -> tuple[np.ndarray, float]:
+        r = f - self.k @ d
+        f_norm = np.linalg.norm(f, axis=0)
+        f_norm = np.where(f_norm > 0.0, f_norm, 1.0)
+        return r, float(np.max(np.linalg.norm(r, axis=0) / f_norm))
+
+    def _solve(self, f: np.ndarray) -> tuple[np.ndarray, int]:
+        self.fallback = False
+        if self.lu32 is not None:
+            d = self.__solve32(f)
+            r, residual = self.__get_residual(f, d)
+            iterations = 0
+            while residual > self.rtol and iterations < self.maxiter:
+                d_new = d + self.__solve32(r)
+                r_new, residual_new = self.__get_residual(f, d_new)
+                iterations += 1
+                if not residual_new < self.stall_factor * residual:
+                    break
+                d, r, residual = d_new, r_new, residual_new
+            if residual <= self.rtol:
+                return d, iterations
+        else:
+            iterations = 0
+
+        self.fallback = True
+        return self.__get_lu64().solve(f), iterations
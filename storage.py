@@ -0,0 +1,91 @@
+import json
+import os
+import pickle
+import numpy as np
+from scipy import sparse
+
+
+class ArrayStore:
+    '''
+    Directory of .npy files plus JSON and pickle files.
+    Arrays are read back with np.load(mmap_mode=...), so large arrays can be
+    memory-mapped instead of loaded into RAM.
+    '''
+
+    def __init__(self, path: str, mmap_mode: str = None):
+        self.path: str = path
+        self.mmap_mode: str = mmap_mode
+        '''mmap_mode for np.load(): None, 'r', 'r+', 'c'.'''
+
+    def get_file_path(self, name: str, ext: str) -> str:
+        return os.path.join(self.path, name + ext)
+
+    def create(self):
+        os.makedirs(self.path, exist_ok=True)
+
+    def has_array(self, name: str) -> bool:
+        return os.path.exists(self.get_file_path(name, ".npy"))
+
+    def save_array(self, name: str, arr: np.ndarray):
+        np.save(self.get_file_path(name, ".npy"), np.ascontiguousarray(arr), allow_pickle=False)
+
+    def load_array(self, name: str, mmap_mode: str = "default") -> np.ndarray:
+        if mmap_mode == "default":
+            mmap_mode = self.mmap_mode
+        return np.load(self.get_file_path(name, ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+    def create_array(self, name: str, shape: tuple, dtype=float) -> np.ndarray:
+        '''New .npy file opened as writable memory-mapped array, filled by parts.'''
+        return np.lib.format.open_memmap(self.get_file_path(name, ".npy"), mode="w+", dtype=dtype, shape=shape)
+
+    def save_sparse(self, name: str, m: sparse.spmatrix):
+        '''Save CSR matrix as its component arrays, BSR matrices keep their blocks.'''
+        if m.format != 'bsr':
+            m = sparse.csr_matrix(m)
+        self.save_array(name + ".data", m.data)
+        self.save_array(name + ".indices", m.indices)
+        self.save_array(name + ".indptr", m.indptr)
+        self.save_json(name + ".info", {"format": m.format, "shape": list(m.shape)})
+
+    def has_sparse(self, name: str) -> bool:
+        return self.has_array(name + ".data")
+
+    def load_sparse(self, name: str) -> sparse.csr_matrix | sparse.bsr_matrix:
+        # Arrays are passed as is, so memory-mapped data stays on disk.
+        data    = self.load_array(name + ".data")
+        indices = self.load_array(name + ".indices")
+        indptr  = self.load_array(name + ".indptr")
+        info    = self.load_json(name + ".info")
+        shape   = tuple(info["shape"])
+        if info["format"] == "bsr":
+            return sparse.bsr_matrix((data, indices, indptr), shape=shape, copy=False)
+        return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+    def save_arrays(self, prefix: str, obj: object) -> list[str]:
+        '''Save all numpy array attributes of obj, returns their names.'''
+        names = []
+        for name, value in vars(obj).items():
+            if isinstance(value, np.ndarray):
+                self.save_array(prefix + name, value)
+                names.append(name)
+        return names
+
+    def load_arrays(self, prefix: str, obj: object, names: list[str]):
+        for name in names:
+            setattr(obj, name, self.load_array(prefix + name))
+
+    def save_json(self, name: str, value):
+        with open(self.get_file_path(name, ".json"), "w") as f:
+            json.dump(value, f, indent=1)
+
+    def load_json(self, name: str):
+        with open(self.get_file_path(name, ".json")) as f:
+            return json.load(f)
+
+    def save_pickle(self, name: str, value):
+        with open(self.get_file_path(name, ".pkl"), "wb") as f:
+            pickle.dump(value, f)
+
+    def load_pickle(self, name: str):
+        with open(self.get_file_path(name, ".pkl"), "rb") as f:
+            return pickle.load(f)
@@ -0,0 +1,227 @@
+import csv
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator
+import numpy as np
+import material_mock
+import shellmat
+from orth2d import CriterionType
+from panel import Panel, NodeGroup
+from boundary import *
+
+
+DEFAULT_PARAMS = {
+    "length":        1.0,
+    "width":         1.0,
+    "elem_length":   0.1,
+    "material":      "KMU4",     # material_mock.MaterialMockKind name
+    "layup":         (0, 45, 90),
+    "ply_thickness": 1e-3,
+    "fx":            0.0,        # force per node of the right edge
+    "fy":            1e+4,
+}
+'''Parameters of the default panel builder, a sweep overrides some of them.'''
+
+METRIC_NAMES = [
+    "n_nodes",
+    "n_elems",
+    "ux_min",
+    "ux_max",
+    "uy_min",
+    "uy_max",
+    "disp_max",
+    "fi_max_stress",
+    "fi_hill",
+    "fi_tsai_wu",
+    "fi_hoffman",
+    "fi_max",
+    "time",
+]
+
+
+def build_panel(params: dict) -> Panel:
+    '''
+    Default builder: rectangular laminate panel clamped on the left edge
+    and loaded by nodal forces on the right edge.
+    '''
+    material = material_mock.get_material_mock(material_mock.MaterialMockKind[params["material"]])
+
+    sm = shellmat.ShellMaterial()
+    for angle in params["layup"]:
+        sm.add_ply(material, params["ply_thickness"], angle)
+    sm.compute()
+
+    p = Panel(length=params["length"], width=params["width"])
+    p.set_material(sm)
+    p.elem_length = params["elem_length"]
+    p.do_mesh()
+    p.set_constraint(NodeGroup.LFT, ConstraintVector.new_fixed())
+    p.set_force(NodeGroup.RGT, ForceVector.new(params["fx"], params["fy"], 0, 0, 0, 0))
+    return p
+
+
+def get_panel_metrics(p: Panel) -> dict:
+    '''Scalar results of a computed panel.'''
+    u = p.d_glob[0::p.dof]
+    v = p.d_glob[1::p.dof]
+    fi = p.elem_results.failure_index.reshape(-1, len(CriterionType)).max(axis=0)
+    return {
+        "n_nodes":       p.mesh.get_n_nodes(),
+        "n_elems":       p.mesh.get_n_elements(),
+        "ux_min":        float(u.min()),
+        "ux_max":        float(u.max()),
+        "uy_min":        float(v.min()),
+        "uy_max":        float(v.max()),
+        "disp_max":      float(np.sqrt(u * u + v * v).max()),
+        "fi_max_stress": float(fi[CriterionType.MAX_STRESS.value]),
+        "fi_hill":       float(fi[CriterionType.HILL.value]),
+        "fi_tsai_wu":    float(fi[CriterionType.TSAI_WU.value]),
+        "fi_hoffman":    float(fi[CriterionType.HOFFMAN.value]),
+        "fi_max":        float(fi.max()),
+    }
+
+
+def run_case(builder: Callable[[dict], Panel], case: int, params: dict) -> dict:
+    '''
+    Build, compute and evaluate one panel. Never raises: a failed case
+    is returned as a row with status "error" and the exception message.
+    '''
+    row = {"case": case, **params, "status": "ok", "error": ""}
+    t = time.perf_counter()
+    try:
+        p = builder({**DEFAULT_PARAMS, **params})
+        p.compute()
+        row.update(get_panel_metrics(p))
+    except Exception as e:
+        row["status"] = "error"
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["time"] = time.perf_counter() - t
+    return row
+
+
+class Sweep:
+    '''
+    Parametric sweep: every combination of the parameter values is an
+    independent panel solve. Cases are dispatched to a process pool and
+    rows are streamed to a CSV file in order of completion.
+
+    A case that kills its worker process breaks the whole pool. The cases
+    that were running at that moment are rerun one by one in a new pool,
+    the one that breaks it again gets an error row, the rest of the sweep
+    continues in a new pool.
+    '''
+
+    def __init__(self,
+                 space: dict[str, list],
+                 builder: Callable[[dict], Panel] = build_panel,
+                 n_workers: int = None):
+        self.space: dict[str, list] = space
+        '''Parameter name -> list of values.'''
+
+        self.builder: Callable[[dict], Panel] = builder
+        '''Module-level function params -> Panel, it is pickled to the workers.'''
+
+        self.n_workers: int = n_workers
+        '''Number of worker processes, None - number of CPUs, 0 - run in this process.'''
+
+        self.results: list[dict] = []
+
+    def get_cases(self) -> Iterator[dict]:
+        names = list(self.space.keys())
+        for values in itertools.product(*(self.space[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def get_n_cases(self) -> int:
+        n = 1
+        for values in self.space.values():
+            n *= len(values)
+        return n
+
+    def get_columns(self) -> list[str]:
+        return ["case", *self.space.keys(), "status", "error", *METRIC_NAMES]
+
+    def run(self,
+            csv_path: str = None,
+            on_result: Callable[[dict], None] = None) -> list[dict]:
+        '''
+        Run all cases. Rows are appended to csv_path and passed to on_result
+        as soon as cases finish. Returns rows sorted by case index.
+        '''
+        self.results = []
+        csv_file = None
+        writer = None
+        if csv_path is not None:
+            csv_file = open(csv_path, "w", newline="")
+            writer = csv.DictWriter(csv_file, fieldnames=self.get_columns())
+            writer.writeheader()
+
+        def accept(row: dict):
+            self.results.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                csv_file.flush()
+            if on_result is not None:
+                on_result(row)
+
+        try:
+            if self.n_workers == 0:
+                for case, params in enumerate(self.get_cases()):
+                    accept(run_case(self.builder, case, params))
+            else:
+                self.__run_pool(accept)
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+        self.results.sort(key=lambda row: row["case"])
+        return self.results
+
+    def __run_pool(self, accept: Callable[[dict], None]):
+        n_workers = self.n_workers or os.cpu_count() or 1
+        queue = deque(enumerate(self.get_cases()))
+        suspects = deque()
+
+        def fail(case: int, params: dict, e: Exception):
+            accept({"case": case, **params,
+                    "status": "error",
+                    "error": f"{type(e).__name__}: {e}"})
+
+        while queue or suspects:
+            isolated = len(suspects) > 0
+            source = suspects if isolated else queue
+            pool_size = 1 if isolated else n_workers
+
+            with ProcessPoolExecutor(max_workers=pool_size) as pool:
+                # No more cases in flight than workers, so only running
+                # cases are lost when a worker dies.
+                futures = {}
+                broken = False
+
+                def submit():
+                    while source and len(futures) < pool_size:
+                        case, params = source.popleft()
+                        future = pool.submit(run_case, self.builder, case, params)
+                        futures[future] = (case, params)
+
+                submit()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        case, params = futures.pop(future)
+                        try:
+                            accept(future.result())
+                        except BrokenProcessPool as e:
+                            broken = True
+                            if isolated:
+                                # The case killed its worker on its own.
+                                fail(case, params, e)
+                            else:
+                                suspects.append((case, params))
+                        except Exception as e:
+                            fail(case, params, e)
+                    if not broken:
+                        submit()
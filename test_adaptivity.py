@@ -0,0 +1,126 @@
+import tempfile
+import unittest
+import numpy as np
+from adaptivity import *
+from panel import NodeGroup, PanelChange
+from sweep import DEFAULT_PARAMS, build_panel
+from boundary import *
+
+
+def get_mock_plate(elem_length: float) -> Panel:
+    # Plate clamped on all edges with a point force at the center.
+    p = build_panel({**DEFAULT_PARAMS, "elem_length": elem_length})
+    p.dof = 6
+    p.forces = {}
+    for node_group in [NodeGroup.LFT, NodeGroup.RGT, NodeGroup.TOP, NodeGroup.BOT]:
+        p.set_constraint(node_group, ConstraintVector.new_fixed())
+    p.add_node_group("center", lambda mesh: mesh.find_nodes_near_point(0.5, 0.5, 0, 1e-6))
+    p.set_force("center", ForceVector.new(0, 0, 1.0, 0, 0, 0))
+    return p
+
+
+class TestAdaptivity(unittest.TestCase):
+    def test_error_estimate(self):
+        p = build_panel({**DEFAULT_PARAMS, "elem_length": 0.2})
+        p.compute()
+        est = get_error_estimate(p)
+        self.assertEqual(est.elem_errors.shape, (p.mesh.get_n_elements(),))
+        self.assertGreater(est.relative_error, 0.0)
+        self.assertLess(est.relative_error, 1.0)
+        self.assertAlmostEqual(est.error, np.sqrt(np.sum(est.elem_errors ** 2)))
+
+        # Uniform strain field is recovered exactly.
+        p.elem_results.eps_xy[:] = [1e-3, -2e-4, 5e-4]
+        est = get_error_estimate(p)
+        self.assertLess(est.error, 1e-12 * np.sqrt(est.energy))
+        self.assertAlmostEqual(est.energy / p.mesh.area(), 1e-3 ** 2 * p.material.dxy[0, 0]
+                               + 2 * 1e-3 * -2e-4 * p.material.dxy[0, 1]
+                               + 2e-4 ** 2 * p.material.dxy[1, 1]
+                               + 2 * 1e-3 * 5e-4 * p.material.dxy[0, 2]
+                               + 2 * -2e-4 * 5e-4 * p.material.dxy[1, 2]
+                               + 5e-4 ** 2 * p.material.dxy[2, 2])
+
+    def test_refine_mesh_keeps_loads(self):
+        p = build_panel({**DEFAULT_PARAMS, "elem_length": 0.2})
+        p.compute()
+        f_total = p.f_glob[1::2].sum()
+        rgt_coords = p.mesh.get_coords()[p.node_groups[NodeGroup.RGT]]
+
+        # The initial mesh gets the same distribution as refined ones.
+        p.distribute_loads()
+        p.compute()
+        self.assertIn(PanelChange.FORCES, p.last_changes)
+        self.assertAlmostEqual(p.f_glob[1::2].sum(), f_total)
+        fy = p.f_glob[1::2][p.node_groups[NodeGroup.RGT]].ravel()
+        self.assertTrue(np.allclose(np.sort(fy), [f_total / 10] * 2 + [f_total / 5] * 4))
+
+        # Diagonals are split first, edges of the panel - the next time.
+        for _ in range(2):
+            marked = np.ones(p.mesh.get_n_elements(), dtype=bool)
+            self.assertGreater(p.refine_mesh(marked), 0)
+        p.compute()
+
+        # New nodes on the clamped edge are clamped, the edge load is spread
+        # over the new nodes of the loaded edge by tributary length.
+        self.assertEqual(len(p.node_groups[NodeGroup.LFT]), 11)
+        rgt = p.node_groups[NodeGroup.RGT]
+        self.assertEqual(len(rgt), 11)
+        self.assertTrue(set(map(tuple, rgt_coords)) <= set(map(tuple, p.mesh.get_coords()[rgt])))
+        self.assertAlmostEqual(p.f_glob[1::2].sum(), f_total)
+        fy = p.f_glob[1::2][rgt]
+        y = p.mesh.get_coords()[rgt, 1]
+        self.assertTrue(np.allclose(fy[(y > 0) & (y < 1)], f_total / 10))
+        self.assertTrue(np.allclose(fy[(y == 0) | (y == 1)], f_total / 20))
+
+        # Weights of the loaded groups are saved with the panel.
+        with tempfile.TemporaryDirectory() as tmp:
+            p.save(tmp)
+            p_loaded = Panel.load(tmp)
+        p_loaded.compute()
+        self.assertTrue(np.allclose(p_loaded.f_glob, p.f_glob))
+
+    def test_adaptive_refinement(self):
+        target_error = 0.1
+        p = get_mock_plate(0.1)
+        refinement = AdaptiveRefinement(target_error)
+        self.assertTrue(refinement.run(p))
+        self.assertEqual(refinement.status, "converged")
+
+        history = refinement.history
+        self.assertGreater(len(history), 1)
+        self.assertLessEqual(history[-1]["relative_error"], target_error)
+        self.assertGreater(history[0]["relative_error"], target_error)
+        self.assertEqual(history[-1]["n_dofs"], p.k_glob.shape[0])
+
+        # Refinement is local.
+        area = p.mesh.get_areas()
+        self.assertGreaterEqual(area.max() / area.min(), 4.0)
+
+        # Uniform mesh with the same error has more dofs.
+        p_uniform = get_mock_plate(0.05)
+        p_uniform.compute()
+        est = get_error_estimate(p_uniform)
+        self.assertGreater(est.relative_error, history[-1]["relative_error"])
+        self.assertLess(p.k_glob.shape[0], p_uniform.k_glob.shape[0] * 2)
+
+    def test_adaptive_refinement_edge_load(self):
+        # Membrane panel clamped on the left edge, loaded on the right edge.
+        target_error = 0.05
+        p = build_panel(dict(DEFAULT_PARAMS))
+        p.compute()
+        f_total = p.f_glob[1::2].sum()
+
+        refinement = AdaptiveRefinement(target_error)
+        self.assertTrue(refinement.run(p))
+        self.assertLessEqual(refinement.history[-1]["relative_error"], target_error)
+        self.assertAlmostEqual(p.f_glob[1::2].sum(), f_total, delta=1e-9 * f_total)
+
+        # Uniform mesh with more dofs doesn't reach the target.
+        p_uniform = build_panel({**DEFAULT_PARAMS, "elem_length": 0.025})
+        p_uniform.compute()
+        self.assertGreater(get_error_estimate(p_uniform).relative_error, target_error)
+        self.assertLess(p.k_glob.shape[0], p_uniform.k_glob.shape[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import copy
+import unittest
+import bench
+
+
+class TestBench(unittest.TestCase):
+    def test_run_and_compare(self):
+        base = bench.run([0.25, 0.2], log=None)
+        self.assertEqual(len(base["cases"]), 2)
+
+        stages = base["cases"][0]["stages"]
+        for name in ["build_panel",
+                     "create_finite_elements",
+                     "create_global_stiffeness_matrix",
+                     "solve_disp",
+                     "compute_disp_magnitudes"]:
+            self.assertIn(name, stages)
+            self.assertGreaterEqual(stages[name]["time"], 0.0)
+        self.assertGreater(stages["create_finite_elements"]["peak_mem"], 0)
+
+        self.assertEqual(bench.compare(base, base), [])
+
+        new = copy.deepcopy(base)
+        new["cases"][1]["stages"]["solve_disp"]["time"] += 1.0
+        regressions = bench.compare(base, new, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]["stage"], "solve_disp")
+        self.assertEqual(regressions[0]["elem_length"], 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import numpy as np
+import material_mock
+import shellmat
+from fea import Fe3, Fe3Batch, get_dkt_b_3x9_arrays, DKT_GAUSS_POINTS
+from meshing import Quad
+
+
+def get_mock_shell_material() -> shellmat.ShellMaterial:
+    kmu4 = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+    sm = shellmat.ShellMaterial()
+    sm.add_ply(kmu4, 1e-3,  0)
+    sm.add_ply(kmu4, 1e-3,  30)
+    sm.add_ply(kmu4, 1e-3, -60)
+    sm.compute()
+    return sm
+
+
+def get_mock_mesh():
+    # Skewed non-planar quad, so that elements have arbitrary orientation.
+    q = Quad.new_by_coord(0.0, 0.0, 0.0,
+                          0.3, 1.1, 0.2,
+                          1.4, 1.3, 0.5,
+                          1.2, 0.1, 0.1)
+    return q.mesh_tria(5, 4, 1)
+
+
+class TestFe3(unittest.TestCase):
+    def test_lazy_rotation_matrices(self):
+        sm = get_mock_shell_material()
+        mesh = get_mock_mesh()
+        elem = mesh.elements[3]
+
+        fe3 = Fe3(elem.i, elem.j, elem.k)
+        fe3.set_material(sm)
+        fe3.compute()
+        self.assertIsNone(fe3._r_18x18)
+
+        r = fe3.r_3x3
+        self.assertTrue(np.array_equal(fe3.r_9x9,   np.kron(np.eye(3), r)))
+        self.assertTrue(np.array_equal(fe3.r_18x18, np.kron(np.eye(6), r)))
+        self.assertTrue(np.array_equal(fe3.r_24x24, np.kron(np.eye(8), r)))
+        self.assertIs(fe3.r_18x18, fe3.r_18x18)
+
+        v = np.arange(18, dtype=float)
+        self.assertTrue(np.allclose(fe3.rotate_blocks(v), np.matmul(fe3.r_18x18, v)))
+
+
+class TestFe3Batch(unittest.TestCase):
+    def test_match_fe3(self):
+        sm = get_mock_shell_material()
+        mesh = get_mock_mesh()
+
+        batch = Fe3Batch.new_from_mesh(mesh)
+        batch.set_material(sm)
+        batch.compute()
+        self.assertEqual(batch.n_elems, mesh.get_n_elements())
+
+        for e in range(mesh.get_n_elements()):
+            fe3 = Fe3.new_from_mesh(mesh, e)
+            fe3.set_material(sm)
+            fe3.compute()
+
+            self.assertEqual(list(batch.indeces[e]), fe3.get_index_vector())
+            self.assertAlmostEqual(batch.area[e], fe3.area, places=14)
+            self.assertAlmostEqual(batch.phi[e], fe3.phi, places=14)
+            self.assertTrue(np.allclose(batch.r_3x3[e], fe3.r_3x3, rtol=1e-13, atol=1e-15))
+            self.assertTrue(np.allclose(batch.t1_3x3[e], fe3.t1_3x3, rtol=1e-13, atol=1e-15))
+            self.assertTrue(np.allclose(batch.t2_3x3[e], fe3.t2_3x3, rtol=1e-13, atol=1e-15))
+            self.assertTrue(np.allclose(batch.b_mbr_3x6[e], fe3.b_mbr_3x6, rtol=1e-13))
+
+            k_scale = np.abs(fe3.k_mbr_6x6).max()
+            self.assertTrue(np.allclose(batch.k_mbr_6x6[e], fe3.k_mbr_6x6, rtol=1e-13, atol=1e-13 * k_scale))
+
+            batch.compute_shell()
+            for b_batch, b_fe3 in zip(batch.b_bnd_3x9_list, fe3.b_bnd_3x9_list):
+                self.assertTrue(np.allclose(b_batch[e], b_fe3, rtol=1e-13))
+
+    def test_membrane_energy_of_uniform_strain(self):
+        # Planar triangle of arbitrary orientation, uniform strain field:
+        # element energy is area * eps^T * A * eps.
+        sm = get_mock_shell_material()
+        coords = np.array([[0.1, 0.2, 0.0], [1.0, 0.7, 0.0], [0.2, 0.9, 0.0]])
+        batch = Fe3Batch(coords, np.array([[0, 1, 2], [2, 1, 0]]))
+        batch.set_material(sm)
+        batch.compute()
+
+        eps = np.array([1e-3, -4e-4, 7e-4])
+        u = eps[0] * coords[:, 0] + eps[2] * coords[:, 1]
+        v = eps[1] * coords[:, 1]
+        energy = batch.area[0] * eps @ sm.get_mbr_3x3() @ eps
+        for e in range(2):
+            d = np.stack([u, v], axis=1)[batch.indeces[e]].ravel()
+            self.assertAlmostEqual(d @ batch.k_mbr_glb_6x6[e] @ d, energy, delta=1e-12 * energy)
+
+    def test_dkt_constant_curvature(self):
+        # Quadratic deflection w = a*x^2 + b*y^2 + c*x*y is reproduced exactly.
+        a, b, c = 0.3, -0.7, 0.5
+        xy = np.array([[0.1, 0.2, 0.0], [1.3, 0.1, 0.0], [0.4, 0.9, 0.0]])
+        x, y = xy[:, 0], xy[:, 1]
+        w  = a * x ** 2 + b * y ** 2 + c * x * y
+        rx = 2 * b * y + c * x      # dw/dy
+        ry = -(2 * a * x + c * y)   # -dw/dx
+        d = np.stack([w, rx, ry], axis=1).ravel()
+        for xi, eta in DKT_GAUSS_POINTS + ((1 / 3, 1 / 3), (0.1, 0.7)):
+            b_3x9 = get_dkt_b_3x9_arrays(xy[0:1], xy[1:2], xy[2:3], xi, eta)[0]
+            self.assertTrue(np.allclose(b_3x9 @ d, [-2 * a, -2 * b, -2 * c]))
+
+    def test_shell_rigid_body_modes(self):
+        sm = get_mock_shell_material()
+        mesh = get_mock_mesh()
+        batch = Fe3Batch.new_from_mesh(mesh)
+        batch.set_material(sm)
+        batch.compute()
+        batch.compute_shell(drilling_factor=0.0)
+
+        for e in range(batch.n_elems):
+            k = batch.k_shell_glb_18x18[e]
+            self.assertTrue(np.allclose(k, k.transpose(), atol=1e-12 * np.abs(k).max()))
+            x = mesh.coords[batch.indeces[e]]
+
+            # Translations and rotations of the whole element store no energy.
+            modes = []
+            for axis in np.eye(3):
+                modes.append(np.concatenate([np.tile(axis, (3, 1)), np.zeros((3, 3))], axis=1))
+                modes.append(np.concatenate([np.cross(axis, x), np.tile(axis, (3, 1))], axis=1))
+            for mode in modes:
+                d = mode.ravel()
+                self.assertLess(np.abs(k @ d).max(), 1e-9 * np.abs(k).max() * np.abs(d).max())
+
+
+if __name__ == '__main__':
+    unittest.main()
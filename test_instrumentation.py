@@ -0,0 +1,74 @@
+import json
+import unittest
+from instrumentation import EventLog
+from test_panel import get_mock_panel
+from panel import NodeGroup
+from boundary import *
+from solvers import *
+
+
+class TestEventLog(unittest.TestCase):
+    def test_event_log(self):
+        received = []
+        log = EventLog(callback=received.append)
+
+        p = get_mock_panel()
+        p.set_solver(CgSolver(Preconditioner.JACOBI))
+        p.stage_listener = log
+        p.compute()
+
+        stages = log.get_records("stage")
+        names = [r["stage"] for r in stages]
+        self.assertIn("create_global_stiffeness_matrix", names)
+        self.assertIn("solve_disp", names)
+
+        solve = stages[names.index("solve_disp")]
+        self.assertEqual(solve["n_dofs"], p.k_glob.shape[0])
+        self.assertEqual(solve["nnz"], p.k_glob.nnz)
+        self.assertGreater(solve["iterations"], 0)
+        self.assertGreaterEqual(solve["duration"], 0.0)
+
+        computes = log.get_records("compute")
+        self.assertEqual(len(computes), 1)
+        self.assertEqual(computes[0]["n_stages"], len(stages))
+        self.assertIn("MESH", computes[0]["changes"])
+
+        # Force-only change redoes only the force and solution stages.
+        p.set_force(NodeGroup.RGT, ForceVector.new(-1e+3, 0, 0, 0, 0, 0))
+        p.compute()
+        self.assertEqual(log.n_computes, 2)
+        self.assertNotIn("create_finite_elements", log.get_stage_durations())
+        self.assertIn("solve_disp", log.get_stage_durations())
+
+        self.assertEqual(received, list(log.records))
+        lines = log.to_json_lines().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], list(log.records))
+
+        self.assertTrue(all(r["status"] == "ok" for r in log.get_records("compute")))
+        self.assertGreater(computes[0]["max_rss"], 0)
+
+    def test_failed_compute(self):
+        class FailingSolver(SpluSolver):
+            def _factorize(self, k):
+                raise RuntimeError("singular matrix")
+
+        log = EventLog()
+        p = get_mock_panel()
+        p.set_solver(FailingSolver())
+        p.stage_listener = log
+        with self.assertRaises(RuntimeError):
+            p.compute()
+
+        # The failed compute() is summarized too.
+        stages = log.get_records("stage")
+        self.assertEqual(stages[-1]["stage"], "factorize_stiffeness_matrix")
+        self.assertEqual(stages[-1]["status"], "error")
+        computes = log.get_records("compute")
+        self.assertEqual(len(computes), 1)
+        self.assertEqual(computes[0]["status"], "error")
+        self.assertIn("factorize_stiffeness_matrix", computes[0]["error"])
+        self.assertIn("singular matrix", computes[0]["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+from scipy import sparse
+import math_utils
+from math_utils import SpBuilder
+
+
+def get_mock_elements(n_elems: int, n_nodes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ms = rng.random((n_elems, 6, 6))
+    ms = ms + ms.transpose(0, 2, 1)
+    indeces = np.stack([rng.choice(n_nodes, 3, replace=False) for _ in range(n_elems)])
+    return ms, indeces
+
+
+class TestSpBuilder(unittest.TestCase):
+    def test_accept_matrices(self):
+        n_elems = 20
+        n_nodes = 12
+        block_size = 2
+        sp_size = n_nodes * block_size
+        ms, indeces = get_mock_elements(n_elems, n_nodes)
+
+        b1 = SpBuilder(n_elems * 36, 3, block_size, sp_size)
+        for m, ind in zip(ms, indeces):
+            b1.accept_matrix(m, list(ind))
+
+        b2 = SpBuilder(n_elems * 36, 3, block_size, sp_size)
+        b2.accept_matrices(ms, indeces)
+
+        self.assertEqual(b1.pos, b2.pos)
+        self.assertTrue(np.allclose(b1.get_csr().toarray(), b2.get_csr().toarray()))
+
+    def test_set_rows_cols_to_zero_and_place_1(self):
+        n_elems = 20
+        n_nodes = 12
+        block_size = 2
+        sp_size = n_nodes * block_size
+        ms, indeces = get_mock_elements(n_elems, n_nodes)
+        fixed_dofs = [0, 1, 7, 15]
+
+        b = SpBuilder(n_elems * 36, 3, block_size, sp_size)
+        b.accept_matrices(ms, indeces)
+        k_raw = b.get_csr().toarray()
+        b.set_rows_cols_to_zero_and_place_1(fixed_dofs)
+        k = b.get_csr().toarray()
+
+        k_test = k_raw.copy()
+        k_test[fixed_dofs, :] = 0.0
+        k_test[:, fixed_dofs] = 0.0
+        k_test[fixed_dofs, fixed_dofs] = 1.0
+        self.assertTrue(np.allclose(k, k_test))
+
+        k_csr = math_utils.constrain_csr(sparse.csr_matrix(k_raw), fixed_dofs)
+        self.assertTrue(np.allclose(k_csr.toarray(), k_test))
+
+    def test_extract_free_csr(self):
+        k = sparse.random(10, 10, density=0.5, format='csr', random_state=0)
+        free = np.array([1, 2, 5, 9])
+        k_free = math_utils.extract_free_csr(k, free)
+        self.assertTrue(np.allclose(k_free.toarray(), k.toarray()[np.ix_(free, free)]))
+
+    def test_assemble_bsr(self):
+        n_elems = 20
+        n_nodes = 12
+        rng = np.random.default_rng(1)
+        ms = rng.random((n_elems, 18, 18))
+        ms = ms + ms.transpose(0, 2, 1)
+        _, indeces = get_mock_elements(n_elems, n_nodes)
+        # Every node has a diagonal block.
+        indeces[:4] = np.arange(12).reshape(4, 3)
+
+        b = SpBuilder(n_elems * 18 * 18, 3, 6, n_nodes * 6)
+        b.accept_matrices(ms, indeces)
+        k_test = b.get_csr().toarray()
+
+        k = math_utils.assemble_bsr(ms, indeces, 6, n_nodes)
+        self.assertEqual(k.format, 'bsr')
+        self.assertEqual(k.blocksize, (6, 6))
+        self.assertTrue(np.allclose(k.toarray(), k_test))
+
+        fixed_dofs = [0, 1, 7, 15, 40, 71]
+        k_c = math_utils.constrain_bsr(k, fixed_dofs)
+        self.assertEqual(k_c.format, 'bsr')
+        k_c_test = math_utils.constrain_csr(sparse.csr_matrix(k_test), fixed_dofs)
+        self.assertTrue(np.allclose(k_c.toarray(), k_c_test.toarray()))
+        self.assertTrue(np.allclose(k.toarray(), k_test))
+
+    def test_assembly_pattern(self):
+        n_elems = 20
+        n_nodes = 12
+        block_size = 2
+        ms, indeces = get_mock_elements(n_elems, n_nodes)
+
+        b = SpBuilder(n_elems * 36, 3, block_size, n_nodes * block_size)
+        b.accept_matrices(ms, indeces)
+        k_test = b.get_csr()
+
+        pattern = math_utils.AssemblyPattern(indeces, block_size, n_nodes)
+        k = pattern.assemble(ms)
+        self.assertEqual(k.format, 'csr')
+        self.assertEqual(pattern.get_nnz(), k_test.nnz)
+        self.assertTrue(np.array_equal(k.indptr, k_test.indptr))
+        self.assertTrue(np.array_equal(k.indices, k_test.indices))
+        self.assertTrue(np.allclose(k.toarray(), k_test.toarray()))
+
+        # Refill with other values, the structure is the same.
+        k2 = pattern.assemble(2 * ms)
+        self.assertTrue(np.allclose(k2.toarray(), 2 * k_test.toarray()))
+        self.assertTrue(np.allclose(k.toarray(), k_test.toarray()))
+
+        pattern = math_utils.AssemblyPattern(indeces, block_size, n_nodes, blocked=True)
+        k = pattern.assemble(ms)
+        self.assertEqual(k.format, 'bsr')
+        self.assertTrue(np.allclose(k.toarray(), k_test.toarray()))
+
+
+if __name__ == '__main__':
+    unittest.main()
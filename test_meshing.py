@@ -1,4 +1,6 @@
-from meshing import Node, Point, Quad
+from meshing import Mesh, Node, NodeIndex, Point, Quad
+from boundary import *
+import numpy as np
 import unittest
 
 
@@ -60,6 +62,28 @@ class TestGeom(unittest.TestCase):
         self.assertEqual(m.get_n_elements(), 2 * nlen * nwid)
         self.assertAlmostEqual(m.area(), test_area)
 
+    def test_quad_mesh_tria_pattern(self):
+        q = get_mock_quad(2, 1)
+
+        # 3 --- 4 --- 5
+        # |  /  |  \  |
+        # 0 --- 1 --- 2
+        m = q.mesh_tria(2, 1, 1)
+        self.assertTrue(np.allclose(m.coords[4], [1, 1, 0]))
+        self.assertTrue(np.array_equal(m.conn, [[0, 1, 4], [4, 3, 0],
+                                                [1, 2, 4], [5, 4, 2]]))
+
+        m = q.mesh_tria(2, 1, -1)
+        self.assertTrue(np.array_equal(m.conn, [[0, 1, 3], [4, 3, 1],
+                                                [1, 2, 5], [5, 4, 1]]))
+
+        # All elements are oriented counterclockwise for both variants.
+        for start_variant in [1, -1]:
+            m = q.mesh_tria(6, 5, start_variant)
+            xyz = m.coords[m.conn]
+            u = np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0])
+            self.assertTrue(np.all(u[:, 2] > 0))
+
 
 class TestMesh(unittest.TestCase):
     def test_is_near_point(self):
@@ -144,6 +168,141 @@ class TestMesh(unittest.TestCase):
                                              eps)
         self.assertEqual(len(right_nodes), n_nodes_dy_test)
 
+    def test_array_backed_mesh(self):
+        m = Mesh()
+        m.add_node(Node(0, 0, 0, 0))
+        m.add_node(Node(1, 1, 0, 0))
+        m.add_node(Node(2, 1, 1, 0))
+        m.add_node(Node(3, 0, 1, 0))
+        m.add_element(0, 1, 2)
+        m.add_element(2, 3, 0)
+        m.set_tag_to_all_elements(7)
+
+        self.assertEqual(m.coords.shape, (4, 3))
+        self.assertEqual(m.conn.dtype, np.int32)
+        self.assertTrue(np.array_equal(m.conn, [[0, 1, 2], [2, 3, 0]]))
+        self.assertTrue(np.array_equal(m.tags, [7, 7]))
+        self.assertAlmostEqual(m.area(), 1.0)
+
+        # Views read and write the arrays of the mesh.
+        node = m.nodes[2]
+        self.assertEqual((node.x, node.y, node.z), (1.0, 1.0, 0.0))
+        self.assertIs(m.elements[1].i, node)
+        self.assertAlmostEqual(m.elements[0].area(), 0.5)
+
+        c = ConstraintVector()
+        c.set_dof(DofType.TY, Constraint.FIXED)
+        node.constraint_superposition(c)
+        node.force_superposition(ForceVector.new(1, 2, 3, 4, 5, 6))
+        self.assertFalse(node.is_free())
+        self.assertEqual(node.constraint_vector.ty, Constraint.FIXED)
+        self.assertEqual(node.constraint_vector.tx, Constraint.FREE)
+        self.assertTrue(np.array_equal(m.dof_fixed[2], [False, True, False, False, False, False]))
+        self.assertTrue(np.array_equal(m.loads[2], [1, 2, 3, 4, 5, 6]))
+
+        m.clear_constraints()
+        m.clear_forces()
+        self.assertTrue(node.is_free())
+        self.assertEqual(node.force_vector.fz, 0.0)
+
+    def test_renumber_rcm(self):
+        q = get_mock_quad(10, 1)
+        m = q.mesh_tria(50, 5, 1)
+        coords = m.get_coords()
+        area = m.area()
+
+        report = m.renumber_rcm(compute_fill=True)
+        self.assertLess(report.bandwidth_after, report.bandwidth_before)
+        self.assertLess(report.profile_after, report.profile_before)
+        self.assertLess(report.fill_after, report.fill_before)
+
+        # Node indices are consecutive, nodes keep their coordinates.
+        for i, node in enumerate(m.nodes):
+            self.assertEqual(node.index, i)
+        self.assertTrue(np.allclose(np.sort(m.get_coords(), axis=0), np.sort(coords, axis=0)))
+        self.assertAlmostEqual(m.area(), area)
+
+
+class TestNodeIndex(unittest.TestCase):
+    def test_queries(self):
+        rng = np.random.default_rng(0)
+        coords = rng.random((500, 3)) * [4.0, 2.0, 0.5]
+        index = NodeIndex(coords)
+
+        p = coords[17]
+        eps = 0.3
+        test = np.flatnonzero(np.linalg.norm(coords - p, axis=1) < eps)
+        self.assertTrue(np.array_equal(index.find_near_point(p, eps), test))
+
+        a = np.array([0.0, 0.5, 0.1])
+        b = np.array([4.0, 1.5, 0.3])
+        e = (b - a) / np.linalg.norm(b - a)
+        an = coords - a
+        dist = np.linalg.norm(an - np.outer(an @ e, e), axis=1)
+        test = np.flatnonzero(dist < eps)
+        self.assertTrue(np.array_equal(index.find_on_line(a, b, eps), test))
+
+        # eps smaller than the cell size: only cells along the line.
+        test = np.flatnonzero(dist < 0.05)
+        self.assertTrue(np.array_equal(index.find_on_line(a, b, 0.05), test))
+
+        # eps much larger than the cell size.
+        test = np.flatnonzero(dist < 10.0)
+        self.assertTrue(np.array_equal(index.find_on_line(a, b, 10.0), test))
+
+        lo = np.array([1.0, 0.5, 0.0])
+        hi = np.array([2.5, 1.0, 0.25])
+        test = np.flatnonzero(np.all((coords >= lo) & (coords <= hi), axis=1))
+        self.assertTrue(np.array_equal(index.find_in_box(lo, hi), test))
+
+        # Triangle x >= 0, y >= 0, x + y <= 2.
+        polygon = np.array([[0, 0], [2, 0], [0, 2]], dtype=float)
+        x = coords[:, 0]
+        y = coords[:, 1]
+        test = np.flatnonzero(x + y < 2)
+        self.assertTrue(np.array_equal(index.find_in_polygon(polygon), test))
+
+    def test_mesh_queries(self):
+        q = get_mock_quad(2, 1)
+        m = q.mesh_tria(20, 10, 1)
+        eps = 1e-6
+        self.assertEqual(len(m.find_nodes_in_box(0.5, 0.5, -eps, 1.0 + eps, 1.0 + eps, eps)), 6 * 6)
+        self.assertEqual(len(m.find_nodes_on_edge(2, 0, 0, 2, 1, 0, eps)), 11)
+        self.assertTrue(np.array_equal(m.find_nodes_near_point(2, 1, 0, eps), [m.get_n_nodes() - 1]))
+
+    def test_refine(self):
+        q = get_mock_quad(2, 1)
+        m = q.mesh_tria(4, 2, 1)
+        m.tags[:] = np.arange(m.get_n_elements())
+
+        for _ in range(4):
+            marked = np.zeros(m.get_n_elements(), dtype=bool)
+            marked[:3] = True
+            m_ref = m.refine(marked)
+
+            # Old nodes keep indeces, marked elements are split.
+            self.assertTrue(np.array_equal(m_ref.coords[:m.get_n_nodes()], m.coords))
+            self.assertGreater(m_ref.get_n_elements(), m.get_n_elements())
+            self.assertAlmostEqual(m_ref.area(), 2.0)
+            self.assertEqual(set(m_ref.tags), set(m.tags))
+
+            # Conforming: inner edges belong to two elements, others lie on the boundary.
+            edges, elem_edges = m_ref.get_edges()
+            n_edge_elems = np.bincount(elem_edges.ravel(), minlength=edges.shape[0])
+            self.assertLessEqual(n_edge_elems.max(), 2)
+            xy = m_ref.coords[edges[n_edge_elems == 1]][:, :, 0:2]
+            on_boundary = (np.all(np.isclose(xy[:, :, 0], 0), axis=1) |
+                           np.all(np.isclose(xy[:, :, 0], 2), axis=1) |
+                           np.all(np.isclose(xy[:, :, 1], 0), axis=1) |
+                           np.all(np.isclose(xy[:, :, 1], 1), axis=1))
+            self.assertTrue(np.all(on_boundary))
+
+            # Orientation is kept.
+            xyz = m_ref.coords[m_ref.conn]
+            u = np.cross(xyz[:, 1] - xyz[:, 0], xyz[:, 2] - xyz[:, 0])
+            self.assertTrue(np.all(u[:, 2] > 0))
+            m = m_ref
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
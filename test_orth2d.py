@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import material_mock
+from orth2d import *
+
+
+class TestOrth2d(unittest.TestCase):
+    def test_criteria_arrays(self):
+        kinds = [material_mock.MaterialMockKind.KMU4, material_mock.MaterialMockKind.VKU25]
+        rng = np.random.default_rng(0)
+        for kind in kinds:
+            m = material_mock.get_material_mock(kind)
+            sig12 = rng.uniform(-1.0, 1.0, (50, 3)) * [m.sig1t, m.sig2t, m.tau_max]
+            fi, fos, mos = m.get_criteria_arrays(sig12)
+            self.assertEqual(fi.shape, (50, 4))
+
+            for i in range(sig12.shape[0]):
+                for c, criterion in enumerate(m.get_criteria(sig12[i])):
+                    self.assertEqual(criterion.criterion_type, CriterionType(c))
+                    self.assertAlmostEqual(fi[i, c],  criterion.failure_index,    places=10)
+                    self.assertAlmostEqual(fos[i, c], criterion.factor_of_safety, places=10)
+                    self.assertAlmostEqual(mos[i, c], criterion.margin_of_safety, places=10)
+
+    def test_missing_strength(self):
+        # Scalar and vectorized criteria both refuse an unset strength.
+        m = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+        m.sig2c = 0.0
+        m.compute()
+        sig12 = np.array([[1e+8, -5e+7, 1e+7]])
+        with self.assertRaises(ZeroDivisionError):
+            m.get_criterion_hill(sig12[0])
+        with self.assertRaises(Exception) as ctx:
+            m.get_criteria_arrays(sig12)
+        self.assertIn("sig2c", str(ctx.exception))
+        with self.assertRaises(Exception):
+            m.get_criterion_max_stress_arrays(sig12)
+
+
+if __name__ == '__main__':
+    unittest.main()
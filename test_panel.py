@@ -0,0 +1,409 @@
+import tempfile
+import unittest
+import numpy as np
+import material_mock
+import shellmat
+from panel import Panel, NodeGroup, PanelChange
+from boundary import *
+from solvers import *
+
+
+def get_mock_panel(length: float = 1.0, width: float = 0.5, elem_length: float = 0.1) -> Panel:
+    kmu4 = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+
+    sm = shellmat.ShellMaterial()
+    sm.add_ply(kmu4, 1e-3,  0)
+    sm.add_ply(kmu4, 1e-3,  45)
+    sm.add_ply(kmu4, 1e-3,  90)
+    sm.compute()
+
+    p = Panel(length=length, width=width)
+    p.set_material(sm)
+    p.elem_length = elem_length
+    p.do_mesh()
+    p.set_constraint(NodeGroup.LFT, ConstraintVector.new_fixed())
+    p.set_force(NodeGroup.RGT, ForceVector.new(1e+3, 1e+4, 0, 0, 0, 0))
+    return p
+
+
+class TestPanel(unittest.TestCase):
+    def test_compute(self):
+        p = get_mock_panel()
+        p.compute()
+        n_dofs = p.mesh.get_n_nodes() * p.dof
+        self.assertEqual(p.d_glob.shape, (n_dofs,))
+
+        # Clamped edge doesn't move.
+        for node in p.node_groups[NodeGroup.LFT]:
+            i = node * p.dof
+            self.assertEqual(p.d_glob[i], 0.0)
+            self.assertEqual(p.d_glob[i + 1], 0.0)
+
+        # Tension and positive shear on the free edge.
+        self.assertGreater(p.disp_mag[0, 1], 0.0)
+        self.assertGreater(p.disp_mag[1, 1], 0.0)
+
+    def test_reduce_fixed_dofs(self):
+        p1 = get_mock_panel()
+        p1.compute()
+
+        p2 = get_mock_panel()
+        p2.reduce_fixed_dofs = True
+        p2.compute()
+
+        n_free = len(p2.free_dofs)
+        self.assertEqual(p2.k_glob.shape, (n_free, n_free))
+        self.assertTrue(np.allclose(p1.d_glob, p2.d_glob))
+        self.assertTrue(np.allclose(p1.disp_mag, p2.disp_mag))
+
+    def test_renumber_nodes(self):
+        p1 = get_mock_panel(length=3.0, width=0.3)
+        p1.compute()
+
+        p2 = get_mock_panel(length=3.0, width=0.3)
+        p2.renumber_nodes = True
+        p2.do_mesh()
+        p2.compute()
+        report = p2.renumbering_report
+        self.assertLess(report.bandwidth_after, report.bandwidth_before)
+
+        self.assertTrue(np.allclose(p1.disp_mag, p2.disp_mag))
+        for node in p2.node_groups[NodeGroup.LFT]:
+            self.assertEqual(p2.d_glob[node * p2.dof], 0.0)
+
+        # Displacements of the same corner node are equal.
+        n1 = p1.node_groups[NodeGroup.N11][0] * p1.dof
+        n2 = p2.node_groups[NodeGroup.N11][0] * p2.dof
+        self.assertTrue(np.allclose(p1.d_glob[n1:n1 + 2], p2.d_glob[n2:n2 + 2]))
+
+    def test_user_node_group(self):
+        p = get_mock_panel()
+        p.forces = {}
+        p.add_node_group("corner", lambda m: m.find_nodes_in_box(0.9, 0.4, 0, 1.0, 0.5, 0))
+        self.assertEqual(len(p.node_groups["corner"]), 4)
+        p.set_force("corner", ForceVector.new(1e+3, 0, 0, 0, 0, 0))
+        p.compute()
+        self.assertGreater(p.disp_mag[0, 1], 0.0)
+
+        # The group is selected again on the new mesh.
+        p.elem_length = 0.05
+        p.do_mesh()
+        self.assertEqual(len(p.node_groups["corner"]), 9)
+
+    def test_solvers(self):
+        p = get_mock_panel()
+        p.compute()
+        d_test = p.d_glob
+
+        solvers = [
+            SpluSolver(),
+            CholeskySolver(),
+            CgSolver(Preconditioner.NONE, rtol=1e-12),
+            CgSolver(Preconditioner.JACOBI, rtol=1e-12),
+            CgSolver(Preconditioner.ILU, rtol=1e-12),
+            MixedPrecisionSolver(rtol=1e-12)]
+
+        for solver in solvers:
+            p = get_mock_panel()
+            p.set_solver(solver)
+            p.compute()
+            self.assertEqual(p.solve_info.solver_name, solver.name)
+            self.assertLess(p.solve_info.residual, 1e-10)
+            self.assertTrue(np.allclose(p.d_glob, d_test, rtol=1e-6, atol=1e-9 * np.abs(d_test).max()))
+
+        # Iterative solvers report iterations, preconditioning reduces them.
+        self.assertGreater(solvers[2].info.iterations, solvers[3].info.iterations)
+        self.assertGreater(solvers[3].info.iterations, solvers[4].info.iterations)
+
+        # Mixed precision reaches the tolerance by refinement, without fallback.
+        mixed = solvers[5]
+        self.assertFalse(mixed.fallback)
+        self.assertGreater(mixed.info.iterations, 0)
+        self.assertLess(mixed.info.residual, 1e-12)
+
+        # Refinement that doesn't reduce the residual enough falls back to float64.
+        mixed = MixedPrecisionSolver(rtol=1e-12, stall_factor=1e-30)
+        p = get_mock_panel()
+        p.set_solver(mixed)
+        p.set_load_case_force("top", NodeGroup.TOP, ForceVector.new(-5e+2, 0, 0, 0, 0, 0))
+        p.compute()
+        self.assertTrue(mixed.fallback)
+        self.assertTrue(np.allclose(p.d_glob, d_test, rtol=1e-10, atol=1e-12 * np.abs(d_test).max()))
+
+        # A solver without _solve() can't be created.
+        class IncompleteSolver(LinearSolver):
+            def _factorize(self, k):
+                pass
+
+        with self.assertRaises(TypeError):
+            IncompleteSolver()
+
+    def test_load_cases(self):
+        f_top = ForceVector.new(-5e+2, 0, 0, 0, 0, 0)
+
+        p = get_mock_panel()
+        p.set_solver(SpluSolver())
+        p.set_load_case_force("double", NodeGroup.RGT, ForceVector.new(2e+3, 2e+4, 0, 0, 0, 0))
+        p.set_load_case_force("top", NodeGroup.TOP, f_top)
+        p.set_load_case_force("both", NodeGroup.RGT, ForceVector.new(1e+3, 1e+4, 0, 0, 0, 0))
+        p.set_load_case_force("both", NodeGroup.TOP, f_top)
+        p.compute()
+        self.assertEqual(list(p.load_case_results.keys()), ["double", "top", "both"])
+
+        results = p.load_case_results
+        self.assertTrue(np.allclose(results["double"].d_glob, 2 * p.d_glob))
+        self.assertTrue(np.allclose(results["double"].disp_mag, 2 * p.disp_mag))
+        self.assertTrue(np.allclose(results["both"].d_glob, p.d_glob + results["top"].d_glob))
+
+        p_top = get_mock_panel()
+        p_top.forces = {}
+        p_top.set_force(NodeGroup.TOP, f_top)
+        p_top.compute()
+        self.assertTrue(np.allclose(results["top"].d_glob, p_top.d_glob))
+        self.assertTrue(np.allclose(results["top"].disp_mag, p_top.disp_mag))
+
+    def test_incremental_compute(self):
+        p = get_mock_panel()
+        p.compute()
+        self.assertEqual(p.last_changes, set(PanelChange))
+        fe3_batch = p.fe3_batch
+        k_glob_raw = p.k_glob_raw
+        k_glob = p.k_glob
+        pattern = p.assembly_pattern
+
+        # Nothing changed.
+        p.compute()
+        self.assertEqual(p.last_changes, set())
+        self.assertIs(p.k_glob, k_glob)
+
+        # Force-only change: no element and matrix work.
+        f = ForceVector.new(-2e+3, 0, 0, 0, 0, 0)
+        p.set_force(NodeGroup.RGT, f)
+        p.compute()
+        self.assertEqual(p.last_changes, {PanelChange.FORCES})
+        self.assertIs(p.fe3_batch, fe3_batch)
+        self.assertIs(p.k_glob, k_glob)
+
+        p_test = get_mock_panel()
+        p_test.set_force(NodeGroup.RGT, f)
+        p_test.compute()
+        self.assertTrue(np.allclose(p.d_glob, p_test.d_glob))
+
+        # Constraint-only change: unconstrained matrix is reused.
+        c = ConstraintVector()
+        c.set_dof(DofType.TY, Constraint.FIXED)
+        p.set_constraint(NodeGroup.BOT, c)
+        p.compute()
+        self.assertEqual(p.last_changes, {PanelChange.CONSTRAINTS})
+        self.assertIs(p.k_glob_raw, k_glob_raw)
+        self.assertIsNot(p.k_glob, k_glob)
+
+        p_test.set_constraint(NodeGroup.BOT, c)
+        p_test.compute()
+        self.assertTrue(np.allclose(p.d_glob, p_test.d_glob))
+
+        # In-place material modification has to be marked explicitly.
+        p.material.remove_ply(2)
+        p.material.compute()
+        p.mark_changed(PanelChange.MATERIAL)
+        p.compute()
+        self.assertEqual(p.last_changes, {PanelChange.MATERIAL})
+        self.assertIsNot(p.k_glob_raw, k_glob_raw)
+        # Sparsity pattern of the same mesh is reused.
+        self.assertIs(p.assembly_pattern, pattern)
+        self.assertFalse(np.allclose(p.d_glob, p_test.d_glob))
+
+    def test_element_results(self):
+        p = get_mock_panel()
+        p.set_load_case_force("double", NodeGroup.RGT, ForceVector.new(2e+3, 2e+4, 0, 0, 0, 0))
+        p.compute()
+        res = p.elem_results
+        n_elems = p.mesh.get_n_elements()
+        n_plies = len(p.material.plies)
+        self.assertEqual(res.eps_xy.shape, (n_elems, 3))
+        self.assertEqual(res.loads.shape, (n_elems, 6))
+        self.assertEqual(res.sig12.shape, (n_elems, n_plies, 3))
+
+        # Ply stresses match ShellMaterial.get_stress() for element loads.
+        for e in [0, n_elems // 2, n_elems - 1]:
+            stress = p.material.get_stress(res.loads[e])
+            self.assertTrue(np.allclose(res.sig12[e], stress.get_sig12_table()))
+            fi = [[c.failure_index for c in ply_stress.criteria] for ply_stress in stress.ply_stress_list]
+            self.assertTrue(np.allclose(res.failure_index[e], fi))
+
+        res_double = p.get_load_case_element_results("double")
+        self.assertTrue(np.allclose(res_double.sig12, 2 * res.sig12))
+        self.assertIs(p.get_load_case_element_results("double"), res_double)
+
+        # Linear displacement field gives constant strain in every element.
+        a, b, c, d = 1e-3, 2e-4, -3e-4, 5e-4
+        coords = p.mesh.get_coords()
+        d_lin = np.zeros(p.mesh.get_n_nodes() * p.dof)
+        d_lin[0::2] = a * coords[:, 0] + b * coords[:, 1]
+        d_lin[1::2] = c * coords[:, 0] + d * coords[:, 1]
+        res_lin = p.get_element_results(d_lin)
+        self.assertTrue(np.allclose(res_lin.eps_xy, [a, d, b + c]))
+
+    def test_save_load(self):
+        p = get_mock_panel()
+        p.set_load_case_force("top", NodeGroup.TOP, ForceVector.new(-5e+2, 0, 0, 0, 0, 0))
+        p.add_node_group("corner", lambda mesh: mesh.find_nodes_near_point(0, 0, 0, 1e-6))
+        p.compute()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            p.save(tmp)
+            p2 = Panel.load(tmp)
+
+            self.assertIsInstance(p2.d_glob, np.memmap)
+            self.assertTrue(np.array_equal(p2.d_glob, p.d_glob))
+            self.assertTrue(np.array_equal(p2.mesh.coords, p.mesh.coords))
+            self.assertTrue(np.array_equal(p2.mesh.conn, p.mesh.conn))
+            self.assertTrue(np.array_equal(p2.node_groups["corner"], p.node_groups["corner"]))
+            self.assertEqual((p2.k_glob - p.k_glob).count_nonzero(), 0)
+            self.assertTrue(np.array_equal(p2.elem_results.sig12, p.elem_results.sig12))
+            self.assertTrue(np.array_equal(p2.load_case_results["top"].d_glob,
+                                           p.load_case_results["top"].d_glob))
+            self.assertTrue(np.array_equal(p2.disp_mag, p.disp_mag))
+            self.assertEqual(p2.constraints[NodeGroup.LFT].as_tuple(),
+                             p.constraints[NodeGroup.LFT].as_tuple())
+
+            # Post-processing of loaded results.
+            res = p2.get_load_case_element_results("top")
+            res_test = p.get_load_case_element_results("top")
+            self.assertTrue(np.allclose(res.failure_index, res_test.failure_index))
+
+            # Only the factorization is redone.
+            p2.compute()
+            self.assertEqual(p2.last_changes, {PanelChange.SOLVER})
+            self.assertTrue(np.allclose(p2.d_glob, p.d_glob))
+
+            p2.set_force(NodeGroup.RGT, ForceVector.new(0, 1e+3, 0, 0, 0, 0))
+            p2.compute()
+            self.assertEqual(p2.last_changes, {PanelChange.FORCES})
+
+    def test_poly_data(self):
+        p = get_mock_panel()
+        p.compute()
+        poly = p.get_poly_data()
+        self.assertEqual(poly.n_points, p.mesh.get_n_nodes())
+        self.assertEqual(poly.n_cells, p.mesh.get_n_elements())
+        self.assertTrue(np.array_equal(poly.regular_faces, p.mesh.conn))
+
+        p.update_poly_data(deform_scale=2.0)
+        u = p.d_glob.reshape(-1, p.dof)
+        self.assertTrue(np.allclose(poly.points[:, 0:2], p.mesh.coords[:, 0:2] + 2.0 * u))
+        self.assertTrue(np.allclose(poly.cell_data["eps_x"], p.elem_results.eps_xy[:, 0]))
+        fi = poly.cell_data["failure_index"]
+
+        # Results of another compute() are written into the same arrays.
+        p.set_force(NodeGroup.RGT, ForceVector.new(2e+3, 2e+4, 0, 0, 0, 0))
+        p.compute()
+        self.assertIs(p.update_poly_data(), poly)
+        self.assertTrue(np.shares_memory(poly.cell_data["failure_index"], fi))
+        self.assertTrue(np.allclose(fi, p.elem_results.failure_index.reshape(len(fi), -1).max(axis=1)))
+        self.assertTrue(np.allclose(poly.points, p.mesh.coords))
+        self.assertTrue(np.allclose(poly.point_data["displacement"][:, 0:2], u * 2))
+
+        # Displacement of a load case without its element results drops
+        # the cell data of the main case.
+        p.set_load_case_force("bot", NodeGroup.RGT, ForceVector.new(0, -1e+4, 0, 0, 0, 0))
+        p.compute()
+        p.update_poly_data(d_glob=p.load_case_results["bot"].d_glob)
+        self.assertNotIn("eps_x", poly.cell_data.keys())
+        self.assertNotIn("failure_index", poly.cell_data.keys())
+        result = p.load_case_results["bot"]
+        p.update_poly_data(d_glob=result.d_glob, elem_results=p.get_load_case_element_results("bot"))
+        self.assertTrue(np.allclose(poly.cell_data["eps_x"], result.elem_results.eps_xy[:, 0]))
+
+        # New mesh - new surface.
+        p.elem_length = 0.05
+        p.do_mesh()
+        self.assertIsNot(p.get_poly_data(), poly)
+
+    def test_shell_dofs(self):
+        # In-plane loading: shell gives the membrane solution, no deflection.
+        p2 = get_mock_panel()
+        p2.compute()
+        p6 = get_mock_panel()
+        p6.dof = 6
+        p6.compute()
+        self.assertEqual(p6.k_glob.format, 'bsr')
+        d6 = p6.d_glob.reshape(-1, 6)
+        self.assertTrue(np.allclose(d6[:, 0:2].ravel(), p2.d_glob))
+        self.assertTrue(np.all(d6[:, 2:] == 0.0))
+        self.assertTrue(np.allclose(p6.elem_results.sig12, p2.elem_results.sig12))
+
+        # Changing dof of a computed panel recomputes it as a new mesh.
+        p2.dof = 6
+        p2.compute()
+        self.assertIn(PanelChange.MESH, p2.last_changes)
+        self.assertTrue(np.allclose(p2.d_glob, p6.d_glob))
+        p2.dof = 2
+        p2.compute()
+        self.assertEqual(p2.k_glob.shape[0], p6.k_glob.shape[0] // 3)
+        self.assertTrue(np.allclose(p2.d_glob, d6[:, 0:2].ravel()))
+
+        # Narrow cantilever plate under tip load agrees with beam theory.
+        d16 = material_mock.get_material_mock(material_mock.MaterialMockKind.D16)
+        sm = shellmat.ShellMaterial()
+        sm.add_ply(d16, 1e-2, 0)
+        sm.compute()
+
+        p = Panel(length=1.0, width=0.1, dof=6)
+        p.set_material(sm)
+        p.elem_length = 0.025
+        p.do_mesh()
+        p.set_constraint(NodeGroup.LFT, ConstraintVector.new_fixed())
+        p.set_force(NodeGroup.RGT, ForceVector.new(0, 0, 1.0, 0, 0, 0))
+        p.compute()
+
+        force = len(p.node_groups[NodeGroup.RGT]) * 1.0
+        inertia = 0.1 * 1e-2 ** 3 / 12
+        w_beam = force * 1.0 ** 3 / (3 * d16.e1 * inertia)
+        self.assertAlmostEqual(p.d_glob[2::6].max() / w_beam, 1.0, delta=0.03)
+
+        # Bending moment at the clamped edge.
+        res = p.elem_results
+        self.assertLess(res.kappa_xy[:, 0].min(), 0.0)
+        m_root = res.loads[:, 3].min() * 0.1
+        self.assertAlmostEqual(m_root / -force, 1.0, delta=0.1)
+
+    def test_memory_limit(self):
+        for dof in [2, 6]:
+            p = get_mock_panel()
+            p.dof = dof
+            p.compute()
+
+            with tempfile.TemporaryDirectory() as tmp:
+                p_chunked = get_mock_panel()
+                p_chunked.dof = dof
+                p_chunked.memory_limit = 100_000
+                p_chunked.elem_data_path = tmp
+                p_chunked.compute()
+
+                n_elems = p.mesh.get_n_elements()
+                self.assertGreater(p_chunked.elem_chunk_size, 0)
+                self.assertLess(p_chunked.elem_chunk_size, n_elems)
+
+                # The chunked path scatters through slots, the BSR summation
+                # matrix isn't built.
+                self.assertIsNone(p_chunked.assembly_pattern.summation)
+                if dof == 6:
+                    self.assertIsNotNone(p.assembly_pattern.summation)
+                    self.assertGreater(p.assembly_pattern.get_nbytes(), p_chunked.assembly_pattern.get_nbytes())
+
+                # Only compact arrays are kept, memory-mapped.
+                batch = p_chunked.fe3_batch
+                self.assertIsNone(batch.k_mbr_6x6)
+                self.assertIsInstance(batch.r_3x3, np.memmap)
+                self.assertTrue(np.array_equal(batch.r_3x3, p.fe3_batch.r_3x3))
+
+                k_diff = abs(p_chunked.k_glob_raw - p.k_glob_raw).max()
+                self.assertLess(k_diff, 1e-12 * abs(p.k_glob_raw).max())
+                self.assertTrue(np.allclose(p_chunked.d_glob, p.d_glob))
+                self.assertTrue(np.allclose(p_chunked.elem_results.sig12, p.elem_results.sig12))
+                del batch, p_chunked
+
+
+if __name__ == '__main__':
+    unittest.main()
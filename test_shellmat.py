@@ -1,5 +1,7 @@
+import gc
 import math
 import unittest
+import weakref
 import orth2d
 import material_mock
 import shellmat
@@ -229,6 +231,92 @@ class TestShellMaterial(unittest.TestCase):
         fos_table = sm_stress.get_crit_table(orth2d.CriterionValueType.FACTOR_OF_SAFETY)
         self.assertTrue(np.allclose(fos_table, fos_table_test, rtol=tol))
 
+    def test_laminate_cache(self):
+        kmu4 = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+        load = np.array([1e+5, -2e+4, 3e+4, 10.0, 0.0, -5.0], dtype=float)
+
+        def make(angles: list[float], cache: shellmat.LaminateCache) -> shellmat.ShellMaterial:
+            sm = shellmat.ShellMaterial()
+            sm.cache = cache
+            for a in angles:
+                sm.add_ply(kmu4, 1e-3, a)
+            sm.compute()
+            return sm
+
+        sm_ref = make([0, 45, 90], None)
+
+        cache = shellmat.LaminateCache(maxsize=2)
+        sm1 = make([0, 45, 90], cache)
+        sm2 = make([0, 45, 90], cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Cached results are equal to computed ones and are not shared.
+        self.assertTrue(np.allclose(sm2.dxy, sm_ref.dxy))
+        self.assertTrue(np.allclose(sm2.dxy_inv, sm_ref.dxy_inv))
+        self.assertAlmostEqual(sm2.ex, sm_ref.ex)
+        self.assertIsNot(sm2.dxy, sm1.dxy)
+        self.assertTrue(np.allclose(sm2.get_stress(load).get_sig12_table(),
+                                    sm_ref.get_stress(load).get_sig12_table()))
+
+        # Least recently used stack-up is evicted.
+        make([0, 90], cache)
+        make([0, 45, 90], cache)
+        make([45, -45], cache)
+        self.assertEqual(len(cache), 2)
+        make([0, 90], cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+        # A material changed in place gives a new key, not the stale stack-up.
+        kmu4.e1 *= 2
+        kmu4.compute()
+        sm3 = make([0, 45, 90], cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertTrue(np.allclose(sm3.dxy, make([0, 45, 90], None).dxy))
+        self.assertGreater(sm3.dxy[0, 0], sm_ref.dxy[0, 0])
+
+        # The cache doesn't keep materials alive.
+        material = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+        sm = shellmat.ShellMaterial()
+        sm.add_ply(material, 1e-3, 30)
+        sm.compute()
+        ref = weakref.ref(material)
+        del sm, material
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_laminate_batch(self):
+        kmu4  = material_mock.get_material_mock(material_mock.MaterialMockKind.KMU4)
+        vku25 = material_mock.get_material_mock(material_mock.MaterialMockKind.VKU25)
+
+        m = [[0, 1, 0], [1], [0, 0, 1, 1, 0]]
+        t = [[1e-3, 2e-3, 1.5e-3], [3e-3], [1e-3, 1e-3, 2e-3, 2e-3, 1e-3]]
+        a = [[0, 45, 90], [30], [0, 45, -45, 90, 15]]
+
+        batch = shellmat.LaminateBatch.new_from_ragged([kmu4, vku25], m, t, a)
+        batch.compute()
+        self.assertEqual(batch.dxy.shape, (3, 6, 6))
+        self.assertEqual(batch.thicknesses.shape, (3, 5))
+
+        for k in range(3):
+            sm = batch.get_shell_material(k)
+            sm.cache = None
+            sm.compute()
+            self.assertEqual(sm.get_nplies(), len(t[k]))
+            scale = np.abs(sm.dxy).max()
+            self.assertTrue(np.allclose(batch.dxy[k], sm.dxy, rtol=1e-12, atol=1e-12 * scale))
+            self.assertTrue(np.allclose(batch.d_3x3[k], sm.d_3x3, rtol=1e-12, atol=1e-12 * scale))
+            self.assertAlmostEqual(batch.thickness[k], sm.thickness)
+            self.assertAlmostEqual(batch.area_density[k], sm.area_density)
+            self.assertAlmostEqual(batch.ex[k], sm.ex, delta=1e-9 * sm.ex)
+            self.assertAlmostEqual(batch.ey[k], sm.ey, delta=1e-9 * sm.ey)
+            self.assertAlmostEqual(batch.gxy[k], sm.gxy, delta=1e-9 * sm.gxy)
+            self.assertAlmostEqual(batch.nu_xy[k], sm.nu_xy)
+            self.assertAlmostEqual(batch.nu_yx[k], sm.nu_yx)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,74 @@
+import csv
+import os
+import tempfile
+import unittest
+from sweep import *
+
+
+def build_crashing_panel(params: dict) -> Panel:
+    # The worker process dies without a Python exception.
+    if params["elem_length"] == 0.2 and params["layup"] == (45, -45):
+        os._exit(1)
+    return build_panel(params)
+
+
+class TestSweep(unittest.TestCase):
+    def test_sweep(self):
+        space = {
+            "elem_length": [0.25, 0.2],
+            "layup":       [(0, 90), (45, -45)],
+            "material":    ["KMU4", "NO_SUCH_MATERIAL"],
+        }
+
+        for n_workers in [0, 2]:
+            sweep = Sweep(space, n_workers=n_workers)
+            self.assertEqual(sweep.get_n_cases(), 8)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "sweep.csv")
+                streamed = []
+                results = sweep.run(path, on_result=streamed.append)
+                with open(path, newline="") as f:
+                    rows = list(csv.DictReader(f))
+
+            self.assertEqual(len(streamed), 8)
+            self.assertEqual(len(rows), 8)
+            self.assertEqual([row["case"] for row in results], list(range(8)))
+
+            # Unknown material fails its cases only.
+            for row in results:
+                if row["material"] == "KMU4":
+                    self.assertEqual(row["status"], "ok")
+                    self.assertGreater(row["uy_max"], 0.0)
+                    self.assertGreater(row["fi_max"], 0.0)
+                else:
+                    self.assertEqual(row["status"], "error")
+                    self.assertIn("NO_SUCH_MATERIAL", row["error"])
+
+            # Same case in the same process gives the same numbers.
+            p = build_panel({**DEFAULT_PARAMS, **results[0]})
+            p.compute()
+            self.assertAlmostEqual(get_panel_metrics(p)["uy_max"], results[0]["uy_max"])
+
+    def test_crashing_worker(self):
+        space = {
+            "elem_length": [0.25, 0.2],
+            "layup":       [(0, 90), (45, -45)],
+            "fy":          [1e+4, 2e+4],
+        }
+        sweep = Sweep(space, builder=build_crashing_panel, n_workers=2)
+        results = sweep.run()
+        self.assertEqual([row["case"] for row in results], list(range(8)))
+
+        # Only the cases that kill their worker fail.
+        for row in results:
+            if row["elem_length"] == 0.2 and row["layup"] == (45, -45):
+                self.assertEqual(row["status"], "error")
+                self.assertIn("BrokenProcessPool", row["error"])
+            else:
+                self.assertEqual(row["status"], "ok")
+                self.assertGreater(row["uy_max"], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()